@@ -1,11 +1,18 @@
+from __future__ import annotations
 from collections import OrderedDict
-from typing import TextIO
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import cache
+from typing import Any, Dict, Iterable, List, TextIO, Tuple
 from logic.logic import Placement
 from logic.constants import *
+from logic.inventory import EXTENDED_ITEM
 from logic.logic_input import Areas
+from logic.logic_utils import LogicUtils
 from hints.hint_types import GossipStoneHintWrapper
 from options import OPTIONS, Options
 import itertools
+import json
 
 from version import VERSION
 
@@ -24,30 +31,96 @@ def remove_prefix(region, location):
     return location
 
 
+@dataclass
+class SpoilerData:
+    """
+    Everything the spoiler logs show that has to be computed from logic,
+    both formats are written from the same instance
+    """
+
+    hash: str
+    progression_spheres: List[List[EIN]] = field(default_factory=list)
+    hints: Dict[EIN, Any] = field(default_factory=dict)
+    required_dungeons: List[str] = field(default_factory=list)
+    sots_items: Dict[EIN, List[EIN]] = field(default_factory=dict)
+    barren_nonprogress: Tuple[List[str], List[str]] = field(
+        default_factory=lambda: ([], [])
+    )
+    randomized_dungeon_entrance: Dict[str, str] = field(default_factory=dict)
+    randomized_trial_entrance: Dict[str, str] = field(default_factory=dict)
+    randomized_start_entrance: Dict[str, Any] = field(default_factory=dict)
+    randomized_start_statues: Dict[str, Any] = field(default_factory=dict)
+    puzzles: Any = None
+
+    @classmethod
+    def from_logic(
+        cls, logic: LogicUtils, areas: Areas, options: Options, hash
+    ) -> SpoilerData:
+        if options["no-spoiler-log"]:
+            # the anti spoiler log only has the header
+            return cls(hash)
+
+        goals = [DUNGEON_GOALS[dun] for dun in logic.required_dungeons] + [DEMISE]
+        sots_items = {
+            goal: logic.get_sots_items(
+                EXTENDED_ITEM[areas.short_to_full(GOAL_CHECKS[goal])]
+            )
+            for goal in goals
+        }
+        return cls(
+            hash,
+            progression_spheres=logic.calculate_playthrough_progression_spheres(),
+            hints=logic.placement.hints,
+            required_dungeons=logic.required_dungeons,
+            sots_items=sots_items,
+            barren_nonprogress=logic.get_barren_regions(),
+            randomized_dungeon_entrance=logic.randomized_dungeon_entrance,
+            randomized_trial_entrance=logic.randomized_trial_entrance,
+            randomized_start_entrance=logic.randomized_start_entrance,
+            randomized_start_statues=logic.randomized_start_statues,
+            puzzles=logic.puzzles,
+        )
+
+
+@dataclass
+class SpoilerOrder:
+    """ranks of the hint regions and checks, in the order the spoiler log lists them"""
+
+    region_rank: Dict[str, int]
+    check_rank: Dict[EIN, int]
+
+    def check_key(self, check: Tuple[str, EIN, Any]) -> Tuple[int, int]:
+        region, loc, _ = check
+        return self.region_rank[region], self.check_rank[loc]
+
+
+@cache
+def spoiler_order(areas: Areas) -> SpoilerOrder:
+    region_rank = {}
+    for region in ["Past"] + list(ALL_HINT_REGIONS):
+        region_rank.setdefault(region, len(region_rank))
+    check_rank = {}
+    for i, check in enumerate([START_ITEM, UNPLACED_ITEM, DEMISE] + list(areas.checks)):
+        check_rank.setdefault(check, i)
+    return SpoilerOrder(region_rank, check_rank)
+
+
 def write(
     file: TextIO,
     placement: Placement,
     options: Options,
     areas: Areas,
-    *,
-    hash,
-    progression_spheres,
-    hints,
-    required_dungeons,
-    sots_items,
-    barren_nonprogress,
-    randomized_dungeon_entrance,
-    randomized_trial_entrance,
-    randomized_start_entrance,
-    randomized_start_statues,
-    puzzles,
+    spoiler: SpoilerData,
 ):
-    write_header(file, options, hash)
+    write_header(file, options, spoiler.hash)
     norm = areas.prettify
 
     if options["no-spoiler-log"]:
         return
 
+    order = spoiler_order(areas)
+    required_dungeons = spoiler.required_dungeons
+
     if len(placement.starting_items) > 0:
         file.write("\n\nStarting items:\n  ")
         file.write("\n  ".join(sorted(placement.starting_items)))
@@ -62,15 +135,14 @@ def write(
     # Write spirit of the sword (100% required) locations.
     file.write("SotS:\n")
 
-    sorted_regions = ["Past"] + list(ALL_HINT_REGIONS)
-    sorted_checks = [START_ITEM, UNPLACED_ITEM, DEMISE] + list(areas.checks)
-
     sots_locations = {
-        goal: sorted(
-            ((norm(placement.items[item]), item) for item in items),
-            key=lambda c: sorted_checks.index(placement.items[c[1]]),
-        )
-        for goal, items in sots_items.items()
+        goal: [
+            (norm(placement.items[item]), item)
+            for item in sorted(
+                items, key=lambda item: order.check_rank[placement.items[item]]
+            )
+        ]
+        for goal, items in spoiler.sots_items.items()
     }
 
     max_location_name_length = 2 + max(
@@ -93,7 +165,7 @@ def write(
 
     file.write("\n\n")
 
-    barren, nonprogress = barren_nonprogress
+    barren, nonprogress = spoiler.barren_nonprogress
     file.write("Barren Regions:\n")
     for region in barren:
         file.write("  " + region + "\n")
@@ -108,7 +180,7 @@ def write(
     file.write("Playthrough:\n")
     prettified_spheres = []
     # First pass for the lengths.
-    for sphere in progression_spheres:
+    for sphere in spoiler.progression_spheres:
         pretty_sphere = []
         for loc in sphere:
             if loc == DEMISE:
@@ -116,12 +188,7 @@ def write(
             elif norm(item := placement.locations[loc]) != GRATITUDE_CRYSTAL:
                 hint_region = areas.checks[loc]["hint_region"]
                 pretty_sphere.append((hint_region, loc, item))
-        pretty_sphere.sort(
-            key=lambda check: (
-                sorted_regions.index(check[0]),
-                sorted_checks.index(check[1]),
-            ),
-        )
+        pretty_sphere.sort(key=order.check_key)
         prettified_spheres.append(
             [
                 (reg, remove_prefix(reg, norm(loc)), item)
@@ -155,12 +222,7 @@ def write(
         if norm(item) != GRATITUDE_CRYSTAL
     ]
 
-    with_regions.sort(
-        key=lambda check: (
-            sorted_regions.index(check[0]),
-            sorted_checks.index(check[1]),
-        )
-    )
+    with_regions.sort(key=order.check_key)
 
     with_regions = [
         (reg, remove_prefix(reg, norm(loc)), item) for (reg, loc, item) in with_regions
@@ -182,14 +244,14 @@ def write(
 
     # Write starting entrance.
     file.write("  Starting Entrance:\n")
-    file.write(f"    {randomized_start_entrance['statue-name']}\n\n")
+    file.write(f"    {spoiler.randomized_start_entrance['statue-name']}\n\n")
 
     # Write starting pillar statues.
     file.write("  Starting Statues:\n")
     for (
         pillar_name,
         statue,
-    ) in randomized_start_statues.items():
+    ) in spoiler.randomized_start_statues.items():
         file.write(f"    {pillar_name+':':48} {statue[1].get('statue-name')}\n")
 
     file.write("\n")
@@ -199,18 +261,19 @@ def write(
     for (
         entrance_name,
         dungeon,
-    ) in randomized_dungeon_entrance.items():
+    ) in spoiler.randomized_dungeon_entrance.items():
         file.write(f"    {entrance_name+':':48} {dungeon}\n")
 
     file.write("\n\n")
 
     # Write randomized trial gates.
     file.write("Trial Gates:\n")
-    for trial_gate, trial in randomized_trial_entrance.items():
+    for trial_gate, trial in spoiler.randomized_trial_entrance.items():
         file.write(f"  {trial_gate+':':48} {trial}\n")
 
     file.write("\n\n\n")
 
+    puzzles = spoiler.puzzles
     if puzzles is not None:
         file.write("Puzzle Solutions:\n")
         puzzle_directions = ["Up", "Left", "Down", "Right"]
@@ -235,13 +298,13 @@ def write(
     max_hintstone_name_length = 2 + max(
         (
             len(norm(hintloc))
-            for hintloc, hint_stone in hints.items()
+            for hintloc, hint_stone in spoiler.hints.items()
             if not isinstance(hint_stone, GossipStoneHintWrapper)
         ),
         default=0,
     )
 
-    for hintloc, hint_stone in hints.items():
+    for hintloc, hint_stone in spoiler.hints.items():
         if isinstance(hint_stone, GossipStoneHintWrapper):
             file.write(f"  {norm(hintloc)+':'}\n")
             for hint in hint_stone.hints:
@@ -255,39 +318,61 @@ def write(
 
 
 def dump_json(
+    file: TextIO,
     placement: Placement,
     options: Options,
-    *,
-    hash,
-    progression_spheres,
-    hints,
-    required_dungeons,
-    sots_items,
-    barren_nonprogress,
-    randomized_dungeon_entrance,
-    randomized_trial_entrance,
-    randomized_start_entrance,
-    randomized_start_statues,
-    puzzles,
+    spoiler: SpoilerData,
 ):
-    spoiler_log = dump_header_json(options, hash)
+    """
+    Writes the same document as json.dump(..., indent=2),
+    one top level entry at a time so the whole document never has to be built
+    """
+    write_json_object(file, json_sections(placement, options, spoiler))
+
+
+def json_sections(
+    placement: Placement, options: Options, spoiler: SpoilerData
+) -> Iterable[Tuple[str, Any]]:
+    yield from dump_header_json(options, spoiler.hash).items()
     if options["no-spoiler-log"]:
-        return spoiler_log
-    spoiler_log["starting-items"] = sorted(placement.starting_items)
-    spoiler_log["required-dungeons"] = required_dungeons
-    spoiler_log["sots-locations"] = [
-        placement.items[item] for item in sots_items[DEMISE]
+        return
+    yield "starting-items", sorted(placement.starting_items)
+    yield "required-dungeons", spoiler.required_dungeons
+    yield "sots-locations", [
+        placement.items[item] for item in spoiler.sots_items[DEMISE]
     ]
-    spoiler_log["barren-regions"] = list(barren_nonprogress[0])
-    spoiler_log["playthrough"] = progression_spheres
-    spoiler_log["item-locations"] = placement.items
-    spoiler_log["hints"] = {k: v.to_spoiler_log_json() for k, v in hints.items()}
-    spoiler_log["entrances"] = randomized_dungeon_entrance
-    spoiler_log["trial-connections"] = randomized_trial_entrance
-    spoiler_log["randomized-start-entrance"] = randomized_start_entrance
-    spoiler_log["randomized-start-statues"] = randomized_start_statues
-    spoiler_log["puzzles"] = puzzles
-    return spoiler_log
+    yield "barren-regions", list(spoiler.barren_nonprogress[0])
+    yield "playthrough", spoiler.progression_spheres
+    yield "item-locations", placement.items
+    yield "hints", {k: v.to_spoiler_log_json() for k, v in spoiler.hints.items()}
+    yield "entrances", spoiler.randomized_dungeon_entrance
+    yield "trial-connections", spoiler.randomized_trial_entrance
+    yield "randomized-start-entrance", spoiler.randomized_start_entrance
+    yield "randomized-start-statues", spoiler.randomized_start_statues
+    yield "puzzles", spoiler.puzzles
+
+
+def json_default(value):
+    # enums are written as their value, like in the yaml files
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(
+        f"Object of type {value.__class__.__name__} is not JSON serializable"
+    )
+
+
+def write_json_object(file: TextIO, sections: Iterable[Tuple[str, Any]]):
+    encoder = json.JSONEncoder(indent=2, default=json_default)
+    separator = "{\n  "
+    for key, value in sections:
+        file.write(separator)
+        file.write(encoder.encode(key))
+        file.write(": ")
+        # strings are escaped, so every newline is an indentation
+        for chunk in encoder.iterencode(value):
+            file.write(chunk.replace("\n", "\n  "))
+        separator = ",\n  "
+    file.write("{}" if separator == "{\n  " else "\n}")
 
 
 def dump_header_json(options: Options, hash):
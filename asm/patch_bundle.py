@@ -0,0 +1,125 @@
+from collections import OrderedDict, defaultdict
+from hashlib import sha1
+from pathlib import Path
+import pickle
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from paths import RANDO_ROOT_PATH
+
+# bump this when the layout of the bundle changes
+ASM_PATCH_BUNDLE_VERSION = 1
+ASM_PATH = RANDO_ROOT_PATH / "asm"
+PATCH_DIFFS_PATH = ASM_PATH / "patch_diffs"
+SYMBOL_FILES = (
+    "custom_symbols.txt",
+    "original_symbols.txt",
+    "free_space_start_offsets.txt",
+)
+
+# exec file, address, offset into the blob, length, relocations as (symbol name, offset, type)
+Patchlet = Tuple[str, int, int, int, Tuple[Tuple[str, int, str], ...]]
+
+
+def _source_paths() -> List[Path]:
+    return sorted(PATCH_DIFFS_PATH.glob("*_diff.txt")) + [
+        ASM_PATH / name for name in SYMBOL_FILES
+    ]
+
+
+def _source_digest(source_paths: List[Path]) -> str:
+    digest = sha1(str(ASM_PATCH_BUNDLE_VERSION).encode())
+    for path in source_paths:
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+class AsmPatchBundle:
+    """
+    All asm patch diffs and symbol tables, the bytes of all patchlets are stored in one blob
+    """
+
+    def __init__(
+        self,
+        patches: Dict[str, List[Patchlet]],
+        blob: bytes,
+        custom_symbols: dict,
+        original_symbols: dict,
+        free_space_start_offsets: dict,
+    ):
+        self.patches = patches
+        self.blob = blob
+        self.custom_symbols = custom_symbols
+        self.original_symbols = original_symbols
+        self.free_space_start_offsets = free_space_start_offsets
+
+    def get_patch(self, name: str) -> Dict[str, Dict[int, dict]]:
+        """
+        Returns the patchlets of the diff `name`, in the same layout as the diff file.
+        Every call returns new objects, Data is a bytearray so it can be modified
+        """
+        patch = defaultdict(OrderedDict)
+        for exec_file, address, offset, length, relocations in self.patches[name]:
+            patchlet = {"Data": bytearray(self.blob[offset : offset + length])}
+            if relocations:
+                patchlet["Relocations"] = [
+                    {"SymbolName": symbol, "Offset": reloc_offset, "Type": reloc_type}
+                    for symbol, reloc_offset, reloc_type in relocations
+                ]
+            patch[exec_file][address] = patchlet
+        return patch
+
+
+def compile_patch_bundle() -> AsmPatchBundle:
+    """parses all patch diffs and symbol files"""
+    patches = {}
+    blob = bytearray()
+    for path in sorted(PATCH_DIFFS_PATH.glob("*_diff.txt")):
+        with path.open("r") as f:
+            diff = yaml.safe_load(f)
+        patchlets = []
+        for exec_file, exec_patches in diff.items():
+            for address, patchlet in exec_patches.items():
+                data = bytes(patchlet["Data"])
+                relocations = tuple(
+                    (reloc["SymbolName"], reloc["Offset"], reloc["Type"])
+                    for reloc in patchlet.get("Relocations", ())
+                )
+                patchlets.append(
+                    (exec_file, address, len(blob), len(data), relocations)
+                )
+                blob += data
+        patches[path.name.removesuffix("_diff.txt")] = patchlets
+
+    symbols = []
+    for name in SYMBOL_FILES:
+        with (ASM_PATH / name).open("r") as f:
+            symbols.append(yaml.safe_load(f))
+    return AsmPatchBundle(patches, bytes(blob), *symbols)
+
+
+def load_patch_bundle(cache_path: Optional[Path] = None) -> AsmPatchBundle:
+    """
+    Returns the compiled asm patch bundle. If cache_path is given, the bundle gets written there
+    and is reused as long as the patch diffs and symbol files don't change
+    """
+    digest = _source_digest(_source_paths())
+    if cache_path is not None and cache_path.is_file():
+        try:
+            cached_digest, bundle = pickle.loads(cache_path.read_bytes())
+            if cached_digest == digest:
+                return bundle
+        except Exception as e:
+            print(f"could not read asm patch bundle: {e}")
+
+    bundle = compile_patch_bundle()
+    if cache_path is not None:
+        try:
+            cache_path.write_bytes(
+                pickle.dumps((digest, bundle), protocol=pickle.HIGHEST_PROTOCOL)
+            )
+        except OSError as e:
+            print(f"could not write asm patch bundle: {e}")
+    return bundle
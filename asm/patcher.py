@@ -30,9 +30,7 @@ def apply_dol_patch(self, dol, patch):
         if org_address >= free_space_start:
             add_free_space_section_to_main_dol(dol, new_bytes)
         else:
-            dol.write_data(
-                write_and_pack_bytes, org_address, new_bytes, "B" * len(new_bytes)
-            )
+            dol.write_data_bytes(org_address, bytes(new_bytes))
 
 
 def apply_rel_patch(self, rel, rel_name, patches):
@@ -48,9 +46,7 @@ def apply_rel_patch(self, rel, rel_name, patches):
                 self, rel, rel_name, offset, new_bytes, relocations
             )
         else:
-            rel.write_data(
-                write_and_pack_bytes, offset, new_bytes, "B" * len(new_bytes)
-            )
+            rel.write_data(write_bytes, offset, bytes(new_bytes))
 
             rel.delete_relocation_in_range(offset, len(new_bytes))
 
@@ -84,12 +80,7 @@ def add_free_space_section_to_main_dol(main_dol, new_bytes):
     dol_section.size = patch_length  # Write length of the new Text2 section
 
     # Next write our custom code to the end of the dol file.
-    main_dol.write_data(
-        write_and_pack_bytes,
-        ORIGINAL_FREE_SPACE_RAM_ADDRESS,
-        new_bytes,
-        "B" * len(new_bytes),
-    )
+    main_dol.write_data(write_bytes, ORIGINAL_FREE_SPACE_RAM_ADDRESS, bytes(new_bytes))
 
     # Next we need to change a hardcoded pointer to where free space begins. Otherwise the game will overwrite the custom code.
     padded_patch_length = (
@@ -142,9 +133,7 @@ def apply_free_space_patchlet_to_rel(
         add_free_space_section_to_rel(self, rel, file_path)
 
     section_relative_offset = offset - rel_section.offset
-    write_and_pack_bytes(
-        rel_section.data, section_relative_offset, new_bytes, "B" * len(new_bytes)
-    )
+    write_bytes(rel_section.data, section_relative_offset, bytes(new_bytes))
 
     if relocations:
         add_relocations_to_rel(
@@ -249,6 +238,4 @@ def add_relocations_to_rel(
         rel_relocation.relocation_offset = relocation_offset
         rel_relocation.curr_section_num = rel_section_index
 
-        if module_num not in rel.relocation_entries_for_module:
-            rel.relocation_entries_for_module[module_num] = []
-        rel.relocation_entries_for_module[module_num].append(rel_relocation)
+        rel.add_relocation(module_num, rel_relocation)
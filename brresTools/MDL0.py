@@ -1,7 +1,6 @@
 # https://wiki.tockdom.com/wiki/MDL0_(File_Format)
 from dataclasses import dataclass
 from io import BufferedIOBase
-from itertools import chain
 from typing import List
 import numpy as np
 import struct
@@ -12,12 +11,39 @@ import struct
 # in the future this may be extended to support more things
 
 
+VERTEX_SECTION = 2
+UV_SECTION = 5
+
+# data format -> big endian numpy type
+BUFFER_DATA_FORMATS = {
+    0: ">u1",
+    1: ">i1",
+    2: ">u2",
+    3: ">i2",
+    4: ">f4",
+}
+# section -> component count value -> number of components
+BUFFER_COMPONENTS = {
+    VERTEX_SECTION: {0: 2, 1: 3},  # XY, XYZ
+    UV_SECTION: {0: 1, 1: 2},  # S, ST
+}
+
+
 @dataclass
 class InPlacePatch:
     offset: int
     bytes: bytes
 
 
+@dataclass
+class BufferHeader:
+    offset: int  # absolute offset of the data
+    dtype: np.dtype
+    components: int
+    divisor: int  # integer values are fixed point with this many fractional bits
+    count: int
+
+
 class MDL0:
     patches: List[InPlacePatch]
 
@@ -33,6 +59,8 @@ class MDL0:
         self.file_size = file_size
         self.start_offset = start_offset
         self.patches = []
+        # parsed index groups by section, they're needed for every buffer lookup
+        self.index_groups = {}
 
     @staticmethod
     def parse_MDL0(dataBuffer: BufferedIOBase, start_offset: int):
@@ -58,88 +86,27 @@ class MDL0:
             start_offset=start_offset,
         )
 
-    def get_uv_entry_header(self, buffer_name: str):
-        from .brres import BRRES, IndexGroupNode, SubFileNode
-
-        index_group_offset = self.section_offsets[5] + self.start_offset
-        root_node = IndexGroupNode("root")
-        BRRES.parse_index_group_entries(
-            data=self.dataBuffer,
-            indexGroupNode=root_node,
-            group_start_offset=index_group_offset,
-            nonrecursive=True,
-        )
-
-        entry_offset = None
-        for child in root_node.childNodes:
-            if child.name == buffer_name and isinstance(child, SubFileNode):
-                entry_offset = child.dataOffset
-                break
-
-        if not entry_offset:
-            raise ValueError("did not find " + buffer_name)
-
-        self.dataBuffer.seek(entry_offset)
-        header = struct.unpack(">IiiiIIIBBH", self.dataBuffer.read(0x20))
-        [
-            _length,
-            _mld0_off,
-            data_offset,
-            _name_offset,
-            _index,
-            comp_count,
-            data_fmt,
-            _divisor,
-            _stride,
-            coord_count,
-        ] = header
-        if comp_count != 0x01:
-            raise ValueError("cannot decode non-XY UV")
-        if data_fmt != 0x03:
-            raise ValueError("cannot decode non-uint16 UV")
-
-        return entry_offset, data_offset, coord_count
-
-    def get_uvs(self, buffer_name: str) -> List[List[int]]:
-        entry_offset, data_offset, coord_count = self.get_uv_entry_header(buffer_name)
-        self.dataBuffer.seek(entry_offset + data_offset)
-
-        coords = []
-        for _ in range(coord_count):
-            coord = struct.unpack(">hh", self.dataBuffer.read(0x4))
-            coords.append(coord)
-
-        return coords
-
-    def set_uvs(self, buffer_name: str, uvs: List[List[int]]):
-        entry_offset, data_offset, coord_count = self.get_uv_entry_header(buffer_name)
-        if len(uvs) != coord_count:
-            raise ValueError("cannot in-place patch vertices due to count mismatch")
+    def get_index_group(self, section: int):
+        from .brres import BRRES, IndexGroupNode
 
-        bytes = bytearray()
-        coords_flat = list(chain.from_iterable(uvs))
-        bytes.extend(struct.pack(">" + "hh" * coord_count, *coords_flat))
-        self.patches.append(
-            InPlacePatch(entry_offset + data_offset - self.start_offset, bytes)
-        )
+        if section not in self.index_groups:
+            root_node = IndexGroupNode("root")
+            BRRES.parse_index_group_entries(
+                data=self.dataBuffer,
+                indexGroupNode=root_node,
+                group_start_offset=self.section_offsets[section] + self.start_offset,
+                nonrecursive=True,
+            )
+            self.index_groups[section] = root_node
+        return self.index_groups[section]
 
-    def get_vertex_entry_header(self, buffer_name: str):
-        from .brres import BRRES, IndexGroupNode, SubFileNode
-
-        index_group_offset = self.section_offsets[2] + self.start_offset
-        root_node = IndexGroupNode("root")
-        BRRES.parse_index_group_entries(
-            data=self.dataBuffer,
-            indexGroupNode=root_node,
-            group_start_offset=index_group_offset,
-            nonrecursive=True,
-        )
+    def get_buffer_header(self, section: int, buffer_name: str) -> BufferHeader:
+        from .brres import SubFileNode
 
+        child = self.get_index_group(section).get_child(buffer_name)
         entry_offset = None
-        for child in root_node.childNodes:
-            if child.name == buffer_name and isinstance(child, SubFileNode):
-                entry_offset = child.dataOffset
-                break
+        if isinstance(child, SubFileNode):
+            entry_offset = child.dataOffset
 
         if not entry_offset:
             raise ValueError("did not find " + buffer_name)
@@ -154,44 +121,76 @@ class MDL0:
             _index,
             comp_count,
             data_fmt,
-            _divisor,
-            _stride,
-            vertex_count,
+            divisor,
+            stride,
+            count,
         ] = header
-        if comp_count != 0x01:
-            raise ValueError("cannot decode non-XYZ vertices")
-        if data_fmt != 0x04:
-            raise ValueError("cannot decode non-float vertices")
-
-        return entry_offset, data_offset, vertex_count
-
-    def get_vertices(self, buffer_name: str) -> List[List[float]]:
-        entry_offset, data_offset, vertex_count = self.get_vertex_entry_header(
-            buffer_name
+        if data_fmt not in BUFFER_DATA_FORMATS:
+            raise ValueError(f"cannot decode buffer format {data_fmt}")
+        dtype = np.dtype(BUFFER_DATA_FORMATS[data_fmt])
+        components = BUFFER_COMPONENTS[section][comp_count]
+        if stride != components * dtype.itemsize:
+            raise ValueError("cannot decode buffer with padding")
+
+        return BufferHeader(
+            offset=entry_offset + data_offset,
+            dtype=dtype,
+            components=components,
+            divisor=divisor,
+            count=count,
         )
-        self.dataBuffer.seek(entry_offset + data_offset)
-
-        vertices = []
-        for _ in range(vertex_count):
-            coords = struct.unpack(">fff", self.dataBuffer.read(0xC))
-            vertices.append(coords)
-
-        return vertices
 
-    def set_vertices(self, buffer_name: str, vertices: List[List[float]]):
-        entry_offset, data_offset, vertex_count = self.get_vertex_entry_header(
-            buffer_name
+    def get_raw_buffer(self, section: int, buffer_name: str) -> np.array:
+        """returns the stored values of a buffer, without applying the fixed point divisor"""
+        header = self.get_buffer_header(section, buffer_name)
+        self.dataBuffer.seek(header.offset)
+        data = self.dataBuffer.read(
+            header.count * header.components * header.dtype.itemsize
+        )
+        return np.frombuffer(data, dtype=header.dtype).reshape(
+            header.count, header.components
         )
-        if len(vertices) != vertex_count:
-            raise ValueError("cannot in-place patch vertices due to count mismatch")
 
-        bytes = bytearray()
-        floats = list(chain.from_iterable(vertices))
-        bytes.extend(struct.pack(">" + "fff" * vertex_count, *floats))
+    def set_raw_buffer(self, section: int, buffer_name: str, values: np.array):
+        header = self.get_buffer_header(section, buffer_name)
+        if np.shape(values) != (header.count, header.components):
+            raise ValueError("cannot in-place patch buffer due to count mismatch")
         self.patches.append(
-            InPlacePatch(entry_offset + data_offset - self.start_offset, bytes)
+            InPlacePatch(
+                header.offset - self.start_offset,
+                np.asarray(values).astype(header.dtype).tobytes(),
+            )
         )
 
+    def get_buffer(self, section: int, buffer_name: str) -> np.array:
+        header = self.get_buffer_header(section, buffer_name)
+        values = self.get_raw_buffer(section, buffer_name).astype(np.float64)
+        if header.dtype.kind != "f":
+            values /= 1 << header.divisor
+        return values
+
+    def set_buffer(self, section: int, buffer_name: str, values: np.array):
+        header = self.get_buffer_header(section, buffer_name)
+        values = np.asarray(values, dtype=np.float64)
+        if header.dtype.kind != "f":
+            values = np.rint(values * (1 << header.divisor))
+            limits = np.iinfo(header.dtype)
+            if values.min() < limits.min or values.max() > limits.max:
+                raise ValueError(f"values don't fit into {buffer_name}")
+        self.set_raw_buffer(section, buffer_name, values)
+
+    def get_vertices(self, buffer_name: str) -> np.array:
+        return self.get_buffer(VERTEX_SECTION, buffer_name)
+
+    def set_vertices(self, buffer_name: str, vertices: np.array):
+        self.set_buffer(VERTEX_SECTION, buffer_name, vertices)
+
+    def get_uvs(self, buffer_name: str) -> np.array:
+        return self.get_buffer(UV_SECTION, buffer_name)
+
+    def set_uvs(self, buffer_name: str, uvs: np.array):
+        self.set_buffer(UV_SECTION, buffer_name, uvs)
+
     def to_bytes(self):
         buf: bytearray = bytearray()
 
@@ -0,0 +1,59 @@
+# https://wiki.tockdom.com/wiki/PLT0_(File_Format)
+from io import BufferedIOBase
+import numpy as np
+import struct
+
+from .TEX0 import (
+    PALETTE_FORMATS_NAMES,
+    cvt_IA8_array_to_RGBA,
+    cvt_RGB565_array_to_RGBA,
+    cvt_RGB5A3_array_to_RGBA,
+)
+
+
+class PLT0:
+    def __init__(
+        self,
+        dataBuffer: BufferedIOBase,
+        paletteDataOffset: int,
+        paletteFormat: int,
+        numberOfEntries: int,
+    ):
+        self.dataBuffer: BufferedIOBase = dataBuffer
+        self.paletteDataOffset: int = paletteDataOffset
+        self.paletteFormat: int = paletteFormat
+        self.numberOfEntries: int = numberOfEntries
+
+    @staticmethod
+    def parse_PLT0(dataBuffer: BufferedIOBase, start_offset: int):
+        dataBuffer.seek(start_offset + 16)
+        section_0_offset = struct.unpack(">I", dataBuffer.read(4))[0]
+
+        dataBuffer.seek(start_offset + 24)
+        palette_format = struct.unpack(">I", dataBuffer.read(4))[0]
+        number_of_entries = struct.unpack(">H", dataBuffer.read(2))[0]
+
+        return PLT0(
+            dataBuffer=dataBuffer,
+            paletteDataOffset=start_offset + section_0_offset,
+            paletteFormat=palette_format,
+            numberOfEntries=number_of_entries,
+        )
+
+    def get_palette_data(self) -> bytes:
+        # all palette formats use 2 bytes per color
+        self.dataBuffer.seek(self.paletteDataOffset)
+        return self.dataBuffer.read(self.numberOfEntries * 2)
+
+    def get_palette_RGBA(self) -> np.array:
+        colors = np.frombuffer(self.get_palette_data(), dtype=">u2").astype(np.int32)
+        match PALETTE_FORMATS_NAMES.get(self.paletteFormat):
+            case "IA8":
+                RGBA = cvt_IA8_array_to_RGBA(colors)
+            case "RGB565":
+                RGBA = cvt_RGB565_array_to_RGBA(colors)
+            case "RGB5A3":
+                RGBA = cvt_RGB5A3_array_to_RGBA(colors)
+            case _:
+                raise Exception(f"Invalid palette format {self.paletteFormat}.")
+        return RGBA.astype(np.uint8)
@@ -64,6 +64,148 @@ MASK4 = 0b001111
 MASK5 = 0b011111
 MASK6 = 0b111111
 
+# c0 and c1 are RGB565 colors, table holds a 2 bit color code per pixel, first pixel highest
+CMPR_SUB_BLOCK_DTYPE = np.dtype([("c0", ">u2"), ("c1", ">u2"), ("table", ">u4")])
+CMPR_INDEX_SHIFTS = np.arange(30, -2, -2, dtype=np.uint32)
+
+# image formats that store palette indices instead of colors
+PALETTE_IMAGE_FORMATS = (8, 9, 10)
+
+PALETTE_FORMATS_NAMES = {
+    0: "IA8",
+    1: "RGB565",
+    2: "RGB5A3",
+}
+
+
+def untile_blocks(
+    data: np.array, height: int, width: int, blockHeight: int, blockWidth: int
+) -> np.array:
+    """
+    Converts pixels in GX block order, shape (..., number of pixels, channels),
+    into images of shape (..., height, width, channels).
+    The data has to contain whole blocks, pixels outside of height and width are cut off
+    """
+    yBlocks = -(height // -blockHeight)
+    xBlocks = -(width // -blockWidth)
+    batchShape = data.shape[:-2]
+    channels = data.shape[-1]
+    image = (
+        data.reshape(batchShape + (yBlocks, xBlocks, blockHeight, blockWidth, channels))
+        .swapaxes(-4, -3)
+        .reshape(batchShape + (yBlocks * blockHeight, xBlocks * blockWidth, channels))
+    )
+    return image[..., :height, :width, :]
+
+
+def tile_blocks(image: np.array, blockHeight: int, blockWidth: int) -> np.array:
+    """
+    Converts images of shape (..., height, width, channels) into pixels in GX block order,
+    shape (..., number of pixels, channels).
+    Images are padded by repeating the edge pixels to fill whole blocks
+    """
+    height, width, channels = image.shape[-3:]
+    yBlocks = -(height // -blockHeight)
+    xBlocks = -(width // -blockWidth)
+    batchShape = image.shape[:-3]
+    padding = ((0, 0),) * len(batchShape) + (
+        (0, (yBlocks * blockHeight) - height),
+        (0, (xBlocks * blockWidth) - width),
+        (0, 0),
+    )
+    image = np.pad(image, padding, mode="edge")
+    return (
+        image.reshape(
+            batchShape + (yBlocks, blockHeight, xBlocks, blockWidth, channels)
+        )
+        .swapaxes(-4, -3)
+        .reshape(batchShape + (-1, channels))
+    )
+
+
+def unpack_nibbles(data: bytes) -> np.array:
+    # high nibble first
+    packed = np.frombuffer(data, dtype=np.uint8)
+    return np.stack((packed >> 4, packed & MASK4), axis=-1).reshape(-1)
+
+
+def pack_nibbles(data: np.array) -> bytes:
+    nibbles = data.astype(np.uint8).reshape(-1, 2)
+    return ((nibbles[:, 0] << 4) | (nibbles[:, 1] & MASK4)).astype(np.uint8).tobytes()
+
+
+def intensity_to_RGBA(intensity: np.array, alpha=0xFF) -> np.array:
+    RGBA = np.empty(intensity.shape + (4,), dtype=np.uint8)
+    RGBA[..., 0:3] = intensity[..., None]
+    RGBA[..., 3] = alpha
+    return RGBA
+
+
+def RGBA_to_intensity(data: np.array) -> np.array:
+    # luma, integer weights from ITU-R BT.601
+    data = data.astype(np.int32, copy=False)
+    return ((data[..., 0] * 299) + (data[..., 1] * 587) + (data[..., 2] * 114)) // 1000
+
+
+def cvt_RGB565_array_to_RGBA(data: np.array) -> np.array:
+    RGBA = np.empty(data.shape + (4,), dtype=np.int32)
+    RGBA[..., 0] = ((data >> 11) & MASK5) * 0x8
+    RGBA[..., 1] = ((data >> 5) & MASK6) * 0x4
+    RGBA[..., 2] = (data & MASK5) * 0x8
+    RGBA[..., 3] = 255
+    return RGBA
+
+
+def cvt_RGBA_array_to_RGB565(data: np.array) -> np.array:
+    data = data.astype(np.int32, copy=False)
+    return (
+        ((data[..., 0] // 0x8) << 11)
+        | ((data[..., 1] // 0x4) << 5)
+        | (data[..., 2] // 0x8)
+    )
+
+
+def cvt_RGB5A3_array_to_RGBA(data: np.array) -> np.array:
+    data = data.astype(np.int32)
+    noAlpha = ((data >> 15) & 1).astype(bool)
+    RGBA = np.empty(data.shape + (4,), dtype=np.int32)
+    RGBA[..., 0] = np.where(
+        noAlpha, ((data >> 10) & MASK5) * 0x8, ((data >> 8) & MASK4) * 0x11
+    )
+    RGBA[..., 1] = np.where(
+        noAlpha, ((data >> 5) & MASK5) * 0x8, ((data >> 4) & MASK4) * 0x11
+    )
+    RGBA[..., 2] = np.where(noAlpha, (data & MASK5) * 0x8, (data & MASK4) * 0x11)
+    RGBA[..., 3] = np.where(noAlpha, 0xFF, ((data >> 12) & MASK3) * 0x20)
+    return RGBA
+
+
+def cvt_RGBA_array_to_RGB5A3(data: np.array) -> np.array:
+    data = data.astype(np.int32, copy=False)
+    noAlpha = data[..., 3] == 0xFF
+    withoutAlpha = (
+        (0b1 << 15)
+        | ((data[..., 0] // 0x8) << 10)
+        | ((data[..., 1] // 0x8) << 5)
+        | (data[..., 2] // 0x8)
+    )
+    withAlpha = (
+        ((data[..., 3] // 0x20) << 12)
+        | ((data[..., 0] // 0x11) << 8)
+        | ((data[..., 1] // 0x11) << 4)
+        | (data[..., 2] // 0x11)
+    )
+    return np.where(noAlpha, withoutAlpha, withAlpha)
+
+
+def cvt_IA8_array_to_RGBA(data: np.array) -> np.array:
+    # upper byte is alpha, lower byte intensity
+    return intensity_to_RGBA(data & 0xFF, data >> 8)
+
+
+def cvt_RGBA_array_to_IA8(data: np.array) -> np.array:
+    return (data[..., 3].astype(np.int32) << 8) | RGBA_to_intensity(data)
+
 
 class TEX0:
     def __init__(
@@ -74,6 +216,7 @@ class TEX0:
         width: int,
         height: int,
         numberOfBytesInImage: int,
+        palette: np.array = None,
     ):
         self.dataBuffer: BufferedIOBase = dataBuffer
         self.imageDataOffset: int = imgDataOffset
@@ -81,9 +224,11 @@ class TEX0:
         self.width: int = width
         self.height: int = height
         self.numberOfBytesInImage: int = numberOfBytesInImage
+        # RGBA colors of the palette, only used by the C4, C8 and C14X2 formats
+        self.palette: np.array = palette
 
     @staticmethod
-    def parse_TEX0(dataBuffer: BufferedIOBase, start_offset: int):
+    def parse_TEX0(dataBuffer: BufferedIOBase, start_offset: int, palette=None):
         dataBuffer.seek(start_offset + 16)
         section_0_offset = struct.unpack(">I", dataBuffer.read(4))[0]
         img_data_offset = start_offset + section_0_offset
@@ -93,8 +238,13 @@ class TEX0:
         height = struct.unpack(">H", dataBuffer.read(2))[0]
         image_format = struct.unpack(">I", dataBuffer.read(4))[0]
 
+        # images are always stored as whole blocks
+        padded_height = -(height // -IMAGE_FORMATS_BLOCK_HEIGHT[image_format])
+        padded_height *= IMAGE_FORMATS_BLOCK_HEIGHT[image_format]
+        padded_width = -(width // -IMAGE_FORMATS_BLOCK_WIDTH[image_format])
+        padded_width *= IMAGE_FORMATS_BLOCK_WIDTH[image_format]
         number_of_bytes_in_image = (
-            height * width * IMAGE_FORMATS_BITS_PER_PIXEL[image_format]
+            padded_height * padded_width * IMAGE_FORMATS_BITS_PER_PIXEL[image_format]
         ) // 8
 
         return TEX0(
@@ -104,6 +254,7 @@ class TEX0:
             width=width,
             height=height,
             numberOfBytesInImage=number_of_bytes_in_image,
+            palette=palette,
         )
 
     def get_image_data(self) -> bytes:
@@ -116,33 +267,21 @@ class TEX0:
             case "I4":
                 return self.cvt_I4_to_RGBA(data=data)
             case "I8":
-                raise Exception(
-                    f"Unsupported image format {IMAGE_FORMATS_NAMES[self.imageFormat]}."
-                )
+                return self.cvt_I8_to_RGBA(data=data)
             case "IA4":
-                raise Exception(
-                    f"Unsupported image format {IMAGE_FORMATS_NAMES[self.imageFormat]}."
-                )
+                return self.cvt_IA4_to_RGBA(data=data)
             case "IA8":
-                raise Exception(
-                    f"Unsupported image format {IMAGE_FORMATS_NAMES[self.imageFormat]}."
-                )
+                return self.cvt_IA8_to_RGBA(data=data)
             case "RGB565":
                 return self.cvt_RGB565_to_RGBA(data=data)
             case "RGB5A3":
                 return self.cvt_RGB5A3_to_RGBA(data=data)
             case "RGBA32":
-                raise Exception(
-                    f"Unsupported image format {IMAGE_FORMATS_NAMES[self.imageFormat]}."
-                )
+                return self.cvt_RGBA32_to_RGBA(data=data)
             case "C4":
-                raise Exception(
-                    f"Unsupported image format {IMAGE_FORMATS_NAMES[self.imageFormat]}."
-                )
+                return self.cvt_C4_to_RGBA(data=data)
             case "C8":
-                raise Exception(
-                    f"Unsupported image format {IMAGE_FORMATS_NAMES[self.imageFormat]}."
-                )
+                return self.cvt_C8_to_RGBA(data=data)
             case "C14X2":
                 raise Exception(
                     f"Unsupported image format {IMAGE_FORMATS_NAMES[self.imageFormat]}."
@@ -157,37 +296,23 @@ class TEX0:
     def convert_RGBA_to_raw_image_data(self, data: np.array) -> bytes:
         match IMAGE_FORMATS_NAMES[self.imageFormat]:
             case "I4":
-                raise Exception(
-                    f"Unsupported image format {IMAGE_FORMATS_NAMES[self.imageFormat]}."
-                )
+                return self.cvt_RGBA_to_I4(data=data)
             case "I8":
-                raise Exception(
-                    f"Unsupported image format {IMAGE_FORMATS_NAMES[self.imageFormat]}."
-                )
+                return self.cvt_RGBA_to_I8(data=data)
             case "IA4":
-                raise Exception(
-                    f"Unsupported image format {IMAGE_FORMATS_NAMES[self.imageFormat]}."
-                )
+                return self.cvt_RGBA_to_IA4(data=data)
             case "IA8":
-                raise Exception(
-                    f"Unsupported image format {IMAGE_FORMATS_NAMES[self.imageFormat]}."
-                )
+                return self.cvt_RGBA_to_IA8(data=data)
             case "RGB565":
                 return self.cvt_RGBA_to_RGB565(data=data)
             case "RGB5A3":
                 return self.cvt_RGBA_to_RGBA5A3(data=data)
             case "RGBA32":
-                raise Exception(
-                    f"Unsupported image format {IMAGE_FORMATS_NAMES[self.imageFormat]}."
-                )
+                return self.cvt_RGBA_to_RGBA32(data=data)
             case "C4":
-                raise Exception(
-                    f"Unsupported image format {IMAGE_FORMATS_NAMES[self.imageFormat]}."
-                )
+                return self.cvt_RGBA_to_C4(data=data)
             case "C8":
-                raise Exception(
-                    f"Unsupported image format {IMAGE_FORMATS_NAMES[self.imageFormat]}."
-                )
+                return self.cvt_RGBA_to_C8(data=data)
             case "C14X2":
                 raise Exception(
                     f"Unsupported image format {IMAGE_FORMATS_NAMES[self.imageFormat]}."
@@ -200,341 +325,216 @@ class TEX0:
                 )
 
     def cvt_I4_to_RGBA(self, data: bytes) -> np.array:
-        RGBAList = []
-
-        for byte in data:
-            formattedByte = bin(byte)[2:].zfill(8)
-            color1 = int(formattedByte[:4].zfill(8), 2)
-            color2 = int(formattedByte[4:].zfill(8), 2)
-            r = color1 * 0x11
-            g = color1 * 0x11
-            b = color1 * 0x11
-            a = 0xFF
-            RGBAList.append((r, g, b, a))
-            r = color2 * 0x11
-            g = color2 * 0x11
-            b = color2 * 0x11
-            RGBAList.append((r, g, b, a))
-
-        return self.reorder_blocks(data=RGBAList)
+        intensity = unpack_nibbles(data) * 0x11
+        return self.reorder_blocks(data=intensity_to_RGBA(intensity))
+
+    def cvt_RGBA_to_I4(self, data: np.array) -> bytes:
+        intensity = RGBA_to_intensity(self.reorder_blocks_back(data=data))
+        return pack_nibbles(intensity // 0x11)
+
+    def cvt_I8_to_RGBA(self, data: bytes) -> np.array:
+        intensity = np.frombuffer(data, dtype=np.uint8)
+        return self.reorder_blocks(data=intensity_to_RGBA(intensity))
+
+    def cvt_RGBA_to_I8(self, data: np.array) -> bytes:
+        intensity = RGBA_to_intensity(self.reorder_blocks_back(data=data))
+        return intensity.astype(np.uint8).tobytes()
+
+    def cvt_IA4_to_RGBA(self, data: bytes) -> np.array:
+        # upper nibble is alpha, lower nibble intensity
+        alphaIntensity = np.frombuffer(data, dtype=np.uint8)
+        intensity = (alphaIntensity & MASK4) * 0x11
+        alpha = (alphaIntensity >> 4) * 0x11
+        return self.reorder_blocks(data=intensity_to_RGBA(intensity, alpha))
+
+    def cvt_RGBA_to_IA4(self, data: np.array) -> bytes:
+        dataList = self.reorder_blocks_back(data=data)
+        intensity = RGBA_to_intensity(dataList) // 0x11
+        alpha = dataList[:, 3] // 0x11
+        return ((alpha << 4) | intensity).astype(np.uint8).tobytes()
+
+    def cvt_IA8_to_RGBA(self, data: bytes) -> np.array:
+        alphaIntensity = np.frombuffer(data, dtype=">u2").astype(np.int32)
+        return self.reorder_blocks(data=cvt_IA8_array_to_RGBA(alphaIntensity))
+
+    def cvt_RGBA_to_IA8(self, data: np.array) -> bytes:
+        dataList = self.reorder_blocks_back(data=data)
+        return cvt_RGBA_array_to_IA8(dataList).astype(">u2").tobytes()
 
     def cvt_RGB565_to_RGBA(self, data: bytes) -> np.array:
-        RGBAList = []
-
-        for colorStart in range(0, len(data), 2):
-            RGB565 = struct.unpack(">H", data[colorStart : colorStart + 2])[0]
-            RGBAList.append(self.cvt_single_RGB565_to_RGBA(RGB565))
-
-        return self.reorder_blocks(data=RGBAList)
+        RGB565 = np.frombuffer(data, dtype=">u2").astype(np.int32)
+        return self.reorder_blocks(data=cvt_RGB565_array_to_RGBA(RGB565))
 
     def cvt_RGBA_to_RGB565(self, data: np.array) -> bytes:
-        dataList: list = self.reorder_blocks_back(data=data)
-
-        RGB565List: bytearray = bytearray()
-
-        for color in dataList:
-            RGB565 = self.cvt_single_RGBA_to_RGB565(color)
-            RGB565List += struct.pack(">H", RGB565)
-
-        return RGB565List
+        dataList = self.reorder_blocks_back(data=data)
+        return bytearray(cvt_RGBA_array_to_RGB565(dataList).astype(">u2").tobytes())
 
     def cvt_RGB5A3_to_RGBA(self, data: bytes) -> np.array:
-        RGBAList = []
-
-        for colorStart in range(0, len(data), 2):
-            RGB5A3 = struct.unpack(">H", data[colorStart : colorStart + 2])[0]
-            RGBA: list[int] = []
-
-            if (RGB5A3 >> 15) & 1:  # doesn't use alpha channel
-                RGBA.append(((RGB5A3 >> 10) & MASK5) * 0x8)
-                RGBA.append(((RGB5A3 >> 5) & MASK5) * 0x8)
-                RGBA.append((RGB5A3 & MASK5) * 0x8)
-                RGBA.append(0xFF)
-            else:  # does use alpha channel
-                RGBA.append(((RGB5A3 >> 8) & MASK4) * 0x11)
-                RGBA.append(((RGB5A3 >> 4) & MASK4) * 0x11)
-                RGBA.append((RGB5A3 & MASK4) * 0x11)
-                RGBA.append(((RGB5A3 >> 12) & MASK3) * 0x20)
-
-            RGBAList.append(RGBA)
-
-        return self.reorder_blocks(data=RGBAList)
+        RGB5A3 = np.frombuffer(data, dtype=">u2")
+        return self.reorder_blocks(data=cvt_RGB5A3_array_to_RGBA(RGB5A3))
 
     def cvt_RGBA_to_RGBA5A3(self, data: np.array) -> bytes:
-        dataList: list = self.reorder_blocks_back(data=data)
-
-        RGB5A3List: bytearray = bytearray()
+        dataList = self.reorder_blocks_back(data=data)
+        return bytearray(cvt_RGBA_array_to_RGB5A3(dataList).astype(">u2").tobytes())
+
+    def cvt_RGBA32_to_RGBA(self, data: bytes) -> np.array:
+        # each 4x4 block stores 16 AR pairs followed by 16 GB pairs
+        blocks = np.frombuffer(data, dtype=np.uint8).reshape(-1, 2, 16, 2)
+        RGBA = np.stack(
+            (
+                blocks[:, 0, :, 1],
+                blocks[:, 1, :, 0],
+                blocks[:, 1, :, 1],
+                blocks[:, 0, :, 0],
+            ),
+            axis=-1,
+        )
+        return self.reorder_blocks(data=RGBA.reshape(-1, 4))
+
+    def cvt_RGBA_to_RGBA32(self, data: np.array) -> bytes:
+        pixels = self.reorder_blocks_back(data=data).astype(np.uint8).reshape(-1, 16, 4)
+        blocks = np.empty((len(pixels), 2, 16, 2), dtype=np.uint8)
+        blocks[:, 0, :, 0] = pixels[:, :, 3]
+        blocks[:, 0, :, 1] = pixels[:, :, 0]
+        blocks[:, 1, :, 0] = pixels[:, :, 1]
+        blocks[:, 1, :, 1] = pixels[:, :, 2]
+        return blocks.tobytes()
+
+    def cvt_C4_to_RGBA(self, data: bytes) -> np.array:
+        return self.reorder_blocks(data=self.lookup_palette(unpack_nibbles(data)))
+
+    def cvt_RGBA_to_C4(self, data: np.array) -> bytes:
+        indices = self.closest_palette_indices(self.reorder_blocks_back(data=data))
+        return pack_nibbles(indices)
+
+    def cvt_C8_to_RGBA(self, data: bytes) -> np.array:
+        indices = np.frombuffer(data, dtype=np.uint8)
+        return self.reorder_blocks(data=self.lookup_palette(indices))
+
+    def cvt_RGBA_to_C8(self, data: np.array) -> bytes:
+        indices = self.closest_palette_indices(self.reorder_blocks_back(data=data))
+        return indices.astype(np.uint8).tobytes()
+
+    def lookup_palette(self, indices: np.array) -> np.array:
+        if self.palette is None:
+            raise Exception(
+                f"Image format {IMAGE_FORMATS_NAMES[self.imageFormat]} needs a palette."
+            )
+        return self.palette[np.minimum(indices, len(self.palette) - 1)]
 
-        for color in dataList:
-            if color[3] == 0xFF:  # doesn't use alpha channel
-                R = (color[0] // 0x8) << 10
-                G = (color[1] // 0x8) << 5
-                B = color[2] // 0x8
-                A = 0b1 << 15
-            else:  # does use alpha channel
-                R = (color[0] // 0x11) << 8
-                G = (color[1] // 0x11) << 4
-                B = color[2] // 0x11
-                A = (color[3] // 0x20) << 12
+    def closest_palette_indices(self, data: np.array) -> np.array:
+        # the palette is kept as is, every pixel gets the closest existing color
+        if self.palette is None:
+            raise Exception(
+                f"Image format {IMAGE_FORMATS_NAMES[self.imageFormat]} needs a palette."
+            )
+        diff = data[:, None, :].astype(np.int32) - self.palette[None, :, :]
+        return np.einsum("ijk,ijk->ij", diff, diff).argmin(axis=1)
 
-            RGB5A3 = R | G | B | A
-            RGB5A3List += struct.pack(">H", RGB5A3)
+    def cvt_CMPR_to_RGBA(self, data: bytes) -> np.array:
+        # CMPR have 32 byte long blocks made of four 8 byte long sub-blocks, each holding
+        # two RGB565 colors and a 2 bit palette index for each pixel of a 4x4 tile
+        subBlocks = np.frombuffer(data, dtype=CMPR_SUB_BLOCK_DTYPE)
+        c0 = subBlocks["c0"].astype(np.int32)
+        c1 = subBlocks["c1"].astype(np.int32)
+        transparency = c1 >= c0
+        RGBAc0 = cvt_RGB565_array_to_RGBA(c0)
+        RGBAc1 = cvt_RGB565_array_to_RGBA(c1)
+
+        palette = np.empty((len(subBlocks), 4, 4), dtype=np.int32)
+        palette[:, 0] = RGBAc0
+        palette[:, 1] = RGBAc1
+        palette[:, 2] = np.where(
+            transparency[:, None],
+            (RGBAc0 + RGBAc1) // 2,
+            ((2 * RGBAc0) + RGBAc1) // 3,
+        )
+        palette[:, 3] = np.where(transparency[:, None], 0, (RGBAc0 + (2 * RGBAc1)) // 3)
+        palette[:, 2:, 3] = np.where(transparency[:, None], (255, 0), 255)
 
-        return RGB5A3List
+        colorCodes = (subBlocks["table"][:, None] >> CMPR_INDEX_SHIFTS) & 0x03
+        pixels = np.take_along_axis(palette, colorCodes[:, :, None], axis=1)
 
-    def cvt_CMPR_to_RGBA(self, data: bytes) -> np.array:
-        RGBAList = []
-
-        for blockStart in range(0, len(data), 32):
-            block = data[blockStart : blockStart + 32]  # CMPR have 32 byte long blocks
-            blockRGBAList = []
-            for subBlockStart in (0, 8, 16, 24):
-                subBlock = block[
-                    subBlockStart : subBlockStart + 8
-                ]  # CMPR have four 8 byte long sub-blocks
-                c0 = struct.unpack(">H", subBlock[:2])[0]
-                c1 = struct.unpack(">H", subBlock[2:4])[0]
-                transparency = False
-                if c1 >= c0:
-                    transparency = True
-                c0 = self.cvt_single_RGB565_to_RGBA(c0)
-                c1 = self.cvt_single_RGB565_to_RGBA(c1)
-                cTable = struct.unpack(">L", subBlock[4:])[0]
-
-                if transparency:
-                    c2 = (
-                        ((c0[0] + c1[0]) // 2),
-                        ((c0[1] + c1[1]) // 2),
-                        ((c0[2] + c1[2]) // 2),
-                        255,
-                    )
-                    c3 = (0, 0, 0, 0)
-                else:
-                    c2 = (
-                        (((2 * c0[0]) + c1[0]) // 3),
-                        (((2 * c0[1]) + c1[1]) // 3),
-                        (((2 * c0[2]) + c1[2]) // 3),
-                        255,
-                    )
-                    c3 = (
-                        ((c0[0] + (2 * c1[0])) // 3),
-                        ((c0[1] + (2 * c1[1])) // 3),
-                        ((c0[2] + (2 * c1[2])) // 3),
-                        255,
-                    )
-
-                for i in range(30, -2, -2):
-                    colorCode = (cTable >> i) & 0x03
-                    match colorCode:
-                        case 0:
-                            blockRGBAList.append(c0)
-                        case 1:
-                            blockRGBAList.append(c1)
-                        case 2:
-                            blockRGBAList.append(c2)
-                        case 3:
-                            blockRGBAList.append(c3)
-
-            # restrucures sub-blocks in each block to be correctly ordered
-            splitblockRGBAList = [
-                (blockRGBAList[:16], blockRGBAList[16:32]),
-                (blockRGBAList[32:48], blockRGBAList[48:]),
-            ]
-            newBlockTopHalf = []
-            newBlockBottomHalf = []
-
-            for currentRow in range(0, 16, 4):
-                newBlockTopHalf += splitblockRGBAList[0][0][currentRow : currentRow + 4]
-                newBlockTopHalf += splitblockRGBAList[0][1][currentRow : currentRow + 4]
-                newBlockBottomHalf += splitblockRGBAList[1][0][
-                    currentRow : currentRow + 4
-                ]
-                newBlockBottomHalf += splitblockRGBAList[1][1][
-                    currentRow : currentRow + 4
-                ]
-
-            RGBAList += newBlockTopHalf
-            RGBAList += newBlockBottomHalf
-
-        return self.reorder_blocks(data=RGBAList)
+        return self.untile_sub_blocks(pixels.astype(np.uint8))
 
     def cvt_RGBA_to_CMPR(self, data: np.array) -> bytes:
-        CMPRBytes: bytearray = bytearray()
-
-        dataList: list = self.reorder_blocks_back(data=data)
-        numOfBlocks = len(dataList) // 64
-
-        for currentBlock in range(numOfBlocks):
-            block = dataList[(currentBlock * 64) : ((currentBlock * 64) + 64)]
-            blockTopHalf = block[:32]
-            blockBottomHalf = block[32:]
-            splitBlockRGBAList1: list = []
-            splitBlockRGBAList2: list = []
-            splitBlockRGBAList3: list = []
-            splitBlockRGBAList4: list = []
-
-            for currentRow in range(0, 32, 8):
-                splitBlockRGBAList1 += blockTopHalf[currentRow : currentRow + 4]
-                splitBlockRGBAList2 += blockTopHalf[currentRow + 4 : currentRow + 8]
-                splitBlockRGBAList3 += blockBottomHalf[currentRow : currentRow + 4]
-                splitBlockRGBAList4 += blockBottomHalf[currentRow + 4 : currentRow + 8]
-
-            blockRGBAlist = (
-                splitBlockRGBAList1
-                + splitBlockRGBAList2
-                + splitBlockRGBAList3
-                + splitBlockRGBAList4
+        pixels = self.tile_sub_blocks(data).astype(np.int32)
+
+        isAlpha = pixels[:, :, 3] == 0
+        colors = cvt_RGBA_array_to_RGB565(pixels)
+        transparency = isAlpha.any(axis=1)
+        hasColors = ~isAlpha.all(axis=1)
+        minColor = np.where(isAlpha, 0xFFFF, colors).min(axis=1)
+        maxColor = np.where(isAlpha, 0, colors).max(axis=1)
+
+        # sub-blocks with transparency order their colors ascending, others descending
+        c0 = np.where(transparency, minColor, maxColor)
+        c1 = np.where(transparency, maxColor, minColor)
+        # for full sub-blocks of alpha all colors are black
+        c0 = np.where(hasColors, c0, 0)
+        c1 = np.where(hasColors, c1, 0)
+        RGBAc0 = cvt_RGB565_array_to_RGBA(c0)
+        RGBAc1 = cvt_RGB565_array_to_RGBA(c1)
+        c2 = np.where(
+            transparency,
+            cvt_RGBA_array_to_RGB565((RGBAc0 + RGBAc1) // 2),
+            cvt_RGBA_array_to_RGB565(((2 * RGBAc0) + RGBAc1) // 3),
+        )
+        c2 = np.where(hasColors, c2, 0)
+        c3 = np.where(
+            transparency, 0, cvt_RGBA_array_to_RGB565((RGBAc0 + (2 * RGBAc1)) // 3)
+        )
+
+        # pick the closest palette entry by RGB565 value, earlier entries win ties
+        diff = np.abs(colors - c0[:, None])
+        closest = np.zeros(colors.shape, dtype=np.uint32)
+        for index, paletteColor in ((1, c1), (2, c2)):
+            newDiff = np.abs(colors - paletteColor[:, None])
+            isCloser = diff > newDiff
+            closest[isCloser] = index
+            diff = np.where(isCloser, newDiff, diff)
+        isCloser = ~transparency[:, None] & (diff > np.abs(colors - c3[:, None]))
+        closest[isCloser] = 3
+        closest[isAlpha] = 3
+
+        subBlocks = np.empty(len(pixels), dtype=CMPR_SUB_BLOCK_DTYPE)
+        subBlocks["c0"] = c0
+        subBlocks["c1"] = c1
+        subBlocks["table"] = np.bitwise_or.reduce(
+            closest << CMPR_INDEX_SHIFTS.astype(np.uint32), axis=1
+        )
+
+        return bytearray(subBlocks.tobytes())
+
+    def untile_sub_blocks(self, pixels: np.array) -> np.array:
+        # CMPR blocks are 8x8 pixels, made of 2x2 sub-blocks of 4x4 pixels each
+        blocks = untile_blocks(pixels.reshape(-1, 64, 4), 8, 8, 4, 4)
+        return self.reorder_blocks(data=blocks.reshape(-1, 4))
+
+    def tile_sub_blocks(self, image: np.array) -> np.array:
+        blocks = self.reorder_blocks_back(data=image).reshape(-1, 8, 8, 4)
+        return tile_blocks(blocks, 4, 4).reshape(-1, 16, 4)
+
+    def reorder_blocks(self, data: np.array) -> np.array:
+        """
+        Converts RGBA pixels in block order into an image of shape (height, width, 4)
+        """
+        return np.ascontiguousarray(
+            untile_blocks(
+                np.asarray(data, dtype=np.uint8),
+                self.height,
+                self.width,
+                IMAGE_FORMATS_BLOCK_HEIGHT[self.imageFormat],
+                IMAGE_FORMATS_BLOCK_WIDTH[self.imageFormat],
             )
+        )
 
-            for subBlockStart in (0, 16, 32, 48):
-                subBlockRGBAList = blockRGBAlist[subBlockStart : subBlockStart + 16]
-                subBlockRGB565List = []
-
-                transparency = False
-                colors = []
-                for color in subBlockRGBAList:
-                    if color[3] == 0:
-                        transparency = True
-                        subBlockRGB565List.append("ALPHA")
-                        continue
-                    RGB565Color = self.cvt_single_RGBA_to_RGB565(color)
-                    if RGB565Color not in colors:
-                        colors.append(RGB565Color)
-                    subBlockRGB565List.append(RGB565Color)
-
-                colors.sort()
-                if transparency:
-                    if (
-                        len(colors) == 0
-                    ):  # for full sub block of alpha, nothing will be added to colors list
-                        c0 = self.cvt_single_RGBA_to_RGB565((0, 0, 0, 0))
-                        c1 = c0
-                        c2 = c0
-                        c3 = c0
-                    else:
-                        c0 = colors[0]
-                        c1 = colors[-1]
-                        RGBAc0 = self.cvt_single_RGB565_to_RGBA(c0)
-                        RGBAc1 = self.cvt_single_RGB565_to_RGBA(c1)
-                        RGBAc2 = (
-                            ((RGBAc0[0] + RGBAc1[0]) // 2),
-                            ((RGBAc0[1] + RGBAc1[1]) // 2),
-                            ((RGBAc0[2] + RGBAc1[2]) // 2),
-                            255,
-                        )
-                        c2 = self.cvt_single_RGBA_to_RGB565(RGBAc2)
-                        c3 = self.cvt_single_RGBA_to_RGB565((0, 0, 0, 0))
-                else:
-                    c0 = colors[-1]
-                    c1 = colors[0]
-                    RGBAc0 = self.cvt_single_RGB565_to_RGBA(c0)
-                    RGBAc1 = self.cvt_single_RGB565_to_RGBA(c1)
-                    RGBAc2 = (
-                        (((2 * RGBAc0[0]) + RGBAc1[0]) // 3),
-                        (((2 * RGBAc0[1]) + RGBAc1[1]) // 3),
-                        (((2 * RGBAc0[2]) + RGBAc1[2]) // 3),
-                        255,
-                    )
-                    RGBAc3 = (
-                        ((RGBAc0[0] + (2 * RGBAc1[0])) // 3),
-                        ((RGBAc0[1] + (2 * RGBAc1[1])) // 3),
-                        ((RGBAc0[2] + (2 * RGBAc1[2])) // 3),
-                        255,
-                    )
-                    c2 = self.cvt_single_RGBA_to_RGB565(RGBAc2)
-                    c3 = self.cvt_single_RGBA_to_RGB565(RGBAc3)
-
-                cTable = 0b0
-                for i, color in enumerate(subBlockRGB565List):
-                    if color == "ALPHA":
-                        cTable = (cTable << 2) + 3
-                        continue
-
-                    diff = abs(color - c0)
-                    closest = 0
-
-                    if diff > abs(color - c1):
-                        diff = abs(color - c1)
-                        closest = 1
-                    if diff > abs(color - c2):
-                        diff = abs(color - c2)
-                        closest = 2
-                    if not transparency:
-                        if diff > abs(color - c3):
-                            closest = 3
-
-                    cTable = (cTable << 2) + closest
-
-                CMPRBytes += struct.pack(">H", c0)
-                CMPRBytes += struct.pack(">H", c1)
-                CMPRBytes += struct.pack(">I", cTable)
-
-        return CMPRBytes
-
-    def cvt_single_RGBA_to_RGB565(self, data: tuple[int, int, int, int]) -> int:
-        R = data[0]
-        G = data[1]
-        B = data[2]
-
-        conR = (R // 0x8) << 11
-        conG = (G // 0x4) << 5
-        conB = B // 0x8
-
-        RGB565 = conR | conG | conB
-
-        return RGB565
-
-    def cvt_single_RGB565_to_RGBA(self, data: int) -> tuple[int, int, int, int]:
-        R = ((data >> 11) & MASK5) * 0x8
-        G = ((data >> 5) & MASK6) * 0x4
-        B = ((data) & MASK5) * 0x8
-
-        return (R, G, B, 255)
-
-    def reorder_blocks(self, data: list) -> np.array:
-        blockHeight = IMAGE_FORMATS_BLOCK_HEIGHT[self.imageFormat]
-        blockWidth = IMAGE_FORMATS_BLOCK_WIDTH[self.imageFormat]
-        yBlocks = -(self.height // -blockHeight)
-        xBlocks = -(self.width // -blockWidth)
-
-        reorderedArray = np.empty(shape=(self.height, self.width, 4), dtype=np.uint8)
-
-        i = 0
-
-        for currentYBlock in range(yBlocks):
-            for currentXBlock in range(xBlocks):
-                for currentRow in range(blockHeight):
-                    for currentPixelInRow in range(blockWidth):
-                        currentData = data[i]
-                        reorderedArray[(currentYBlock * blockHeight) + currentRow][
-                            (currentXBlock * blockWidth) + currentPixelInRow
-                        ] = currentData
-                        i += 1
-
-        return reorderedArray
-
-    def reorder_blocks_back(self, data: np.array) -> list:
-        blockHeight = IMAGE_FORMATS_BLOCK_HEIGHT[self.imageFormat]
-        blockWidth = IMAGE_FORMATS_BLOCK_WIDTH[self.imageFormat]
-        yBlocks = -(self.height // -blockHeight)
-        xBlocks = -(self.width // -blockWidth)
-
-        reorderedList = []
-
-        for currentYBlock in range(yBlocks):
-            for currentXBlock in range(xBlocks):
-                for currentRow in range(blockHeight):
-                    for currentPixelInRow in range(blockWidth):
-                        currentPixInArray = data[
-                            (currentYBlock * blockHeight) + currentRow
-                        ][(currentXBlock * blockWidth) + currentPixelInRow]
-                        reorderedList.append(
-                            (
-                                currentPixInArray[0],
-                                currentPixInArray[1],
-                                currentPixInArray[2],
-                                currentPixInArray[3],
-                            )
-                        )
-
-        return reorderedList
+    def reorder_blocks_back(self, data: np.array) -> np.array:
+        """
+        Converts an image of shape (height, width, 4) into RGBA pixels in block order
+        """
+        return tile_blocks(
+            np.asarray(data)[: self.height, : self.width],
+            IMAGE_FORMATS_BLOCK_HEIGHT[self.imageFormat],
+            IMAGE_FORMATS_BLOCK_WIDTH[self.imageFormat],
+        )
@@ -1,9 +1,11 @@
-from .TEX0 import TEX0
+from .TEX0 import TEX0, PALETTE_IMAGE_FORMATS
 from .MDL0 import MDL0
+from .PLT0 import PLT0
 
 from io import BufferedIOBase
+import numpy as np
 import struct
-from typing import List
+from typing import Dict, List
 
 MAGIC_HEADER = b"bres"
 BOM_HEADER = b"\xfe\xff"
@@ -35,30 +37,34 @@ class IndexGroupNode(Node):
     def __init__(self, name: str):
         super().__init__("group", name=name)
         self.childNodes: List[Node] = []
+        self.childNodesByName: Dict[str, Node] = {}
 
     def add_child(self, newChild: Node):
-        if self.get_child(newChild.name) is not None:
+        if newChild.name in self.childNodesByName:
             print(f"{newChild.name} already exists in {self.name}")
             return
         self.childNodes.append(newChild)
+        self.childNodesByName[newChild.name] = newChild
 
     def get_child(self, childName: str) -> Node | None:
-        for child in self.childNodes:
-            if child.name == childName:
-                return child
-        return None
+        return self.childNodesByName.get(childName)
 
 
 class SubFileNode(Node):
     def __init__(self, fileType: str, name: str, dataOffset: int):
         super().__init__(nodeType=fileType, name=name)
         self.dataOffset = dataOffset
+        # the parsed header and decoded data, only filled in once they are needed
+        self.header: TEX0 | MDL0 | None = None
+        self.decodedData: np.array | None = None
 
 
 class BRRES:
     def __init__(self, dataBuffer: BufferedIOBase, rootGroupNode: IndexGroupNode):
         self.dataBuffer: BufferedIOBase = dataBuffer
         self.rootGroupNode: IndexGroupNode = rootGroupNode
+        # set once any subfile gets written, unmodified files don't need to be written back
+        self.modified: bool = False
 
     @staticmethod
     def parse_brres(dataBuffer: BufferedIOBase):
@@ -103,13 +109,7 @@ class BRRES:
             data_offset = struct.unpack(">L", data.read(4))[0]
 
             data.seek(group_start_offset + name_offset)
-
-            name = ""
-            while True:
-                part = data.read(1)
-                if part == b"\x00":
-                    break
-                name += str(part, "utf-8")
+            name = BRRES.read_name(data)
 
             data.seek(group_start_offset + data_offset)
 
@@ -131,6 +131,18 @@ class BRRES:
 
             indexGroupNode.add_child(entryNode)
 
+    @staticmethod
+    def read_name(data: BufferedIOBase) -> str:
+        name = b""
+        while True:
+            part = data.read(32)
+            end = part.find(b"\x00")
+            if end != -1 or not part:
+                name += part[:end] if end != -1 else part
+                break
+            name += part
+        return str(name, "utf-8")
+
     def get_file_node(self, path: str) -> SubFileNode:
         path = path.lstrip("/")
         currentNode: Node = self.rootGroupNode
@@ -139,13 +151,8 @@ class BRRES:
                 raise FileNotFoundError(
                     f"Invalid path: {path} in get_file_node- file not final part of path."
                 )
-            found = False
-            for node in currentNode.childNodes:
-                if node.name == part:
-                    currentNode = node
-                    found = True
-                    break
-            if not found:
+            currentNode = currentNode.get_child(part)
+            if currentNode is None:
                 raise FileNotFoundError(
                     f"Invalid path: {path} in get_file_node- {part} not found."
                 )
@@ -157,22 +164,38 @@ class BRRES:
 
         return currentNode
 
+    def get_file_header(self, file: SubFileNode) -> TEX0 | MDL0:
+        if file.header is None:
+            match file.nodeType:
+                case b"MDL0":
+                    file.header = MDL0.parse_MDL0(
+                        dataBuffer=self.dataBuffer, start_offset=file.dataOffset
+                    )
+                case b"TEX0":
+                    file.header = TEX0.parse_TEX0(
+                        dataBuffer=self.dataBuffer, start_offset=file.dataOffset
+                    )
+                    if file.header.imageFormat in PALETTE_IMAGE_FORMATS:
+                        file.header.palette = self.get_palette(file.name)
+                case _:
+                    raise Exception(f"Unsupported file type {file.nodeType}.")
+        return file.header
+
     def get_file_data(self, path: str) -> any:
         file = self.get_file_node(path=path)
-        dataOffset = file.dataOffset
 
         match file.nodeType:
             case b"MDL0":
-                mdl = MDL0.parse_MDL0(
-                    dataBuffer=self.dataBuffer, start_offset=dataOffset
-                )
-                return mdl
+                # the MDL0 collects its own patches, so keep handing out the same one
+                return self.get_file_header(file)
             case b"TEX0":
-                tex0: TEX0 = TEX0.parse_TEX0(
-                    dataBuffer=self.dataBuffer, start_offset=dataOffset
-                )
-                rawImageData = tex0.get_image_data()
-                return tex0.convert_raw_image_data_to_RGBA(data=rawImageData)
+                if file.decodedData is None:
+                    tex0: TEX0 = self.get_file_header(file)
+                    rawImageData = tex0.get_image_data()
+                    file.decodedData = tex0.convert_raw_image_data_to_RGBA(
+                        data=rawImageData
+                    )
+                return file.decodedData.copy()
             case b"SRT0":
                 raise Exception(f"Unsupported file type {file.nodeType}.")
             case b"CHR0":
@@ -205,10 +228,10 @@ class BRRES:
                 bytes = data.to_bytes()
                 self.dataBuffer.seek(dataOffset)
                 self.dataBuffer.write(bytes)
+                # the patches are part of the buffer now
+                data.patches.clear()
             case b"TEX0":
-                tex0: TEX0 = TEX0.parse_TEX0(
-                    dataBuffer=self.dataBuffer, start_offset=dataOffset
-                )
+                tex0: TEX0 = self.get_file_header(file)
                 rawImageData = tex0.convert_RGBA_to_raw_image_data(data=data)
 
                 if len(rawImageData) != tex0.numberOfBytesInImage:
@@ -218,6 +241,8 @@ class BRRES:
 
                 self.dataBuffer.seek(tex0.imageDataOffset)
                 self.dataBuffer.write(rawImageData)
+                # encoding can be lossy, so decode again if it's needed
+                file.decodedData = None
             case b"SRT0":
                 raise Exception(f"Unsupported file type {file.nodeType}.")
             case b"CHR0":
@@ -238,6 +263,36 @@ class BRRES:
                 raise FileNotFoundError(
                     f"Invalid subfile type {file.nodeType} in get_file_data."
                 )
+        self.modified = True
+
+    def get_file_bytes(self, path: str) -> bytes:
+        """returns the raw bytes of a subfile, without parsing or decoding it"""
+        file = self.get_file_node(path=path)
+        self.dataBuffer.seek(file.dataOffset + 4)
+        size = struct.unpack(">I", self.dataBuffer.read(4))[0]
+        self.dataBuffer.seek(file.dataOffset)
+        return self.dataBuffer.read(size)
+
+    def set_file_bytes(self, path: str, data: bytes):
+        """replaces the raw bytes of a subfile, the size can't change"""
+        file = self.get_file_node(path=path)
+        if len(data) != len(self.get_file_bytes(path)):
+            raise Exception(
+                "Cannot replace data- Supplied data not same length as original data."
+            )
+        self.dataBuffer.seek(file.dataOffset)
+        self.dataBuffer.write(data)
+        file.header = None
+        file.decodedData = None
+        self.modified = True
+
+    def get_palette(self, name: str):
+        # palettes are stored separately, with the same name as their texture
+        file = self.get_file_node(path=f"Palettes(NW4R)/{name}")
+        if file.nodeType != b"PLT0":
+            raise FileNotFoundError(f"{name} is not a palette.")
+        plt0 = PLT0.parse_PLT0(dataBuffer=self.dataBuffer, start_offset=file.dataOffset)
+        return plt0.get_palette_RGBA()
 
     def to_buffer(self) -> BufferedIOBase:
         self.dataBuffer.seek(0)
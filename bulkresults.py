@@ -0,0 +1,244 @@
+from __future__ import annotations
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import Dict, List, Tuple
+import multiprocessing
+import queue
+import sqlite3
+
+from hints.hint_types import GossipStoneHintWrapper
+from logic.constants import *
+from logic.fill_algo_common import FillStats
+from version import VERSION
+
+# results written in one transaction
+BATCH_SIZE = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS permalinks (
+    id INTEGER PRIMARY KEY,
+    permalink TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS seeds (
+    id INTEGER PRIMARY KEY,
+    seed INTEGER NOT NULL,
+    permalink_id INTEGER NOT NULL REFERENCES permalinks(id),
+    version TEXT NOT NULL,
+    hash TEXT,
+    success INTEGER NOT NULL,
+    error TEXT,
+    swaps INTEGER,
+    max_swap_depth INTEGER,
+    entrance_backtracks INTEGER
+);
+CREATE TABLE IF NOT EXISTS timings (
+    seed_id INTEGER NOT NULL REFERENCES seeds(id),
+    phase TEXT NOT NULL,
+    seconds REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS placements (
+    seed_id INTEGER NOT NULL REFERENCES seeds(id),
+    location TEXT NOT NULL,
+    item TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS required_dungeons (
+    seed_id INTEGER NOT NULL REFERENCES seeds(id),
+    dungeon TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sots_items (
+    seed_id INTEGER NOT NULL REFERENCES seeds(id),
+    goal TEXT NOT NULL,
+    item TEXT NOT NULL,
+    location TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS barren_regions (
+    seed_id INTEGER NOT NULL REFERENCES seeds(id),
+    region TEXT NOT NULL,
+    nonprogress INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hints (
+    seed_id INTEGER NOT NULL REFERENCES seeds(id),
+    stone TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    hint TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS seeds_by_permalink ON seeds(permalink_id, success);
+CREATE INDEX IF NOT EXISTS placements_by_item ON placements(item, location, seed_id);
+CREATE INDEX IF NOT EXISTS placements_by_seed ON placements(seed_id);
+CREATE INDEX IF NOT EXISTS sots_items_by_item ON sots_items(item, location);
+CREATE INDEX IF NOT EXISTS barren_regions_by_region ON barren_regions(region);
+"""
+
+FILL_STATS_COLUMNS = [stat.name for stat in fields(FillStats)]
+
+
+@dataclass
+class SeedResult:
+    """
+    Outcome of a single bulk seed, only plain data so it can be sent to the writer process.
+    Seeds without spoiler log only record their outcome
+    """
+
+    seed: int
+    permalink: str
+    version: str
+    hash: str | None = None
+    error: str | None = None
+    fill_stats: FillStats | None = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    item_locations: Dict[EIN, EIN] = field(default_factory=dict)
+    required_dungeons: List[str] = field(default_factory=list)
+    # (goal, item, location)
+    sots_items: List[Tuple[str, EIN, EIN]] = field(default_factory=list)
+    # (region, is only nonprogress)
+    barren_regions: List[Tuple[str, bool]] = field(default_factory=list)
+    # (stone, position on the stone, spoiler log text)
+    hints: List[Tuple[EIN, int, str]] = field(default_factory=list)
+
+    @classmethod
+    def from_randomizer(cls, rando) -> SeedResult:
+        result = cls(
+            rando.seed,
+            rando.options.get_permalink(exclude_seed=True),
+            VERSION,
+            rando.randomizer_hash,
+            fill_stats=rando.fill_stats,
+            timings=dict(rando.timings),
+        )
+        if rando.no_logs:
+            return result
+
+        placement = rando.logic.placement
+        spoiler = rando.spoiler
+        norm = rando.areas.prettify
+        result.item_locations = dict(placement.locations)
+        result.required_dungeons = list(spoiler.required_dungeons)
+        result.sots_items = [
+            (goal, item, placement.items[item])
+            for goal, items in spoiler.sots_items.items()
+            for item in items
+        ]
+        barren, nonprogress = spoiler.barren_nonprogress
+        result.barren_regions = [(region, False) for region in barren] + [
+            (region, True) for region in nonprogress
+        ]
+        for stone, hint in spoiler.hints.items():
+            stone_hints = (
+                hint.hints if isinstance(hint, GossipStoneHintWrapper) else [hint]
+            )
+            result.hints.extend(
+                (stone, position, stone_hint.to_spoiler_log_text(norm))
+                for position, stone_hint in enumerate(stone_hints)
+            )
+        return result
+
+    @classmethod
+    def from_error(cls, seed: int, options, error: Exception, rando=None) -> SeedResult:
+        # the phases that finished before the error are still recorded
+        return cls(
+            seed,
+            options.get_permalink(exclude_seed=True),
+            VERSION,
+            rando.randomizer_hash if rando is not None else None,
+            error=f"{type(error).__name__}: {error}",
+            timings=dict(rando.timings) if rando is not None else {},
+        )
+
+
+class ResultDatabase:
+    """Writes SeedResults into a sqlite database, a batch of results per transaction"""
+
+    def __init__(self, path: Path):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        self.permalink_ids: Dict[str, int] = {}
+
+    def permalink_id(self, permalink: str) -> int:
+        if (permalink_id := self.permalink_ids.get(permalink)) is None:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO permalinks(permalink) VALUES (?)", (permalink,)
+            )
+            (permalink_id,) = self.connection.execute(
+                "SELECT id FROM permalinks WHERE permalink = ?", (permalink,)
+            ).fetchone()
+            self.permalink_ids[permalink] = permalink_id
+        return permalink_id
+
+    def write(self, results: List[SeedResult]):
+        with self.connection:
+            for result in results:
+                self._insert(result)
+
+    def _insert(self, result: SeedResult):
+        stats = asdict(result.fill_stats) if result.fill_stats is not None else {}
+        seed_id = self.connection.execute(
+            f"INSERT INTO seeds(seed, permalink_id, version, hash, success, error, {', '.join(FILL_STATS_COLUMNS)}) "
+            f"VALUES (?, ?, ?, ?, ?, ?{', ?' * len(FILL_STATS_COLUMNS)})",
+            (
+                result.seed,
+                self.permalink_id(result.permalink),
+                result.version,
+                result.hash,
+                result.error is None,
+                result.error,
+                *(stats.get(column) for column in FILL_STATS_COLUMNS),
+            ),
+        ).lastrowid
+        rows = {
+            "timings(seed_id, phase, seconds)": result.timings.items(),
+            "placements(seed_id, location, item)": result.item_locations.items(),
+            "required_dungeons(seed_id, dungeon)": (
+                (dungeon,) for dungeon in result.required_dungeons
+            ),
+            "sots_items(seed_id, goal, item, location)": result.sots_items,
+            "barren_regions(seed_id, region, nonprogress)": result.barren_regions,
+            "hints(seed_id, stone, position, hint)": result.hints,
+        }
+        for table, values in rows.items():
+            placeholders = ", ".join("?" * (table.count(",") + 1))
+            self.connection.executemany(
+                f"INSERT INTO {table} VALUES ({placeholders})",
+                ((seed_id, *value) for value in values),
+            )
+
+    def close(self):
+        self.connection.close()
+
+
+def write_results(path: Path, results: multiprocessing.Queue):
+    """runs in the writer process until None is received"""
+    database = ResultDatabase(path)
+    batch = []
+    while True:
+        try:
+            result = results.get(timeout=1 if batch else None)
+        except queue.Empty:
+            # nothing new for a while, write what's there instead of waiting for a full batch
+            database.write(batch)
+            batch = []
+            continue
+        if result is None:
+            break
+        batch.append(result)
+        if len(batch) >= BATCH_SIZE:
+            database.write(batch)
+            batch = []
+    database.write(batch)
+    database.close()
+
+
+class ResultWriter:
+    """
+    The single process writing to the database, bulk workers put their results into queue
+    """
+
+    def __init__(self, path: Path):
+        self.queue = multiprocessing.Queue()
+        self.process = multiprocessing.Process(
+            target=write_results, args=(path, self.queue)
+        )
+        self.process.start()
+
+    def close(self):
+        self.queue.put(None)
+        self.process.join()
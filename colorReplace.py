@@ -1,59 +1,93 @@
 import cv2
 import numpy as np
 import colorsys
+import os
 
+# decoded masks, keyed by path and file stats so edited masks get reloaded
+# most masks are only black and white, those are stored with 1 bit per pixel
+_mask_cache: dict = {}
 
-def replace_mask(texture: np.mat, mask: np.mat, new_color: str) -> np.mat:
-    mask_inv = cv2.bitwise_not(mask)
 
-    new_color = cvt_hex_to_RGBA(new_color)
-    new_color = [i / 255 for i in new_color]
+def process_texture(texture: np.array, maskPaths: list, colors: list) -> np.array:
+    masks = get_masks_from_mask_paths(maskPaths=maskPaths)
+    return recolour_texture(texture=texture, masks=masks, colors=colors)
 
-    unmaskedTexture = cv2.bitwise_and(texture, texture, mask=mask)
 
-    maskedTexture = cv2.bitwise_or(texture, texture, mask=mask_inv)
-    maskedTexture = cv2.cvtColor(maskedTexture, cv2.COLOR_BGR2HSV)
-    hChannel = maskedTexture[:, :, 0]
-    sChannel = maskedTexture[:, :, 1]
-    vChannel = maskedTexture[:, :, 2]
-    targetHSV = colorsys.rgb_to_hsv(new_color[0], new_color[1], new_color[2])
-    hChannel = (targetHSV[0] * 180) + (0 * hChannel)
-    sChannel = (targetHSV[1] * 255) + (0 * sChannel)
-    vChannel = targetHSV[2] * (vChannel * (255 / vChannel.max()))
-    maskedTexture[:, :, 0] = hChannel
-    maskedTexture[:, :, 1] = sChannel
-    maskedTexture[:, :, 2] = vChannel
+def recolour_texture(texture: np.array, masks: list, colors: list) -> np.array:
+    # Masks are applied in order, a pixel is recoloured where its mask is 0 and
+    # the recolour is added onto the pixel where the mask is between 0 and 255.
+    # The recolour keeps the hue and saturation of the new color and scales its
+    # value by the pixel's value, relative to the brightest pixel of the mask,
+    # so for every mask the result only depends on the value of the pixel and
+    # can be looked up instead of converting the whole texture to HSV and back.
+    pixels = texture.reshape(-1, texture.shape[-1]).copy()
+    values = pixels[:, :3].max(axis=1)
 
-    maskedTexture = cv2.cvtColor(maskedTexture, cv2.COLOR_HSV2BGR)
-    maskedTexture = cv2.cvtColor(maskedTexture, cv2.COLOR_BGR2RGBA)
-    maskedTexture = cv2.bitwise_or(maskedTexture, maskedTexture, mask=mask_inv)
+    for mask, color in zip(masks, colors):
+        mask = mask.reshape(-1)
+        touched = np.flatnonzero(mask != 255)
+        if touched.size == 0:
+            continue
+        touched_values = values[touched]
+        recoloured = get_recolour_lut(color, touched_values.max())[touched_values]
+        blended = mask[touched] != 0
+        recoloured[blended] += pixels[touched[blended]]
 
-    final = maskedTexture + unmaskedTexture
+        pixels[touched] = recoloured
+        values[touched] = recoloured[:, :3].max(axis=1)
 
-    return final
+    return pixels.reshape(texture.shape)
 
 
-def process_texture(texture: np.array, maskPaths: list, colors: list) -> np.array:
-    masks = get_masks_from_mask_paths(maskPaths=maskPaths)
-    i = 0
-    modified_texture: np.array = texture
-    for i, m in enumerate(masks):
-        modified_texture = replace_mask(
-            texture=modified_texture, mask=m, new_color=colors[i]
-        )
+def get_recolour_lut(new_color: str, max_value: np.uint8) -> np.array:
+    new_color = cvt_hex_to_RGBA(new_color)
+    new_color = [i / 255 for i in new_color]
+    targetHSV = colorsys.rgb_to_hsv(new_color[0], new_color[1], new_color[2])
+
+    # one pixel per possible value, computed with the same types as a full texture
+    # would be so the rounding matches
+    vChannel = np.arange(256, dtype=np.uint8)
+    hsv = np.zeros((1, 256, 3), dtype=np.uint8)
+    hsv[0, :, 0] = (targetHSV[0] * 180) + (0 * vChannel)
+    hsv[0, :, 1] = (targetHSV[1] * 255) + (0 * vChannel)
+    if max_value != 0:
+        hsv[0, :, 2] = targetHSV[2] * (vChannel * (255 / max_value))
 
-    return modified_texture
+    lut = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+    lut = cv2.cvtColor(lut, cv2.COLOR_BGR2RGBA)
+    return lut[0]
 
 
 def get_masks_from_mask_paths(maskPaths: list) -> list:
     masks: list = []
     for path in maskPaths:
-        mask = cv2.imread(path, 0)
-        masks.append(mask)
+        masks.append(load_mask(path))
 
     return masks
 
 
+def load_mask(path) -> np.array:
+    stat = os.stat(path)
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _mask_cache:
+        _mask_cache[key] = pack_mask(cv2.imread(str(path), 0))
+    return unpack_mask(_mask_cache[key])
+
+
+def pack_mask(mask: np.array) -> tuple:
+    if np.isin(mask, (0, 255)).all():
+        return (mask.shape, True, np.packbits(mask == 255))
+    return (mask.shape, False, mask)
+
+
+def unpack_mask(packed: tuple) -> np.array:
+    shape, is_bits, data = packed
+    if not is_bits:
+        return data.copy()
+    bits = np.unpackbits(data, count=int(np.prod(shape)))
+    return (bits * 255).astype(np.uint8).reshape(shape)
+
+
 def cvt_hex_to_RGBA(hex: str) -> list:
     RGBA = []
     for i in (0, 2, 4, 6):
@@ -0,0 +1,204 @@
+from hashlib import sha1
+from pathlib import Path
+from typing import Iterator, List, Tuple
+import json
+import os
+import struct
+import zipfile
+
+from sslib.overlay import ExtractOverlay, ExtractWriter
+
+NOP = lambda *args, **kwargs: None
+
+DELTA_VERSION = 1
+DELTA_MANIFEST_NAME = "manifest.json"
+# files are compared in blocks of this size, only changed blocks are stored
+BLOCK_SIZE = 0x1000
+# how many blocks are compared at once before looking at the single blocks
+CHUNK_BLOCKS = 0x100
+# a block run is stored as (first block, number of blocks) followed by the data
+BLOCK_RUN = struct.Struct(">II")
+
+
+class DeltaPackageException(Exception):
+    pass
+
+
+def iter_chunks(path: Path, size: int) -> Iterator[bytes]:
+    with path.open("rb") as f:
+        while chunk := f.read(size):
+            yield chunk
+
+
+def hash_file(path: Path) -> str:
+    digest = sha1()
+    for chunk in iter_chunks(path, BLOCK_SIZE * CHUNK_BLOCKS):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def diff_blocks(
+    vanilla_path: Path, modified_path: Path
+) -> Tuple[List[Tuple[int, bytes]], str, str]:
+    """
+    Compares both files block by block, returns runs of changed blocks as (first block, data)
+    and the hashes of both files
+    """
+    runs = []
+    vanilla_hash = sha1()
+    modified_hash = sha1()
+    chunk_size = BLOCK_SIZE * CHUNK_BLOCKS
+    with vanilla_path.open("rb") as vanilla, modified_path.open("rb") as modified:
+        chunk_index = 0
+        while True:
+            vanilla_chunk = vanilla.read(chunk_size)
+            modified_chunk = modified.read(chunk_size)
+            if not modified_chunk:
+                # the rest of vanilla still needs to be hashed
+                while vanilla_chunk:
+                    vanilla_hash.update(vanilla_chunk)
+                    vanilla_chunk = vanilla.read(chunk_size)
+                break
+            vanilla_hash.update(vanilla_chunk)
+            modified_hash.update(modified_chunk)
+            if vanilla_chunk != modified_chunk:
+                for offset in range(0, len(modified_chunk), BLOCK_SIZE):
+                    block = modified_chunk[offset : offset + BLOCK_SIZE]
+                    if block == vanilla_chunk[offset : offset + BLOCK_SIZE]:
+                        continue
+                    block_index = chunk_index * CHUNK_BLOCKS + offset // BLOCK_SIZE
+                    if runs and runs[-1][0] + len(runs[-1][1]) // BLOCK_SIZE == (
+                        block_index
+                    ):
+                        runs[-1] = (runs[-1][0], runs[-1][1] + block)
+                    else:
+                        runs.append((block_index, block))
+            chunk_index += 1
+    return runs, vanilla_hash.hexdigest(), modified_hash.hexdigest()
+
+
+def write_delta_package(
+    extract_writer: ExtractWriter,
+    delta_path: Path,
+    progress_cb=NOP,
+):
+    """
+    Writes all files the extract writer patched that differ from actual-extract to a zip file,
+    changed files are stored as a whole or only their changed blocks, whatever is smaller.
+    Only those files are compared, the rest of modified-extract is never read
+    """
+    actual_extract_path = extract_writer.actual_extract_path
+    modified_extract_path = extract_writer.modified_extract_path
+
+    manifest = {"version": DELTA_VERSION, "block-size": BLOCK_SIZE, "files": {}}
+    modified_paths = sorted(p for p in extract_writer.patched_paths if p.is_file())
+    with zipfile.ZipFile(delta_path, "w", zipfile.ZIP_DEFLATED) as delta:
+        for i, modified_path in enumerate(modified_paths):
+            progress_cb("writing delta...", i / len(modified_paths) * 100)
+            relative_path = modified_path.relative_to(modified_extract_path)
+            key = relative_path.as_posix()
+            vanilla_path = actual_extract_path / relative_path
+
+            if not vanilla_path.is_file():
+                manifest["files"][key] = {
+                    "type": "full",
+                    "size": modified_path.stat().st_size,
+                    "sha1": hash_file(modified_path),
+                }
+                delta.write(modified_path, f"files/{key}")
+                continue
+            # links to actual-extract can't be different
+            if os.path.samefile(vanilla_path, modified_path):
+                continue
+
+            runs, vanilla_hash, modified_hash = diff_blocks(vanilla_path, modified_path)
+            size = modified_path.stat().st_size
+            if not runs and size == vanilla_path.stat().st_size:
+                continue
+
+            if sum(len(data) for _, data in runs) < size // 2:
+                manifest["files"][key] = {
+                    "type": "blocks",
+                    "size": size,
+                    "sha1": modified_hash,
+                    "base-sha1": vanilla_hash,
+                }
+                with delta.open(f"blocks/{key}", "w") as f:
+                    for block_index, data in runs:
+                        f.write(
+                            BLOCK_RUN.pack(block_index, -(len(data) // -BLOCK_SIZE))
+                        )
+                        f.write(data)
+            else:
+                manifest["files"][key] = {
+                    "type": "full",
+                    "size": size,
+                    "sha1": modified_hash,
+                }
+                delta.write(modified_path, f"files/{key}")
+
+        manifest["deleted"] = sorted(
+            p.relative_to(modified_extract_path).as_posix()
+            for p in extract_writer.removed_paths
+            if (actual_extract_path / p.relative_to(modified_extract_path)).is_file()
+        )
+        delta.writestr(DELTA_MANIFEST_NAME, json.dumps(manifest, indent=2))
+    progress_cb("writing delta...", 100)
+
+
+def apply_delta_package(
+    delta_path: Path,
+    actual_extract_path: Path,
+    modified_extract_path: Path,
+    progress_cb=NOP,
+):
+    """
+    Rebuilds modified-extract from actual-extract and a delta package,
+    files that aren't in the delta package are linked to actual-extract
+    """
+    with zipfile.ZipFile(delta_path, "r") as delta:
+        manifest = json.loads(delta.read(DELTA_MANIFEST_NAME))
+        if manifest["version"] != DELTA_VERSION:
+            raise DeltaPackageException(
+                f"Unsupported delta package version {manifest['version']}."
+            )
+        block_size = manifest["block-size"]
+        files = manifest["files"]
+        deleted = set(manifest["deleted"])
+
+        overlay = ExtractOverlay(actual_extract_path, modified_extract_path)
+        vanilla_paths = [p for p in actual_extract_path.rglob("*") if p.is_file()]
+        for vanilla_path in vanilla_paths:
+            key = vanilla_path.relative_to(actual_extract_path).as_posix()
+            if key not in files and key not in deleted:
+                overlay.restore_vanilla(modified_extract_path / key)
+        for key in deleted:
+            overlay.remove(modified_extract_path / key)
+
+        for i, (key, entry) in enumerate(files.items()):
+            progress_cb("applying delta...", i / len(files) * 100)
+            path = modified_extract_path / key
+            if entry["type"] == "full":
+                overlay.write_bytes(path, delta.read(f"files/{key}"))
+            else:
+                if hash_file(actual_extract_path / key) != entry["base-sha1"]:
+                    raise DeltaPackageException(
+                        f"{key} in actual-extract doesn't match the one the delta package was made for."
+                    )
+                # the blocks apply to the vanilla file, not to what an earlier run left there
+                overlay.restore_vanilla(path)
+                with overlay.open_for_update(path) as f, delta.open(
+                    f"blocks/{key}"
+                ) as blocks:
+                    f.truncate(entry["size"])
+                    while header := blocks.read(BLOCK_RUN.size):
+                        block_index, block_count = BLOCK_RUN.unpack(header)
+                        end = min(
+                            (block_index + block_count) * block_size, entry["size"]
+                        )
+                        f.seek(block_index * block_size)
+                        f.write(blocks.read(end - block_index * block_size))
+            if hash_file(path) != entry["sha1"]:
+                raise DeltaPackageException(f"{key} doesn't match after applying.")
+        overlay.finish()
+    progress_cb("applying delta...", 100)
@@ -2,10 +2,17 @@ import sys
 import re
 import os
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
 import shutil
 
 import disc_riider_py
 
+from paths import RANDO_ROOT_PATH
+from sslib.allpatch import create_oarc_cache
+from sslib.overlay import ExtractOverlay
+from yaml_files import yaml_load
+
 WIT_PROGRESS_REGEX = re.compile(rb" +([0-9]+)%.*")
 CLEAN_NTSC_U_1_00_DOL_HASH = "450a6806f46d59dcf8278db08e06f94865a4b18a"
 
@@ -20,6 +27,9 @@ WRONG_VERSION_DOL_HASHES = {
 
 NOP = lambda *args, **kwargs: None
 
+COPY_WORKERS = min(8, os.cpu_count() or 1)
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
 # currently, only win and linux (both 64bit) are supported
 IS_WINDOWS = sys.platform == "win32"
 
@@ -28,6 +38,50 @@ class WrongChecksumException(Exception):
     pass
 
 
+def copy_file(src: Path, dst: Path, on_progress=NOP):
+    """copies the file contents and permissions, calls on_progress with the number of bytes copied"""
+    with src.open("rb") as fsrc, dst.open("wb") as fdst:
+        done = False
+        if hasattr(os, "copy_file_range"):
+            try:
+                # copies inside the kernel, without reading the data into python
+                while copied := os.copy_file_range(
+                    fsrc.fileno(), fdst.fileno(), COPY_CHUNK_SIZE
+                ):
+                    on_progress(copied)
+                done = True
+            except OSError:
+                # not supported between these filesystems, continue with a normal copy
+                # from the current file positions
+                pass
+        while not done and (chunk := fsrc.read(COPY_CHUNK_SIZE)):
+            fdst.write(chunk)
+            on_progress(len(chunk))
+    shutil.copymode(src, dst)
+
+
+class ByteProgress:
+    """
+    Sums up the copied bytes from all workers, only reports when the full percentage changes
+    """
+
+    def __init__(self, action: str, total_bytes: int, progress_cb=NOP):
+        self.action = action
+        self.total_bytes = max(total_bytes, 1)
+        self.progress_cb = progress_cb
+        self.done_bytes = 0
+        self.last_percent = 0
+        self.lock = Lock()
+
+    def advance(self, byte_count: int):
+        with self.lock:
+            self.done_bytes += byte_count
+            percent = self.done_bytes * 100 // self.total_bytes
+            if percent > self.last_percent:
+                self.last_percent = percent
+                self.progress_cb(self.action, percent)
+
+
 class ExtractManager:
     def __init__(self, rootpath: Path):
         self.rootpath = rootpath
@@ -65,33 +119,68 @@ class ExtractManager:
             self.rootpath / "modified-extract" / "DATA" / "sys" / "main.dol"
         ).is_file()
 
-    def copy_to_modified(self, progress_cb=NOP):
+    def copy_to_modified(self, progress_cb=NOP, workers=COPY_WORKERS):
         # check if it already exists
         if not self.modified_extract_already_exists():
             progress_cb("copy to modified...", 0)
-            src = str(self.rootpath / "actual-extract")
-            dest = str(self.rootpath / "modified-extract")
-            file_count = 0
+            src = self.rootpath / "actual-extract"
+            dest = self.rootpath / "modified-extract"
+            copies = []
             for path, dirs, filenames in os.walk(src):
-                file_count += len(filenames)
-
-            def makedirs(dest):
-                if not os.path.exists(dest):
-                    os.makedirs(dest)
+                dest_dir = dest / Path(path).relative_to(src)
+                dest_dir.mkdir(parents=True, exist_ok=True)
+                for filename in filenames:
+                    src_file = Path(path) / filename
+                    copies.append(
+                        (src_file, dest_dir / filename, src_file.stat().st_size)
+                    )
+            # biggest files first, so the workers don't wait on a single big file at the end
+            copies.sort(key=lambda copy: copy[2], reverse=True)
+            progress = ByteProgress(
+                "copy to modified...", sum(size for _, _, size in copies), progress_cb
+            )
+            with ThreadPoolExecutor(workers) as executor:
+                # list to raise errors from the workers
+                list(
+                    executor.map(
+                        lambda copy: copy_file(copy[0], copy[1], progress.advance),
+                        copies,
+                    )
+                )
 
-            makedirs(dest)
-            num_copied = 0
-            # manual copy of each file to show progress
-            for path, dirs, filenames in os.walk(src):
-                for directory in dirs:
-                    destDir = path.replace(src, dest)
-                    makedirs(os.path.join(destDir, directory))
-                for sfile in filenames:
-                    srcFile = os.path.join(path, sfile)
-                    destFile = os.path.join(path.replace(src, dest), sfile)
-                    shutil.copy(srcFile, destFile)
-                    num_copied += 1
-                    progress_cb("copy to modified...", (num_copied / file_count) * 100)
+    def link_to_modified(self, progress_cb=NOP):
+        """
+        sets up modified-extract as an overlay, with links to actual-extract instead of copies,
+        patching in overlay mode then only writes the files that actually change
+        """
+        if not self.modified_extract_already_exists():
+            progress_cb("link to modified...", 0)
+            ExtractOverlay(
+                self.rootpath / "actual-extract", self.rootpath / "modified-extract"
+            ).setup(progress_cb)
+
+    def populate_modified(self, overlay=False, warm_up_cache=True, progress_cb=NOP):
+        """
+        sets up modified-extract (as a copy or an overlay), while the oarc cache needed for patching
+        is built from actual-extract at the same time
+        """
+        with ThreadPoolExecutor(1) as executor:
+            warm_up = (
+                executor.submit(self.warm_up_oarc_cache) if warm_up_cache else None
+            )
+            if overlay:
+                self.link_to_modified(progress_cb)
+            else:
+                self.copy_to_modified(progress_cb)
+            if warm_up is not None:
+                warm_up.result()
+
+    def warm_up_oarc_cache(self):
+        create_oarc_cache(
+            self.rootpath / "actual-extract",
+            self.rootpath / "oarc",
+            yaml_load(RANDO_ROOT_PATH / "extracts.yaml"),
+        )
 
     def repack_game(self, modified_iso_dir: Path, progress_cb=NOP):
         modified_iso_path = modified_iso_dir / "SOUE01.iso"
@@ -4,7 +4,6 @@ import math
 import random
 from collections import Counter, OrderedDict, defaultdict
 
-import yaml
 import json
 from io import BytesIO
 from enum import IntEnum
@@ -14,17 +13,23 @@ import struct
 
 import numpy as np
 import nlzss11
-from brresTools.MDL0 import MDL0
+from brresTools.MDL0 import MDL0, VERTEX_SECTION
 from brresTools.brres import BRRES
 from sslib import AllPatcher, U8File
 from sslib.msb import process_control_sequences
-from sslib.utils import write_bytes_create_dirs, encodeBytes, toBytes
+from sslib.utils import encodeBytes, toBytes
 from sslib.fs_helpers import write_str, write_u16, write_float, write_u8
 from sslib.dol import DOL
 from sslib.rel import REL
 from paths import RANDO_ROOT_PATH
 from tboxSubtypes import tboxSubtypes
 from musicrando import music_rando
+from patchplan import (
+    OptionRequirementFilter,
+    index_event_patches,
+    index_stage_patches,
+    load_patch_sources,
+)
 
 from logic.bool_expression import check_static_option_req
 from logic.constants import *
@@ -32,6 +37,7 @@ from logic.placement_file import PlacementFile
 from util.flag_mapping_tables import get_storyflag_writer, get_itemflag_writer
 from yaml_files import yaml_load
 
+from asm.patch_bundle import load_patch_bundle
 from asm.patcher import apply_dol_patch, apply_rel_patch
 
 from util.textbox_utils import (
@@ -46,6 +52,22 @@ TOTAL_EVENT_FILES = 6
 # arc cache, main.dol, rels, objectpack
 GAMEPATCH_TOTAL_STEP_COUNT = TOTAL_EVENT_FILES + TOTAL_STAGE_FILES + 4
 
+ASM_PATCH_BUNDLE_CACHE_NAME = "asm-patches.pickle"
+
+# patch types handled by bzs_patch_func, only these make a stage or room bzs worth parsing
+BZS_PATCH_TYPES = (
+    "layeroverride",
+    "pathadd",
+    "objadd",
+    "objpatch",
+    "objmove",
+    "objdelete",
+    "objnadd",
+)
+# patch types handled by flow_patch and text_patch
+FLOW_PATCH_TYPES = ("flowpatch", "flowadd", "switchadd", "entryadd")
+TEXT_PATCH_TYPES = ("textpatch", "textadd")
+
 DEFAULT_SOBJ = OrderedDict(
     params1=0,
     params2=0,
@@ -1455,8 +1477,12 @@ class GamePatcher:
                 "selected-loftwing-model-pack"
             ],
             copy_unmodified=False,
+            overlay=self.options["overlay-extract"],
         )
         self.text_labels = {}
+        self.option_requirement_filter = OptionRequirementFilter(
+            self.placement_file.options, self.placement_file.required_dungeons
+        )
 
     def do_all_gamepatches(self):
         self.load_base_patches()
@@ -1484,6 +1510,7 @@ class GamePatcher:
 
         self.patcher.set_bzs_patch(self.bzs_patch_func)
         self.patcher.set_room_brres_patch(self.room_brres_patch_func)
+        self.build_patch_plan()
         self.patcher.set_event_patch(self.flow_patch)
         self.patcher.set_event_text_patch(self.text_patch)
         self.patcher.progress_callback = self.progress_callback
@@ -1496,19 +1523,47 @@ class GamePatcher:
         self.do_patch_custom_dowsing_images()
 
         music_rando(
-            self.placement_file, self.modified_extract_path, self.actual_extract_path
+            self.placement_file,
+            self.modified_extract_path,
+            self.actual_extract_path,
+            self.patcher.extract_writer,
+        )
+        self.patcher.extract_writer.finish()
+
+    def build_patch_plan(self):
+        # index all stage and event patches once all of them are added, evaluating option
+        # requirements only once, and tell the patcher which files can be patched at all,
+        # everything else doesn't need to be parsed
+        self.stage_patch_index = index_stage_patches(
+            self.patches, self.option_requirement_filter
+        )
+        self.event_patch_index = index_event_patches(
+            self.eventpatches, self.option_requirement_filter
         )
 
+        bzs_interest = set(self.rando_stagepatches.keys())
+        room_brres_interest = set()
+        for stage, room in self.stage_patch_index.keys():
+            if self.stage_patch_index.get((stage, room), *BZS_PATCH_TYPES):
+                bzs_interest.add((stage, room))
+            if self.stage_patch_index.get((stage, room), "roomBRRESpatch"):
+                room_brres_interest.add((stage, room))
+        self.patcher.set_bzs_patch_interest(bzs_interest)
+        self.patcher.set_room_brres_patch_interest(room_brres_interest)
+
+        # 003-ItemGet always gets patched for progressive items
+        event_interest = set(self.rando_eventpatches.keys()) | {"003-ItemGet"}
+        event_text_interest = set()
+        for filename in self.event_patch_index.keys():
+            if self.event_patch_index.get(filename, *FLOW_PATCH_TYPES):
+                event_interest.add(filename)
+            if self.event_patch_index.get(filename, *TEXT_PATCH_TYPES):
+                event_text_interest.add(filename)
+        self.patcher.set_event_patch_interest(event_interest)
+        self.patcher.set_event_text_patch_interest(event_text_interest)
+
     def filter_option_requirement(self, entry):
-        return not (
-            isinstance(entry, dict)
-            and "onlyif" in entry
-            and not check_static_option_req(
-                entry["onlyif"],
-                self.placement_file.options,
-                self.placement_file.required_dungeons,
-            )
-        )
+        return self.option_requirement_filter(entry)
 
     def add_patch_to_stage(self, stage, stagepatch):
         if stage not in self.patches:
@@ -1522,8 +1577,7 @@ class GamePatcher:
         self.eventpatches[eventfile].append(eventpatch)
 
     def load_base_patches(self):
-        self.patches = yaml_load(RANDO_ROOT_PATH / "patches.yaml")
-        self.eventpatches = yaml_load(RANDO_ROOT_PATH / "eventpatches.yaml")
+        self.patches, self.eventpatches = load_patch_sources()
 
         filtered_storyflags = []
         for storyflag in self.patches["global"]["startstoryflags"]:
@@ -1559,6 +1613,9 @@ class GamePatcher:
         )
 
         # assembly patches
+        self.asm_patch_bundle = load_patch_bundle(
+            self.exe_root_path / ASM_PATCH_BUNDLE_CACHE_NAME
+        )
         self.all_asm_patches = defaultdict(OrderedDict)
         self.add_asm_patch("custom_funcs")
         self.add_asm_patch("ss_necessary")
@@ -1652,23 +1709,16 @@ class GamePatcher:
             patch[7] = bk_angle_bytes[3]
 
         # for asm, custom symbols
-        with (RANDO_ROOT_PATH / "asm" / "custom_symbols.txt").open("r") as f:
-            self.custom_symbols = yaml.safe_load(f)
+        self.custom_symbols = self.asm_patch_bundle.custom_symbols
         self.main_custom_symbols = self.custom_symbols.get("main.dol", {})
-        with (RANDO_ROOT_PATH / "asm" / "original_symbols.txt").open("r") as f:
-            self.original_symbols = yaml.safe_load(f)
+        self.original_symbols = self.asm_patch_bundle.original_symbols
         self.main_original_symbols = self.original_symbols.get("main.dol", {})
 
         # for asm, free space start offset
-        with (RANDO_ROOT_PATH / "asm" / "free_space_start_offsets.txt").open("r") as f:
-            self.free_space_start_offsets = yaml.safe_load(f)
+        self.free_space_start_offsets = self.asm_patch_bundle.free_space_start_offsets
 
     def add_asm_patch(self, name):
-        with (RANDO_ROOT_PATH / "asm" / "patch_diffs" / f"{name}_diff.txt").open(
-            "r"
-        ) as f:
-            asm_patch_file_data = yaml.safe_load(f)
-        for exec_file, patches in asm_patch_file_data.items():
+        for exec_file, patches in self.asm_patch_bundle.get_patch(name).items():
             self.all_asm_patches[exec_file].update(patches)
 
     def add_entrance_rando_patches(self):
@@ -2796,13 +2846,7 @@ class GamePatcher:
                     )
 
     def room_brres_patch_func(self, brres, stage, room):
-        stagepatches = self.patches.get(stage, [])
-        stagepatches = list(
-            filter(
-                lambda p: p["type"] == "roomBRRESpatch" and p["room"] == room,
-                stagepatches,
-            )
-        )
+        stagepatches = self.stage_patch_index.get((stage, room), "roomBRRESpatch")
 
         if not stagepatches:
             return None
@@ -2820,64 +2864,49 @@ class GamePatcher:
         # but unfortunately the vertices are a bit shuffled. So we identify them via
         # their distance to the respective center
         radius_sq = 300**2
-        dist_sq = (
-            lambda c, v: (v[0] - c[0]) ** 2 + (v[1] - c[1]) ** 2 + (v[2] - c[2]) ** 2
+        centers = np.array(
+            [
+                [149.0543, -447.1241, -703.2646],
+                [-551.6544, -447.1241, 851.0332],
+                [-0.02011, -447.1241, 1241.0332],
+                [249.9797, -447.1241, 651.0331],
+            ]
         )
-        centers = [
-            [149.0543, -447.1241, -703.2646],
-            [-551.6544, -447.1241, 851.0332],
-            [-0.02011, -447.1241, 1241.0332],
-            [249.9797, -447.1241, 651.0331],
-        ]
+
+        def wheel_masks(vertices):
+            # (wheel, vertex) -> whether the vertex belongs to the wheel
+            dist_sq = ((vertices[None, :, :] - centers[:, None, :]) ** 2).sum(axis=2)
+            return dist_sq < radius_sq
 
         mdl: MDL0 = brres.get_file_data("3DModels(NW4R)/model0")
 
         vertices = mdl.get_vertices("polySurface3711483__A_D301_HintMark_b01_1")
-        vertex_index_lists = [
-            [v_i for v_i, v in enumerate(vertices) if dist_sq(center, v) < radius_sq]
-            for center in centers
-        ]
+        masks = wheel_masks(vertices)
 
         new_vertices = vertices.copy()
-
         for old_wheel_idx, wheel_idx in enumerate(ssh_puzzle["hint_order"]):
-            old_center = centers[old_wheel_idx]
-            new_center = centers[wheel_idx]
-            wheel_vertices = vertex_index_lists[old_wheel_idx]
-            for vertex in wheel_vertices:
-                old = vertices[vertex]
-                new_vertices[vertex] = [
-                    old[0] - old_center[0] + new_center[0],
-                    old[1] - old_center[1] + new_center[1],
-                    old[2] - old_center[2] + new_center[2],
-                ]
+            mask = masks[old_wheel_idx]
+            new_vertices[mask] = (
+                vertices[mask] - centers[old_wheel_idx] + centers[wheel_idx]
+            )
 
         mdl.set_vertices("polySurface3711483__A_D301_HintMark_b01_1", new_vertices)
 
         vertices = mdl.get_vertices("pCylinder941__A_HintMark00")
-        vertex_index_lists = [
-            [v_i for v_i, v in enumerate(vertices) if dist_sq(center, v) < radius_sq]
-            for center in centers
-        ]
+        masks = wheel_masks(vertices)
 
         new_vertices = vertices.copy()
-        for idx, list in enumerate(vertex_index_lists):
+        for idx, mask in enumerate(masks):
             rotate_amt = ssh_puzzle["hint_rotations"][idx]
             angle = rotate_amt * math.pi / 2.0
             center = centers[idx]
-            for vertex_idx in list:
-                vertex = vertices[vertex_idx]
-                ux_ = vertex[0] - center[0]
-                uz_ = vertex[2] - center[2]
-                # todo maybe use numpy
-                # yes this is left handed
-                ux = ux_ * math.cos(angle) + uz_ * math.sin(angle)
-                uz = -ux_ * math.sin(angle) + uz_ * math.cos(angle)
-                new_vertices[vertex_idx] = [
-                    ux + center[0],
-                    vertex[1],
-                    uz + center[2],
-                ]
+            ux_ = vertices[mask, 0] - center[0]
+            uz_ = vertices[mask, 2] - center[2]
+            # yes this is left handed
+            ux = ux_ * math.cos(angle) + uz_ * math.sin(angle)
+            uz = -ux_ * math.sin(angle) + uz_ * math.cos(angle)
+            new_vertices[mask, 0] = ux + center[0]
+            new_vertices[mask, 2] = uz + center[2]
         mdl.set_vertices("pCylinder941__A_HintMark00", new_vertices)
 
         brres.set_file_data("3DModels(NW4R)/model0", mdl)
@@ -2902,18 +2931,18 @@ class GamePatcher:
 
         mdl: MDL0 = brres.get_file_data("3DModels(NW4R)/model0")
 
-        vertices = mdl.get_vertices("polySurface372042__A_Ceiling04_m")
+        # only moves vertices around, so there's no need to decode them
+        vertices = mdl.get_raw_buffer(
+            VERTEX_SECTION, "polySurface372042__A_Ceiling04_m"
+        )
 
         new_vertices = vertices.copy()
-        for i in range(2):
-            num_rots = rotations[i]
-            comp = components[i]
-            new_comp = np.rot90(comp, num_rots)
-            for i in range(3):
-                for j in range(3):
-                    new_vertices[new_comp[j][i]] = vertices[comp[j][i]]
+        for num_rots, comp in zip(rotations, components):
+            new_vertices[np.rot90(comp, num_rots)] = vertices[comp]
 
-        mdl.set_vertices("polySurface372042__A_Ceiling04_m", new_vertices)
+        mdl.set_raw_buffer(
+            VERTEX_SECTION, "polySurface372042__A_Ceiling04_m", new_vertices
+        )
 
         brres.set_file_data("3DModels(NW4R)/model0", mdl)
         return brres
@@ -2939,31 +2968,17 @@ class GamePatcher:
 
         uv_coords = mdl.get_uvs("#9")
 
-        new_uv = uv_coords.copy()
-        nd = np.array(new_uv)
-        # find bounding box
-        xmax = np.max(nd[:, 0])
-        ymax = np.max(nd[:, 1])
-        xmin = np.min(nd[:, 0])
-        ymin = np.min(nd[:, 1])
-
-        center = [
-            (xmax + xmin) / 2,
-            (ymax + ymin) / 2,
-        ]
+        # center of the bounding box
+        center = (uv_coords.max(axis=0) + uv_coords.min(axis=0)) / 2
 
         angle = rhand * math.pi / 2.0
-        for idx, coord in enumerate(uv_coords):
-            ux_ = coord[0] - center[0]
-            uy_ = coord[1] - center[1]
-            # note: handedness of this transformation can't be verified
-            # since only 180 degrees rotations are supported
-            ux = ux_ * math.cos(angle) + uy_ * math.sin(angle)
-            uy = -ux_ * math.sin(angle) + uy_ * math.cos(angle)
-            new_uv[idx] = [
-                int(ux + center[0]),
-                int(uy + center[1]),
-            ]
+        ux_ = uv_coords[:, 0] - center[0]
+        uy_ = uv_coords[:, 1] - center[1]
+        # note: handedness of this transformation can't be verified
+        # since only 180 degrees rotations are supported
+        ux = ux_ * math.cos(angle) + uy_ * math.sin(angle)
+        uy = -ux_ * math.sin(angle) + uy_ * math.cos(angle)
+        new_uv = np.stack([ux + center[0], uy + center[1]], axis=1)
 
         mdl.set_uvs("#9", new_uv)
 
@@ -2979,65 +2994,36 @@ class GamePatcher:
         mdl: MDL0 = brres.get_file_data(model_name)
 
         # North to south
-        xz = [
-            [4930.0, 0, -21000.0],  # 1 robot
-            [4930.0, 0, -20000.0],  # 3 robots
-            [4930.0, 0, -19000.0],  # 2 robots
-        ]
+        xz = np.array(
+            [
+                [4930.0, 0, -21000.0],  # 1 robot
+                [4930.0, 0, -20000.0],  # 3 robots
+                [4930.0, 0, -19000.0],  # 2 robots
+            ]
+        )
         # low to high
         num_robots = [0, 2, 1]
 
-        plate_vertices = mdl.get_vertices(plate_verts)
-        new_plate_vertices = plate_vertices.copy()
-        # unfortunately we have to move the walls above the plates too
-        wall_vertices = mdl.get_vertices(wall_verts)
-        new_wall_vertices = wall_vertices.copy()
-
-        def belongs_to_plane(v, plane_idx):
-            return (
-                abs(v[0] - xz[plane_idx][0]) < 150.0
-                and abs(v[2] - xz[plane_idx][2]) < 200.0
+        def plane_masks(vertices):
+            # (plane, vertex) -> whether the vertex belongs to the plane
+            return (np.abs(vertices[None, :, 0] - xz[:, None, 0]) < 150.0) & (
+                np.abs(vertices[None, :, 2] - xz[:, None, 2]) < 200.0
             )
 
-        plane_vertex_index_lists = [
-            [v_i for v_i, v in enumerate(plate_vertices) if belongs_to_plane(v, plane)]
-            for plane in range(3)
-        ]
-
-        wall_vertex_index_lists = [
-            [v_i for v_i, v in enumerate(wall_vertices) if belongs_to_plane(v, plane)]
-            for plane in range(3)
-        ]
-
-        for idx, obj in enumerate(order):
-            plate_idx = num_robots[idx]
-            old_center = xz[plate_idx]  # the center of the plate that has #idx robots
-            new_center = xz[
-                obj
-            ]  # the center of the plate that corresponds to the switch to hit
-
-            plate_vertex_index_list = plane_vertex_index_lists[
-                plate_idx
-            ]  # the vertex idxes of the plate that needs to move
-            for vertex in plate_vertex_index_list:
-                old = plate_vertices[vertex]
-                new_plate_vertices[vertex] = [
-                    old[0] - old_center[0] + new_center[0],
-                    old[1],
-                    old[2] - old_center[2] + new_center[2],
-                ]
+        # unfortunately we have to move the walls above the plates too
+        for buffer_name in (plate_verts, wall_verts):
+            vertices = mdl.get_vertices(buffer_name)
+            masks = plane_masks(vertices)
+            new_vertices = vertices.copy()
 
-            wall_vertex_index_list = wall_vertex_index_lists[plate_idx]
-            for vertex in wall_vertex_index_list:
-                old = wall_vertices[vertex]
-                new_wall_vertices[vertex] = [
-                    old[0] - old_center[0] + new_center[0],
-                    old[1],
-                    old[2] - old_center[2] + new_center[2],
-                ]
+            for idx, obj in enumerate(order):
+                plate_idx = num_robots[idx]
+                # move the plate that has #idx robots to the plate that corresponds to the switch to hit,
+                # the centers have no height so this only moves them horizontally
+                mask = masks[plate_idx]
+                new_vertices[mask] = vertices[mask] - xz[plate_idx] + xz[obj]
 
-        mdl.set_vertices(plate_verts, new_plate_vertices)
-        mdl.set_vertices(wall_verts, new_wall_vertices)
+            mdl.set_vertices(buffer_name, new_vertices)
 
         brres.set_file_data(model_name, mdl)
         return brres
@@ -3061,13 +3047,10 @@ class GamePatcher:
         return brres
 
     def bzs_patch_func(self, bzs, stage, room):
-        stagepatches = self.patches.get(stage, [])
-        stagepatches = list(filter(self.filter_option_requirement, stagepatches))
+        patch_key = (stage, room)
         modified = False
         if room == None:
-            layer_patches = list(
-                filter(lambda x: x["type"] == "layeroverride", stagepatches)
-            )
+            layer_patches = self.stage_patch_index.get(patch_key, "layeroverride")
             if len(layer_patches) > 1:
                 print(f"ERROR: multiple layer overrides for stage {stage}!")
             elif len(layer_patches) == 1:
@@ -3080,10 +3063,7 @@ class GamePatcher:
                 bzs["LYSE"] = layer_override
                 modified = True
         next_id = highest_objid(bzs) + 1
-        for pathadd in filter(
-            lambda x: x["type"] == "pathadd" and x.get("room", None) == room,
-            stagepatches,
-        ):
+        for pathadd in self.stage_patch_index.get(patch_key, "pathadd"):
             new_path = DEFAULT_PATH.copy()
             next_pnt = len(bzs["PNT "])
             new_path["pnt_start_idx"] = next_pnt
@@ -3097,10 +3077,7 @@ class GamePatcher:
                         new_pnt[key] = val
                 bzs["PNT "].append(new_pnt)
             modified = True
-        for objadd in filter(
-            lambda x: x["type"] == "objadd" and x.get("room", None) == room,
-            stagepatches,
-        ):
+        for objadd in self.stage_patch_index.get(patch_key, "objadd"):
             layer = objadd.get("layer", None)
             objtype = objadd["objtype"].ljust(
                 4
@@ -3170,10 +3147,7 @@ class GamePatcher:
             objlist.append(new_obj)
             modified = True
             # print(obj)
-        for objpatch in filter(
-            lambda x: x["type"] == "objpatch" and x.get("room", None) == room,
-            stagepatches,
-        ):
+        for objpatch in self.stage_patch_index.get(patch_key, "objpatch"):
             obj = get_entry_from_bzs(bzs, objpatch)
             if not obj is None:
                 for key, val in objpatch["object"].items():
@@ -3184,10 +3158,7 @@ class GamePatcher:
                 modified = True
                 # print(f'modified object from {layer} in room {room} with id {objpatch["id"]:04X}')
                 # print(obj)
-        for objmove in filter(
-            lambda x: x["type"] == "objmove" and x.get("room", None) == room,
-            stagepatches,
-        ):
+        for objmove in self.stage_patch_index.get(patch_key, "objmove"):
             obj = get_entry_from_bzs(bzs, objmove, remove=True)
             destlayer = objmove["destlayer"]
             if not obj is None:
@@ -3204,19 +3175,13 @@ class GamePatcher:
                 modified = True
                 # print(f'moved object from {layer} to {destlayer} in room {room} with id {objmove["id"]:04X}')
                 # print(obj)
-        for objdelete in filter(
-            lambda x: x["type"] == "objdelete" and x.get("room", None) == room,
-            stagepatches,
-        ):
+        for objdelete in self.stage_patch_index.get(patch_key, "objdelete"):
             obj = get_entry_from_bzs(bzs, objdelete, remove=True)
             if not obj is None:
                 modified = True
                 # print(f'removed object from {layer} in room {room} with id {objdelete["id"]:04X}')
                 # print(obj)
-        for command in filter(
-            lambda x: x["type"] == "objnadd" and x.get("room", None) == room,
-            stagepatches,
-        ):
+        for command in self.stage_patch_index.get(patch_key, "objnadd"):
             layer = command.get("layer", None)
             name_to_add = command["objn"]
             if layer is None:
@@ -3249,19 +3214,15 @@ class GamePatcher:
 
     def flow_patch(self, msbf, filename):
         modified = False
-        flowpatches = self.eventpatches.get(filename, [])
-        flowpatches = list(filter(self.filter_option_requirement, flowpatches))
 
         # dictionary to map flow labels to ids for new flows
         label_to_index = OrderedDict()
         next_index = len(msbf["FLW3"]["flow"])
         # fist, fill in all the flow name to index mappings
-        for command in filter(
-            lambda x: x["type"] in ["flowadd", "switchadd"], flowpatches
-        ):
+        for command in self.event_patch_index.get(filename, "flowadd", "switchadd"):
             label_to_index[command["name"]] = next_index
             next_index += 1
-        for command in filter(lambda x: x["type"] == "flowpatch", flowpatches):
+        for command in self.event_patch_index.get(filename, "flowpatch"):
             flowobj = msbf["FLW3"]["flow"][command["index"]]
             for key, val in command.get("flow", {}).items():
                 # special case: next points to a label
@@ -3300,9 +3261,7 @@ class GamePatcher:
                     # print(flowobj)
             # print(f'patched flow {command["index"]}, {filename}')
             modified = True
-        for command in filter(
-            lambda x: x["type"] in ["flowadd", "switchadd"], flowpatches
-        ):
+        for command in self.event_patch_index.get(filename, "flowadd", "switchadd"):
             assert (
                 len(msbf["FLW3"]["flow"]) == label_to_index[command["name"]]
             ), f'index has to be the next value in the flow, expected {len(msbf["FLW3"]["flow"])} got {label_to_index[command["name"]]}'
@@ -3355,7 +3314,7 @@ class GamePatcher:
                 add_msbf_branch(msbf, flowobj, cases)
                 # print(f'added switch {command["name"]}, {filename}')
             modified = True
-        for command in filter(lambda x: x["type"] == "entryadd", flowpatches):
+        for command in self.event_patch_index.get(filename, "entryadd"):
             value = command["entry"]["value"]
             if not isinstance(value, int):
                 index = label_to_index.get(value, None)
@@ -3437,15 +3396,13 @@ class GamePatcher:
         #         print(f'smile: {bucket} {hash_b}')
         assert len(msbt["TXT2"]) == len(msbt["ATR1"])
         modified = False
-        textpatches = self.eventpatches.get(filename, [])
-        textpatches = list(filter(self.filter_option_requirement, textpatches))
-        for command in filter(lambda x: x["type"] == "textpatch", textpatches):
+        for command in self.event_patch_index.get(filename, "textpatch"):
             msbt["TXT2"][command["index"]] = process_control_sequences(
                 command["text"]
             ).encode("utf-16be")
             # print(f'patched text {command["index"]}, {filename}')
             modified = True
-        for command in filter(lambda x: x["type"] == "textadd", textpatches):
+        for command in self.event_patch_index.get(filename, "textadd"):
             index = len(msbt["TXT2"])
             self.text_labels[command["name"]] = index
             msbt["TXT2"].append(
@@ -3605,7 +3562,7 @@ class GamePatcher:
         )
 
         dol.save_changes()
-        write_bytes_create_dirs(
+        self.patcher.extract_writer.write_bytes(
             self.patcher.modified_extract_path / "DATA" / "sys" / "main.dol",
             dol_bytes.getbuffer(),
         )
@@ -3640,7 +3597,7 @@ class GamePatcher:
             rel_modified = True
         if rel_modified:
             rel_data = rel_arc.to_buffer()
-            write_bytes_create_dirs(
+            self.patcher.extract_writer.write_bytes(
                 self.patcher.modified_extract_path / "DATA" / "files" / "rels.arc",
                 rel_data,
             )
@@ -3760,7 +3717,7 @@ class GamePatcher:
         arc = U8File.parse_u8(BytesIO(data))
         logodata = (self.rando_root_path / "assets" / "logo.tpl").read_bytes()
         arc.set_file_data("timg/tr_wiiKing2Logo_00.tpl", logodata)
-        title_2D_path.write_bytes(arc.to_buffer())
+        self.patcher.extract_writer.write_bytes(title_2D_path, arc.to_buffer())
 
     def do_patch_custom_dowsing_images(self):
         # patch propeller dowsing image; used for chest dowsing
@@ -3780,12 +3737,13 @@ class GamePatcher:
             self.rando_root_path / "assets" / "sandship_image.tpl"
         ).read_bytes()
         arc.set_file_data("timg/tr_dauzTarget_18.tpl", sandshipdata)
-        do_button_path.write_bytes(arc.to_buffer())
+        self.patcher.extract_writer.write_bytes(do_button_path, arc.to_buffer())
 
     def patch_random_starting_statue_flags(self):
-        for statue in self.placement_file.start_statues.values():
-            flag_space = statue[1].get("flag-space")
-            flag = statue[1].get("flag")
+        for entrance in self.placement_file.start_statues.values():
+            statue = self.areas.map_entrances[entrance]
+            flag_space = statue.get("flag-space")
+            flag = statue.get("flag")
             assert flag_space is not None
             assert flag is not None
             if flag_space == "Story":
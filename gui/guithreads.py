@@ -81,13 +81,20 @@ class ExtractSetupThread(QThread):
     extract_complete = Signal()
 
     def __init__(
-        self, extract_manager: ExtractManager, clean_iso_path: Path, output_folder: Path
+        self,
+        extract_manager: ExtractManager,
+        clean_iso_path: Path,
+        output_folder: Path,
+        overlay: bool = False,
+        warm_up_cache: bool = True,
     ):
         QThread.__init__(self)
 
         self.extract_manager = extract_manager
         self.clean_iso_path = clean_iso_path
         self.output_folder = output_folder
+        self.overlay = overlay
+        self.warm_up_cache = warm_up_cache
         self.steps = 0
 
     def create_ui_progress_callback(self, start_steps):
@@ -120,7 +127,17 @@ class ExtractSetupThread(QThread):
 
         default_ui_progress_callback("copying extract...")
         if not self.extract_manager.modified_extract_already_exists():
-            self.extract_manager.copy_to_modified(self.create_ui_progress_callback(101))
+            try:
+                # also builds the oarc cache in the meantime, so the first randomization is faster
+                self.extract_manager.populate_modified(
+                    overlay=self.overlay,
+                    warm_up_cache=self.warm_up_cache,
+                    progress_cb=self.create_ui_progress_callback(101),
+                )
+            except Exception as e:
+                print(e)
+                self.error_abort.emit(str(e))
+                return
         else:
             default_ui_progress_callback("already copied", 201)
         self.extract_complete.emit()
@@ -6,6 +6,7 @@ import pyclip
 import qdarktheme
 import random
 import colorReplace as cr
+from modelcache import get_cached_image, recolour_key, store_image
 import cv2
 
 import json
@@ -41,6 +42,7 @@ from logic.logic_input import Areas
 from options import OPTIONS, Options
 from gui.dialogs.progressbar.progressdialog import ProgressDialog
 from gui.guithreads import RandomizerThread, ExtractSetupThread
+import ssrando
 from ssrando import Randomizer, VERSION
 from paths import RANDO_ROOT_PATH
 from gui.ui_randogui import Ui_MainWindow
@@ -457,7 +459,10 @@ class RandoGUI(QMainWindow):
         )
         self.progress_dialog.setAutoClose(True)
         self.extract_thread = ExtractSetupThread(
-            self.extract_manager, clean_iso_path, None
+            self.extract_manager,
+            clean_iso_path,
+            None,
+            overlay=self.options["overlay-extract"],
         )
         self.extract_thread.update_total_steps.connect(
             lambda total_steps: self.progress_dialog.setMaximum(total_steps)
@@ -1202,15 +1207,11 @@ class RandoGUI(QMainWindow):
             self.ui.label_preview_image.setText("No preview provided")
             return
 
-        data = cv2.imread(str(preview_data_path / "Preview.png"), cv2.IMREAD_UNCHANGED)
-        data = cv2.cvtColor(data, cv2.COLOR_RGBA2BGRA)
-        height = data.shape[0]
-        width = data.shape[1]
-
         color_data = self.metadata.get("Colors")
 
         mask_paths = []
         colors = []
+        used_colors = []
         for color_group in color_data:
             if color_data[color_group] == "Default":
                 continue
@@ -1218,12 +1219,26 @@ class RandoGUI(QMainWindow):
             if mask_path.is_file():
                 mask_paths.append(str(mask_path))
                 colors.append(color_data[color_group])
+                used_colors.append((color_group, color_data[color_group]))
             else:
                 print(f"No preview mask found at {mask_path}")
 
-        modified_data = cr.process_texture(
-            texture=data, maskPaths=mask_paths, colors=colors
+        cache_key = recolour_key(
+            [preview_data_path / "Preview.png", *map(Path, mask_paths)], used_colors
         )
+        cache_name = f"Preview-{self.current_model_type}"
+        modified_data = get_cached_image(cache_name, cache_key)
+        if modified_data is None:
+            data = cv2.imread(
+                str(preview_data_path / "Preview.png"), cv2.IMREAD_UNCHANGED
+            )
+            data = cv2.cvtColor(data, cv2.COLOR_RGBA2BGRA)
+            modified_data = cr.process_texture(
+                texture=data, maskPaths=mask_paths, colors=colors
+            )
+            store_image(cache_name, cache_key, modified_data)
+        height = modified_data.shape[0]
+        width = modified_data.shape[1]
 
         qimage = QImage(
             modified_data.tobytes(), width, height, QImage.Format.Format_RGBA8888
@@ -1344,6 +1359,8 @@ class RandoGUI(QMainWindow):
 
 
 def run_main_gui(areas: Areas, options: Options):
+    # the randomizer runs in a QThread, forking the fill attempt workers from it isn't safe
+    ssrando.FILL_ATTEMPT_START_METHOD = ssrando.THREADED_START_METHOD
     app = QApplication([])
 
     widget = RandoGUI(areas, options)
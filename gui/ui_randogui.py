@@ -161,6 +161,28 @@ class Ui_MainWindow(object):
 
         self.vlay_advanced.addWidget(self.option_dry_run)
 
+        self.label_for_option_fill_attempts = QLabel(self.box_advanced)
+        self.label_for_option_fill_attempts.setObjectName(u"label_for_option_fill_attempts")
+        sizePolicy3 = QSizePolicy(QSizePolicy.Policy.MinimumExpanding, QSizePolicy.Policy.Preferred)
+        sizePolicy3.setHorizontalStretch(0)
+        sizePolicy3.setVerticalStretch(0)
+        sizePolicy3.setHeightForWidth(self.label_for_option_fill_attempts.sizePolicy().hasHeightForWidth())
+        self.label_for_option_fill_attempts.setSizePolicy(sizePolicy3)
+
+        self.vlay_advanced.addWidget(self.label_for_option_fill_attempts)
+
+        self.option_fill_attempts = QSpinBox(self.box_advanced)
+        self.option_fill_attempts.setObjectName(u"option_fill_attempts")
+        sizePolicy4 = QSizePolicy(QSizePolicy.Policy.MinimumExpanding, QSizePolicy.Policy.Fixed)
+        sizePolicy4.setHorizontalStretch(0)
+        sizePolicy4.setVerticalStretch(0)
+        sizePolicy4.setHeightForWidth(self.option_fill_attempts.sizePolicy().hasHeightForWidth())
+        self.option_fill_attempts.setSizePolicy(sizePolicy4)
+        self.option_fill_attempts.setMinimum(1)
+        self.option_fill_attempts.setMaximum(16)
+
+        self.vlay_advanced.addWidget(self.option_fill_attempts)
+
         self.vspace_advanced = QSpacerItem(20, 40, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding)
 
         self.vlay_advanced.addItem(self.vspace_advanced)
@@ -196,9 +218,6 @@ class Ui_MainWindow(object):
 
         self.label_for_option_star_count = QLabel(self.box_cosmetics)
         self.label_for_option_star_count.setObjectName(u"label_for_option_star_count")
-        sizePolicy3 = QSizePolicy(QSizePolicy.Policy.MinimumExpanding, QSizePolicy.Policy.Preferred)
-        sizePolicy3.setHorizontalStretch(0)
-        sizePolicy3.setVerticalStretch(0)
         sizePolicy3.setHeightForWidth(self.label_for_option_star_count.sizePolicy().hasHeightForWidth())
         self.label_for_option_star_count.setSizePolicy(sizePolicy3)
 
@@ -207,9 +226,6 @@ class Ui_MainWindow(object):
         self.option_star_count = QSpinBox(self.box_cosmetics)
         self.option_star_count.setObjectName(u"option_star_count")
         self.option_star_count.setEnabled(True)
-        sizePolicy4 = QSizePolicy(QSizePolicy.Policy.MinimumExpanding, QSizePolicy.Policy.Fixed)
-        sizePolicy4.setHorizontalStretch(0)
-        sizePolicy4.setVerticalStretch(0)
         sizePolicy4.setHeightForWidth(self.option_star_count.sizePolicy().hasHeightForWidth())
         self.option_star_count.setSizePolicy(sizePolicy4)
         self.option_star_count.setMaximum(32767)
@@ -1989,6 +2005,7 @@ class Ui_MainWindow(object):
         self.option_out_placement_file.setText(QCoreApplication.translate("MainWindow", u"Generate Placement File", None))
         self.box_advanced.setTitle(QCoreApplication.translate("MainWindow", u"Advanced Options", None))
         self.option_dry_run.setText(QCoreApplication.translate("MainWindow", u"Dry Run", None))
+        self.label_for_option_fill_attempts.setText(QCoreApplication.translate("MainWindow", u"Fill Attempts", None))
         self.box_cosmetics.setTitle(QCoreApplication.translate("MainWindow", u"Cosmetics", None))
         self.option_cryptic_location_hints.setText(QCoreApplication.translate("MainWindow", u"Cryptic Location Hints", None))
         self.option_lightning_skyward_strike.setText(QCoreApplication.translate("MainWindow", u"Lightning Skyward Strike", None))
@@ -163,6 +163,48 @@ class InvalidHintDistribution(Exception):
     pass
 
 
+class IndexedCandidatePool:
+    """
+    Candidates in a fixed order, candidates can be removed and the n-th remaining candidate
+    can be looked up in logarithmic time (with a Fenwick tree over the removed flags).
+    Picking a random index in here gives the same candidate as picking it in the list of remaining candidates
+    """
+
+    def __init__(self, candidates: List[EIN]):
+        self.candidates = candidates
+        self.positions = {candidate: i for i, candidate in enumerate(candidates)}
+        # tree[i] holds the number of remaining candidates in (i - lowbit(i), i]
+        self.tree = [0] * (len(candidates) + 1)
+        for i in range(1, len(self.tree)):
+            self.tree[i] += 1
+            if (parent := i + (i & -i)) < len(self.tree):
+                self.tree[parent] += self.tree[i]
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, n: int) -> EIN:
+        # find the smallest position where n + 1 candidates remain up to it
+        remaining = n + 1
+        position = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            next_position = position + step
+            if next_position < len(self.tree) and self.tree[next_position] < remaining:
+                position = next_position
+                remaining -= self.tree[next_position]
+            step >>= 1
+        return self.candidates[position]
+
+    def remove(self, candidate: EIN):
+        if (position := self.positions.pop(candidate, None)) is None:
+            return
+        i = position + 1
+        while i < len(self.tree):
+            self.tree[i] -= 1
+            i += i & -i
+
+
 class HintDistribution:
     def __init__(self):
         self.hints_per_stone = 0
@@ -257,7 +299,17 @@ class HintDistribution:
         self.areas = areas
         self.options = options
 
-        self.hinted_locations = unhintable
+        self.hinted_locations = set(unhintable)
+
+        # locations that random hints can go to, in placement order so the same rng gives the same hints
+        not_banned = self.logic.fill_restricted()
+        self.random_hint_locations = IndexedCandidatePool(
+            [
+                loc
+                for loc in self.logic.placement.locations
+                if loc not in self.hinted_locations and not_banned[EXTENDED_ITEM[loc]]
+            ]
+        )
 
         self.banned_stones = list(map(areas.short_to_full, self.banned_stones))
 
@@ -320,10 +372,13 @@ class HintDistribution:
         self.rng.shuffle(self.hintable_items)
 
         region_barren, nonprogress = self.logic.get_barren_regions()
+        always_hints = set(self.always_hints)
         for zone, nb_checks in region_barren.items():
-            if all(
-                loc in self.hinted_locations or loc in self.always_hints
-                for loc in self.logic.locations_by_hint_region(zone)
+            zone_locations = self.logic.locations_by_hint_region(zone)
+            # regions without locations can't be hinted barren
+            if not zone_locations or all(
+                loc in self.hinted_locations or loc in always_hints
+                for loc in zone_locations
             ):
                 continue
 
@@ -430,7 +485,7 @@ class HintDistribution:
 
         if loc in self.hinted_locations:
             return self._create_always_hint()
-        self.hinted_locations.append(loc)
+        self._mark_hinted(loc)
 
         silent_realm_checks_rev = SILENT_REALM_CHECKS_REV(self.areas.short_to_full)
         trial_rando = self.options["randomize-trials"]
@@ -457,7 +512,7 @@ class HintDistribution:
 
         if loc in self.hinted_locations:
             return self._create_sometimes_hint()
-        self.hinted_locations.append(loc)
+        self._mark_hinted(loc)
 
         return LocationHint("sometimes", loc, item, text)
 
@@ -474,7 +529,7 @@ class HintDistribution:
 
         if loc in self.hinted_locations:
             return self._create_bk_hint()
-        self.hinted_locations.append(loc)
+        self._mark_hinted(loc)
 
         return LocationHint("boss_key", loc, item, text)
 
@@ -487,7 +542,7 @@ class HintDistribution:
 
         if loc in self.hinted_locations:
             return self._create_item_hint()
-        self.hinted_locations.append(loc)
+        self._mark_hinted(loc)
 
         if self.options["precise-item"]:
             text = self.areas.checks[loc].get("text")
@@ -498,24 +553,23 @@ class HintDistribution:
 
         return ZoneItemHint(loc, item, zone_override)
 
-    def _create_random_hint(self):
-        all_locations_without_hint = [
-            loc
-            for loc in self.logic.placement.locations
-            if loc not in self.hinted_locations
-            and self.areas.checks[loc]["hint_region"] not in self.barren_hinted_areas
-            and EXTENDED_ITEM[loc] in self.logic.fill_restricted()
-        ]
+    def _mark_hinted(self, loc: EIN):
+        self.hinted_locations.add(loc)
+        self.random_hint_locations.remove(loc)
 
-        assert all_locations_without_hint
+    def _create_random_hint(self):
+        assert len(self.random_hint_locations)
 
-        loc = self.rng.choice(all_locations_without_hint)
+        # same rng call as choice() on the list of remaining locations
+        loc = self.random_hint_locations[
+            self.rng.randrange(len(self.random_hint_locations))
+        ]
         item = self.logic.placement.locations[loc]
         if not self.options["cryptic-location-hints"]:
             text = None
         else:
             text = self.areas.checks[loc].get("text")
-        self.hinted_locations.append(loc)
+        self._mark_hinted(loc)
 
         return LocationHint("random", loc, item, text)
 
@@ -552,7 +606,7 @@ class HintDistribution:
             # goal hints will use the same dungeon limits as sots hints
             self.sots_dungeon_placed += 1
 
-        self.hinted_locations.append(loc)
+        self._mark_hinted(loc)
 
         if goal_mode:
             # move to next goal boss for next goal hint
@@ -603,11 +657,6 @@ class HintDistribution:
             barren_type = "overworld"
 
         # Failsafes if there are not enough barren hints to fill out the generated hint
-        for barren_area_pool in (self.barren_dungeons, self.barren_overworld_zones):
-            for region in barren_area_pool:
-                if not len(self.logic.locations_by_hint_region(region)):
-                    barren_area_pool.remove(region)
-
         if len(self.barren_dungeons) == 0:
             if len(self.barren_overworld_zones) == 0:
                 return None
@@ -625,7 +674,9 @@ class HintDistribution:
             list(barren_area_pool.keys()), list(barren_area_pool.values())
         )[0]
         del barren_area_pool[area]
-        self.hinted_locations.extend(self.logic.locations_by_hint_region(area))
+        # random hints also skip the locations of barren regions
+        for loc in self.logic.locations_by_hint_region(area):
+            self._mark_hinted(loc)
         self.barren_hinted_areas.add(area)
         self.prev_barren_type = barren_type
 
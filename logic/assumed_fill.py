@@ -1,12 +1,14 @@
 from __future__ import annotations
 from dataclasses import dataclass
 import random  # Only for typing purposes
+from typing import List
 
 
 from .constants import *
 from .logic import Logic
+from .entrance_shuffle import EntranceShuffle
 from .inventory import BANNED_BIT, EVERYTHING_UNBANNED_BIT, EXTENDED_ITEM
-from .fill_algo_common import RandomizationSettings, UserOutput
+from .fill_algo_common import FillStats, RandomizationSettings, UserOutput
 
 
 class AssumedFill:
@@ -16,10 +18,21 @@ class AssumedFill:
         self.logic = logic
         self.rng = rng
         self.randosettings = randosettings
+        self.stats = FillStats()
+        self.entrance_shuffle = EntranceShuffle(
+            self.logic, self.rng, randosettings.entrance_pools
+        )
 
-        full_inventory = Logic.get_everything_unbanned(self.logic.requirements)
+        # The shuffled entrances aren't connected yet, so assume they can lead anywhere in their pool
+        requirements = self.entrance_shuffle.assumed_requirements(
+            self.logic.requirements
+        )
+        full_inventory = Logic.get_everything_unbanned(requirements)
+        self.logic.requirements[EVERYTHING_UNBANNED_BIT] = requirements[
+            EVERYTHING_UNBANNED_BIT
+        ]
         truly_progress_item = Logic.aggregate_requirements(
-            self.logic.requirements, full_inventory, EVERYTHING_UNBANNED_BIT
+            requirements, full_inventory, EVERYTHING_UNBANNED_BIT
         )
 
         # Initialize item related attributes.
@@ -50,14 +63,23 @@ class AssumedFill:
         ]
 
     def get_total_progress_steps(self):
-        return len(self.progress_items) + len(self.must_be_placed_items) + 1
+        entrance_steps = 1 if self.randosettings.entrance_pools else 0
+        return (
+            len(self.progress_items)
+            + len(self.must_be_placed_items)
+            + entrance_steps
+            + 1
+        )
 
     def randomize(self, useroutput: UserOutput):
         self.useroutput = useroutput
 
-        # The order of operations is a guess at this point
-        progress_list = list(self.progress_items)
-        self.rng.shuffle(progress_list)
+        if self.randosettings.entrance_pools:
+            self.useroutput.progress_callback("placing entrances...")
+            self.entrance_shuffle.place(useroutput)
+            self.stats.entrance_backtracks = self.entrance_shuffle.backtracks
+
+        progress_list = self.order_progress_items()
 
         for item in progress_list:
             self.useroutput.progress_callback("placing progress items...")
@@ -66,10 +88,6 @@ class AssumedFill:
                     f"Could not find a valid location to place {item}. This may be because the settings are too restrictive. Try randomizing a new seed."
                 )
 
-        # for i, (e, _) in enumerate(self.logic.pools):
-        #     for _ in range(len(e)):
-        #         self.link(i)
-
         self.rng.shuffle(self.must_be_placed_items)
         self.rng.shuffle(self.may_be_placed_items)
 
@@ -90,6 +108,30 @@ class AssumedFill:
 
         self.fill_with_junk(self.randosettings.duplicable_items)
 
+    def order_progress_items(self) -> List[EIN]:
+        """
+        Most constrained items first, the fewer locations an item can be placed in, the earlier it is placed.
+        Items that can go to the same number of locations stay in a uniformly random order
+        """
+        location_counts = {}
+        for item in self.progress_items:
+            placement_limit = self.logic.placement.item_placement_limit.get(
+                item, EIN("")
+            )
+            if placement_limit not in location_counts:
+                location_counts[placement_limit] = len(
+                    self.logic.accessible_checks(placement_limit)
+                )
+
+        progress_list = list(self.progress_items)
+        self.rng.shuffle(progress_list)
+        progress_list.sort(
+            key=lambda item: location_counts[
+                self.logic.placement.item_placement_limit.get(item, EIN(""))
+            ]
+        )
+        return progress_list
+
     def fill_with_junk(self, junk):
         empty_locations = [
             loc
@@ -132,6 +174,8 @@ class AssumedFill:
 
         self.check_known_failures(item)
 
+        self.stats.swaps += 1
+        self.stats.max_swap_depth = max(self.stats.max_swap_depth, depth + 1)
         if had_banned := self.logic.inventory[BANNED_BIT]:
             self.logic.remove_item(BANNED_BIT)
         new_item = self.logic.replace_item(self.rng.choice(accessible_locations), item)
@@ -163,38 +207,3 @@ class AssumedFill:
             raise self.useroutput.GenerationFailed(
                 f"Known generation failure: Vanilla Whip."
             )
-
-    def link(self, pool: int, entrance=None, depth=0):
-        entrance_pool, exit_pool = self.logic.pools[pool]
-        unassigned_entrances = [
-            entrance
-            for entrance in entrance_pool.values()
-            if entrance.entrance not in self.logic.placement.reverse_map_transitions
-        ]
-        if entrance is None:
-            entrance = self.rng.choice(unassigned_entrances)
-        else:
-            assert entrance in unassigned_entrances
-
-        accessible_exits = list(self.logic.accessible_exits(exit_pool.values()))
-        unassigned_exits, assigned_exits = [], []
-        for exit in accessible_exits:
-            if exit in self.logic.placement.map_transitions:
-                assigned_exits.append(exit)
-            else:
-                unassigned_exits.append(exit)
-        self.rng.shuffle(unassigned_exits)
-
-        for exit in unassigned_exits:
-            result = self.logic.link_connection(exit, entrance, pool)
-            if result:
-                return
-
-        # No unassigned exit works, so we try with already assigned exits
-        self.rng.shuffle(assigned_exits)
-        for exit in unassigned_exits:
-            result = self.logic.relink_connection(exit, entrance, pool)
-            if result:
-                self.link(pool, result, depth + 1)
-
-        raise ValueError("No exit could be found for the entrance.")
@@ -0,0 +1,141 @@
+from __future__ import annotations
+import random  # Only for typing purposes
+from typing import List, Tuple
+
+from .constants import *
+from .fill_algo_common import UserOutput
+from .inventory import EVERYTHING_UNBANNED_BIT, EXTENDED_ITEM
+from .logic import Logic
+from .logic_expression import DNFInventory
+from .pools import EntrancePool, PoolSlot
+
+# connections tried before the entrances are considered unplaceable
+MAX_LINK_ATTEMPTS = 2000
+
+
+class EntranceShuffle:
+    """
+    Places the connections of entrance pools one at a time, into slots that are already reachable.
+    Reachability is updated after every connection, if no open slot is reachable anymore
+    the last connections are undone and other targets are tried
+    """
+
+    def __init__(self, logic: Logic, rng: random.Random, pools: List[EntrancePool]):
+        self.logic = logic
+        self.rng = rng
+        self.pools = pools
+        self.placed_targets = {id(pool): set() for pool in pools}
+        self.attempts = 0
+        self.backtracks = 0
+
+    def link(
+        self,
+        pool: EntrancePool,
+        slot_name: str,
+        target_name: str,
+        requirements: List[DNFInventory] | None = None,
+    ):
+        for exit, entrance in pool.transitions(slot_name, target_name).items():
+            self.logic.link_connection(exit, entrance, requirements=requirements)
+
+    def assumed_requirements(
+        self, requirements: List[DNFInventory]
+    ) -> List[DNFInventory]:
+        """
+        Returns a copy of requirements where every slot is connected to every target of its pool,
+        anything reachable in some placement of the connections is reachable there
+        """
+        requirements = requirements.copy()
+        for pool in self.pools:
+            for slot_name in pool.slots:
+                for target_name in pool.targets:
+                    self.link(pool, slot_name, target_name, requirements)
+        return requirements
+
+    def reachable(self, slot: PoolSlot) -> bool:
+        return any(
+            self.logic.full_inventory[EXTENDED_ITEM[exit]] for exit in slot.exits
+        )
+
+    def place(self, useroutput: UserOutput):
+        open_slots = [
+            (pool, slot_name) for pool in self.pools for slot_name in pool.slots
+        ]
+        if not self.place_next(open_slots):
+            raise useroutput.GenerationFailed(
+                f"Could not connect all shuffled entrances after {self.attempts} attempts. This may be because the settings are too restrictive. Try randomizing a new seed."
+            )
+        self.logic.aggregate = Logic.aggregate_requirements(
+            self.logic.requirements, None
+        )
+
+    def place_next(self, open_slots: List[Tuple[EntrancePool, str]]) -> bool:
+        if not open_slots:
+            return bool(self.logic.full_inventory[EVERYTHING_UNBANNED_BIT])
+
+        reachable_slots = [
+            open_slot
+            for open_slot in open_slots
+            if self.reachable(open_slot[0].slots[open_slot[1]])
+        ]
+        if not reachable_slots:
+            return False
+
+        # reachability only grows, so the slot stays reachable whatever gets placed elsewhere
+        # and there's no need to try the other slots first
+        chosen = self.rng.choice(reachable_slots)
+        pool, slot_name = chosen
+        slot = pool.slots[slot_name]
+        remaining_slots = [
+            open_slot for open_slot in open_slots if open_slot is not chosen
+        ]
+        placed = self.placed_targets[id(pool)]
+
+        targets = [target for target in pool.targets if target not in placed]
+        self.rng.shuffle(targets)
+        for target_name in targets:
+            if self.attempts >= MAX_LINK_ATTEMPTS:
+                return False
+            self.attempts += 1
+
+            state = self.save_state(pool, slot_name)
+            target = pool.targets[target_name]
+            self.link(pool, slot_name, target_name)
+            reverse_map_transitions = self.logic.placement.reverse_map_transitions
+            reverse_map_transitions[target.entrance] = slot.exits[0]
+            if target.exits:
+                reverse_map_transitions[slot.entrance] = target.exits[0]
+            self.logic.fill_inventory_i(monotonic=True)
+            pool.assignment[slot_name] = target_name
+            placed.add(target_name)
+
+            if self.place_next(remaining_slots):
+                return True
+
+            placed.discard(target_name)
+            self.restore_state(pool, slot_name, state)
+            self.backtracks += 1
+
+        return False
+
+    def save_state(self, pool: EntrancePool, slot_name: str):
+        return (
+            self.logic.requirements.copy(),
+            self.logic.backup_requirements.copy(),
+            self.logic.opaque.copy(),
+            self.logic.full_inventory,
+            self.logic.placement.map_transitions.copy(),
+            self.logic.placement.reverse_map_transitions.copy(),
+            pool.assignment[slot_name],
+        )
+
+    def restore_state(self, pool: EntrancePool, slot_name: str, state):
+        (
+            self.logic.requirements,
+            self.logic.backup_requirements,
+            self.logic.opaque,
+            self.logic.full_inventory,
+            self.logic.placement.map_transitions,
+            self.logic.placement.reverse_map_transitions,
+            pool.assignment[slot_name],
+        ) = state
@@ -1,6 +1,6 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Dict, Callable
+from dataclasses import dataclass, field
+from typing import Dict, Callable, List
 
 from .constants import EXTENDED_ITEM_NAME
 
@@ -10,9 +10,21 @@ class RandomizationSettings:
     must_be_placed_items: Dict[EXTENDED_ITEM_NAME, None]
     may_be_placed_items: Dict[EXTENDED_ITEM_NAME, None]
     duplicable_items: Dict[str, None]
+    # pools.EntrancePool, connections placed by the fill algorithm
+    entrance_pools: List = field(default_factory=list)
 
 
 @dataclass
 class UserOutput:
     GenerationFailed: Callable[[str], Exception]
     progress_callback: Callable[[str], None]
+
+
+@dataclass
+class FillStats:
+    # items taken out of their location again to make room for another item
+    swaps: int = 0
+    # longest chain of swaps needed to place a single item
+    max_swap_depth: int = 0
+    # connections undone while placing the shuffled entrances
+    entrance_backtracks: int = 0
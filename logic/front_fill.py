@@ -6,7 +6,7 @@ import random  # Only for typing purposes
 from .constants import *
 from .logic import Logic
 from .inventory import BANNED_BIT, EVERYTHING_UNBANNED_BIT, EXTENDED_ITEM
-from .fill_algo_common import RandomizationSettings, UserOutput
+from .fill_algo_common import FillStats, RandomizationSettings, UserOutput
 
 
 class FrontFill:
@@ -16,6 +16,7 @@ class FrontFill:
         self.logic = logic
         self.rng = rng
         self.randosettings = randosettings
+        self.stats = FillStats()
 
         full_inventory = Logic.get_everything_unbanned(self.logic.requirements)
         truly_progress_item = Logic.aggregate_requirements(
@@ -4,6 +4,7 @@ from logic.constants import *
 from logic.inventory import EXTENDED_ITEM
 from logic.logic import DNFInventory
 from logic.logic_input import Areas
+from logic.reachability import ReachabilitySession
 
 from hints.hint_distribution import HintDistribution
 from hints.hint_types import *
@@ -177,10 +178,10 @@ class Hints:
 
             self.logic.inventory |= hint_bit
 
-        self.logic.aggregate = self.logic.aggregate_requirements(
-            self.logic.requirements, None
+        # placing a hint only changes what depends on its bit, so the fill is updated incrementally
+        self.reachability = ReachabilitySession(
+            self.logic.requirements, self.logic.inventory
         )
-        self.logic.fill_inventory_i(monotonic=False)
 
         for hintname in hints:
             if not self.place_hint(hintname):
@@ -188,11 +189,18 @@ class Hints:
                     f"Could not find a valid location to place {hintname}. This may be because the settings are too restrictive. Try randomizing a new seed."
                 )
 
+        self.logic.inventory = self.reachability.base_inventory
+        self.logic.full_inventory = self.reachability.full_inventory
+
     def place_hint(self, hintname: EXTENDED_ITEM_NAME, depth=0) -> bool:
         hint_bit = EXTENDED_ITEM[hintname]
-        self.logic.remove_item(hint_bit)
+        self.reachability.remove_item(hint_bit)
 
-        accessible_stones = list(self.logic.accessible_stones())
+        accessible_stones = [
+            stone
+            for stone, stone_def in self.areas.gossip_stones.items()
+            if self.reachability[stone_def["req_index"]]
+        ]
 
         available_stones = [
             stone
@@ -205,8 +213,9 @@ class Hints:
 
         if available_stones:
             stone = self.rng.choice(available_stones)
-            result = self.logic.place_item(stone, hintname, hint_mode=True)
+            result = self.logic.place_item(stone, hintname, hint_mode=True, fill=False)
             assert result  # Undefined if False
+            self.reachability.update_requirement(hint_bit)
             return True
 
         # We have to replace an already placed hint
@@ -223,5 +232,9 @@ class Hints:
             for old_hint in self.placement.stones[stone]
         ]
         stone, old_hint = self.rng.choice(spots)
-        old_removed_hint = self.logic.replace_item(stone, hintname, old_hint)
+        old_removed_hint = self.logic.replace_item(
+            stone, hintname, old_hint, fill=False
+        )
+        self.reachability.update_requirement(EXTENDED_ITEM[old_removed_hint])
+        self.reachability.update_requirement(hint_bit)
         return self.place_hint(old_removed_hint, depth + 1)
@@ -1,5 +1,6 @@
 from __future__ import annotations
-from typing import Set, List, Tuple
+from functools import cache
+from typing import Iterable, Set, List, Tuple
 
 from yaml_files import options
 from .constants import *
@@ -65,9 +66,32 @@ class EXTENDED_ITEM(int, metaclass=MetaContainer):
         return f"{self.__class__.__name__}({super().__repr__()})"
 
 
+@cache
+def copy_group_mask(item: str) -> int:
+    """bitset of all the copies of an item"""
+    mask = 0
+    for i in range(ITEM_COUNTS[item]):
+        mask |= 1 << EXTENDED_ITEM[number(item, i)]
+    return mask
+
+
+def normalize_thresholds(
+    bitset: int, thresholds: Iterable[Tuple[int, int]]
+) -> Tuple[Tuple[int, int], ...]:
+    """Keeps the strongest threshold per mask, drops the ones the bitset already satisfies"""
+    strongest = {}
+    for mask, quantity in thresholds:
+        if (mask & bitset).bit_count() < quantity and strongest.get(mask, 0) < quantity:
+            strongest[mask] = quantity
+    return tuple(sorted(strongest.items()))
+
+
 class Inventory:
     bitset: int
     intset: Set[EXTENDED_ITEM]
+    # (mask, quantity) pairs: at least quantity of the bits of mask are needed on top of bitset.
+    # Only requirement terms have thresholds, actual inventories never do
+    thresholds: Tuple[Tuple[int, int], ...] = ()
 
     def __init__(
         self,
@@ -87,6 +111,8 @@ class Inventory:
         elif isinstance(v, Inventory):
             self.bitset = v.bitset
             self.intset = v.intset
+            if v.thresholds:
+                self.thresholds = v.thresholds
         elif isinstance(v, set):
             bitset = 0
             for item in v:
@@ -129,42 +155,122 @@ class Inventory:
         else:
             raise ValueError
 
+    @staticmethod
+    def at_least(mask: int, quantity: int) -> Inventory:
+        """Term needing at least quantity of the bits of mask"""
+        return Inventory().with_thresholds(((mask, quantity),))
+
+    def with_thresholds(self, thresholds: Iterable[Tuple[int, int]]) -> Inventory:
+        inv = Inventory((self.bitset, self.intset))
+        if thresholds := normalize_thresholds(self.bitset, thresholds):
+            inv.thresholds = thresholds
+        return inv
+
+    def _guarantees(self, mask: int, quantity: int) -> bool:
+        """Whether owning this guarantees owning at least quantity of the bits of mask"""
+        if (mask & self.bitset).bit_count() >= quantity:
+            return True
+        for mask2, quantity2 in self.thresholds:
+            if mask2 & ~mask == 0:
+                outside = mask & ~mask2 & self.bitset
+                if quantity2 + outside.bit_count() >= quantity:
+                    return True
+        return False
+
+    def satisfied_by(self, bitset: int) -> bool:
+        return self.bitset & bitset == self.bitset and all(
+            (mask & bitset).bit_count() >= quantity
+            for mask, quantity in self.thresholds
+        )
+
+    @property
+    def mentioned_bitset(self) -> int:
+        """Bits this term depends on, including the ones its thresholds count"""
+        bitset = self.bitset
+        for mask, _ in self.thresholds:
+            bitset |= mask
+        return bitset
+
+    def mentioned(self) -> Inventory:
+        if not self.thresholds:
+            return self
+        bitset = self.mentioned_bitset
+        return Inventory(
+            (
+                bitset,
+                {
+                    EXTENDED_ITEM(i)
+                    for i in range(bitset.bit_length())
+                    if bitset >> i & 1
+                },
+            )
+        )
+
     def __or__(self, other):
         if isinstance(other, EXTENDED_ITEM):
-            return Inventory((self.bitset | (1 << other), self.intset | {other}))
+            inv = Inventory((self.bitset | (1 << other), self.intset | {other}))
+            if self.thresholds:
+                return inv.with_thresholds(self.thresholds)
+            return inv
         elif isinstance(other, Inventory):
-            return Inventory((self.bitset | other.bitset, self.intset | other.intset))
+            inv = Inventory((self.bitset | other.bitset, self.intset | other.intset))
+            if self.thresholds or other.thresholds:
+                return inv.with_thresholds(self.thresholds + other.thresholds)
+            return inv
         else:
             raise ValueError
 
     def __and__(self, other):
         if isinstance(other, Inventory):
-            return Inventory((self.bitset & other.bitset, self.intset & other.intset))
+            inv = Inventory((self.bitset & other.bitset, self.intset & other.intset))
+            if self.thresholds and other.thresholds:
+                common = set(self.thresholds) & set(other.thresholds)
+                return inv.with_thresholds(common)
+            return inv
         else:
             raise ValueError
 
     def __sub__(self, other):
         if isinstance(other, EXTENDED_ITEM):
-            return Inventory((self.bitset & ~(1 << other), self.intset - {other}))
+            inv = Inventory((self.bitset & ~(1 << other), self.intset - {other}))
         elif isinstance(other, Inventory):
-            return Inventory((self.bitset & ~other.bitset, self.intset - other.intset))
+            inv = Inventory((self.bitset & ~other.bitset, self.intset - other.intset))
         else:
             raise ValueError
+        if self.thresholds:
+            return inv.with_thresholds(self.thresholds)
+        return inv
 
     def __le__(self, other):
         """Define inclusion"""
-        return self.bitset | other.bitset == other.bitset
+        if self.bitset | other.bitset != other.bitset:
+            return False
+        if not self.thresholds:
+            return True
+        if not other.thresholds:
+            bitset = other.bitset
+            return all(
+                (mask & bitset).bit_count() >= quantity
+                for mask, quantity in self.thresholds
+            )
+        return all(
+            other._guarantees(mask, quantity) for mask, quantity in self.thresholds
+        )
 
     def __eq__(self, other):
-        return self.bitset == other.bitset
+        return self.bitset == other.bitset and self.thresholds == other.thresholds
 
     def __hash__(self):
+        if self.thresholds:
+            return hash((self.bitset, self.thresholds))
         return hash(self.bitset)
 
     def __iter__(self):
         return iter(self.intset)
 
     def __repr__(self) -> str:
+        if self.thresholds:
+            return f"Inventory({self.intset!r}, thresholds={self.thresholds!r})"
         return f"Inventory({self.intset!r})"
 
     def add(self, item: EXTENDED_ITEM | str):
@@ -181,9 +287,7 @@ class Inventory:
 
     def remove(self, item: EXTENDED_ITEM | str):
         if isinstance(item, EXTENDED_ITEM):
-            return Inventory(
-                (self.bitset & ~(1 << item), self.intset.difference({item}))
-            )
+            return self - item
         elif isinstance(item, str):
             for i in reversed(range(ITEM_COUNTS[item])):
                 if self[(item_bit := EXTENDED_ITEM[number(item, i)])]:
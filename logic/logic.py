@@ -20,18 +20,6 @@ from .inventory import (
 )
 
 
-@dataclass
-class PoolEntrance:
-    entrance: EXTENDED_ITEM_NAME
-    constraints: List[EXTENDED_ITEM_NAME] = field(default_factory=list)
-
-
-@dataclass
-class PoolExit:
-    exit: EXTENDED_ITEM_NAME
-    constraints: List[EXTENDED_ITEM_NAME] = field(default_factory=list)
-
-
 @dataclass
 class Placement:
     item_placement_limit: Dict[EXTENDED_ITEM_NAME, EXTENDED_ITEM_NAME] = field(
@@ -63,6 +51,24 @@ class Placement:
             self.unplaced_items.copy(),
         )
 
+    def to_plain(self) -> Dict[str, Any]:
+        """plain dicts and sets, to send a placement to another process"""
+        return {
+            name: set(value) if isinstance(value, set) else dict(value)
+            for name, value in vars(self).items()
+        }
+
+    @staticmethod
+    def from_plain(values: Dict[str, Any]) -> Placement:
+        placement = Placement()
+        for name, value in values.items():
+            current = getattr(placement, name)
+            if isinstance(current, defaultdict):
+                current.update(value)
+            else:
+                setattr(placement, name, value)
+        return placement
+
     def __or__(self, other: Placement) -> Placement:
         if not isinstance(other, Placement):
             raise ValueError
@@ -188,16 +194,26 @@ class Logic:
         else:
             test = lambda bit: full_inventory[bit]
         if start_bit is None:
+            # plain ints, building an Inventory for every conjunction is most of the cost
+            bitset = 0
             for bit in EXTENDED_ITEM.items():
                 if test(bit):
                     for conj in requirements[bit].disjunction:
-                        aggregate |= conj
+                        bitset |= conj.mentioned_bitset
+            aggregate = Inventory(
+                {
+                    EXTENDED_ITEM(i)
+                    for i in range(bitset.bit_length())
+                    if bitset >> i & 1
+                }
+            )
         else:
             todos = {start_bit}
             while todos:
                 bit = todos.pop()
                 if test(bit):
                     for conj in requirements[bit].disjunction:
+                        conj = conj.mentioned()
                         todos |= conj.intset - aggregate.intset
                         aggregate |= conj
 
@@ -223,6 +239,41 @@ class Logic:
         for i in Logic.fill_inventory(requirements, free) - free:
             requirements[i] = req
 
+    @staticmethod
+    def simplify_thresholds(
+        requirements, simplifiables: Inventory, thresholds
+    ) -> Tuple[Set[EXTENDED_ITEM], List[Tuple[int, int]]] | None:
+        """
+        Counts the simplifiable bits that are free, drops the impossible ones.
+        Returns the bits that are all needed and the remaining thresholds,
+        None if a threshold can't be met anymore
+        """
+        needed = set()
+        new_thresholds = []
+        for mask, quantity in thresholds:
+            bits = mask
+            while bits:
+                lowest = bits & -bits
+                bits ^= lowest
+                bit = EXTENDED_ITEM(lowest.bit_length() - 1)
+                if not simplifiables[bit]:
+                    continue
+                req_bit_req = requirements[bit].disjunction
+                if not req_bit_req:
+                    mask &= ~(1 << bit)
+                elif EMPTY_INV in req_bit_req:
+                    mask &= ~(1 << bit)
+                    quantity -= 1
+            if mask.bit_count() < quantity:
+                return None
+            if mask.bit_count() == quantity:
+                needed |= {
+                    EXTENDED_ITEM(i) for i in range(mask.bit_length()) if mask >> i & 1
+                }
+            elif quantity > 0:
+                new_thresholds.append((mask, quantity))
+        return needed, new_thresholds
+
     @staticmethod
     def shallow_simplify(requirements, opaques):
         simplifiables = Inventory(
@@ -235,14 +286,24 @@ class Logic:
         )
 
         for item, req in enumerate(requirements):
-            if item == EVERYTHING_BIT or len(req.disjunction) >= 30:
+            if item == EVERYTHING_BIT:
                 continue
             new_req = DNFInventory()
             for conj in req.disjunction:
                 if conj & simplifiables:
-                    new_conj = Inventory()
+                    req_items = conj.intset
+                    thresholds = conj.thresholds
+                    if thresholds:
+                        simplified = Logic.simplify_thresholds(
+                            requirements, simplifiables, thresholds
+                        )
+                        if simplified is None:
+                            continue
+                        needed, thresholds = simplified
+                        req_items = req_items | needed
+                    new_conj = EMPTY_INV.with_thresholds(thresholds)
                     skip = False
-                    for req_item in conj.intset:
+                    for req_item in req_items:
                         if not simplifiables[req_item]:
                             new_conj |= Inventory(req_item)
                         else:
@@ -279,6 +340,9 @@ class Logic:
             new_req = DNFInventory()
             for possibility in requirements[item].disjunction:
                 simplified_conj = []
+                if possibility.thresholds:
+                    counted = EMPTY_INV.with_thresholds(possibility.thresholds)
+                    simplified_conj.append(DNFInventory(counted).remove(item))
                 for req_item in possibility.intset:
                     item_req, h_a_v = simplify(req_item)
                     hit_a_visited = hit_a_visited | h_a_v
@@ -348,7 +412,8 @@ class Logic:
         for k, v in self.placement.locations.items():
             self.place_item(k, v, fill=False)
 
-        pure_usefuls = self.aggregate_requirements(areas.requirements, None)
+        if self.banned:
+            pure_usefuls = self.aggregate_requirements(areas.requirements, None)
         for it in self.banned:
             if it not in EXTENDED_ITEM:
                 continue
@@ -434,12 +499,6 @@ class Logic:
             if self.full_inventory[self.areas.gossip_stones[stone]["req_index"]]:
                 yield stone
 
-    def accessible_exits(self, exit_pool: Iterable[PoolExit]) -> Iterable[PoolExit]:
-        for exit in exit_pool:
-            if exit in self.areas.map_exits:
-                if self.full_inventory[EXTENDED_ITEM[exit]]:
-                    yield exit
-
     def link_connection(self, exit: EIN, entrance: EIN, pool=None, requirements=None):
         allowed_times = self.entrance_allowed_time_of_day[entrance]
         exit_bit = EXTENDED_ITEM[exit]
@@ -537,7 +596,9 @@ class Logic:
             self.placement.locations[location] = item
         return True
 
-    def replace_item(self, location: EIN, item: EIN, old_hint: EIN | None = None):
+    def replace_item(
+        self, location: EIN, item: EIN, old_hint: EIN | None = None, fill=True
+    ):
         if hint_mode := old_hint is not None:
             if location not in self.placement.stones:
                 raise ValueError(f"Hint stone {location} is empty.")
@@ -562,8 +623,11 @@ class Logic:
             old_item_bit = EXTENDED_ITEM[old_item]
             self.opaque[old_item_bit] = True
             self.backup_requirements[old_item_bit] = DNFInventory()
-            self.requirements = self.backup_requirements.copy()
-            self.fill_inventory_i()
+            if fill:
+                self.requirements = self.backup_requirements.copy()
+                self.fill_inventory_i()
+            else:
+                self.requirements[old_item_bit] = DNFInventory()
 
-        self.place_item(location, item, hint_mode=hint_mode)
+        self.place_item(location, item, hint_mode=hint_mode, fill=fill)
         return old_item
@@ -4,9 +4,16 @@ from dataclasses import dataclass
 from functools import reduce
 from abc import ABC
 import re
-from itertools import product, combinations
-
-from .inventory import EXTENDED_ITEM, Inventory, EMPTY_INV, DAY_BIT, NIGHT_BIT
+from itertools import product
+
+from .inventory import (
+    EXTENDED_ITEM,
+    Inventory,
+    EMPTY_INV,
+    DAY_BIT,
+    NIGHT_BIT,
+    copy_group_mask,
+)
 from .constants import EXTENDED_ITEM_NAME, number, ITEM_COUNTS, RAW_ITEM_NAMES
 
 import yaml
@@ -111,7 +118,21 @@ class DNFInventory(LogicExpression):
 
     def remove(self, item):
         if isinstance(item, EXTENDED_ITEM):
-            return DNFInventory({inv for inv in self.disjunction if not inv[item]})
+            disjunction = set()
+            for inv in self.disjunction:
+                if inv[item]:
+                    continue
+                if any(mask >> item & 1 for mask, _ in inv.thresholds):
+                    # the item can't count towards the thresholds anymore
+                    bit = 1 << item
+                    thresholds = [(mask & ~bit, n) for mask, n in inv.thresholds]
+                    if any(mask.bit_count() < n for mask, n in thresholds):
+                        continue
+                    inv = Inventory((inv.bitset, inv.intset)).with_thresholds(
+                        thresholds
+                    )
+                disjunction.add(inv)
+            return DNFInventory(disjunction)
         else:
             raise ValueError
 
@@ -121,7 +142,7 @@ class DNFInventory(LogicExpression):
     def aggregate(self):
         ag = Inventory()
         for r in self.disjunction:
-            ag |= r
+            ag |= r.mentioned()
         return ag
 
     def day_only(self):
@@ -140,13 +161,16 @@ def InventoryAtom(item_name: str, quantity: int) -> DNFInventory:
         if quantity == 1:
             return BasicTextAtom(f"{item_name}")
         return BasicTextAtom(f"{item_name} x {quantity}")
-    disjunction = set()
-    for comb in combinations(range(ITEM_COUNTS[item_name]), quantity):
-        i = Inventory()
-        for index in comb:
-            i |= EXTENDED_ITEM[number(item_name, index)]
-        disjunction.add(i)
-    return DNFInventory(disjunction)
+    count = ITEM_COUNTS[item_name]
+    if quantity > count:
+        return DNFInventory(False)
+    if quantity == 0:
+        return DNFInventory(True)
+    if quantity == count:
+        # every copy is needed, no need to count
+        return DNFInventory(Inventory((item_name, count)))
+    # a single term counting the copies, instead of one term per combination of them
+    return DNFInventory(Inventory.at_least(copy_group_mask(item_name), quantity))
 
 
 def EventAtom(event_address: EXTENDED_ITEM_NAME) -> DNFInventory:
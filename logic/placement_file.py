@@ -2,7 +2,20 @@ from .constants import *
 from options import Options
 from version import VERSION
 
+from functools import cache
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+import io
 import json
+import struct
+import zlib
+
+# increased whenever the binary layout changes
+PLACEMENT_BINARY_MAGIC = b"SSPF"
+PLACEMENT_BINARY_VERSION = 2
+
+# the start entrance values besides its statue name and stage
+START_ENTRANCE_NUMBERS = ("room", "layer", "entrance", "day-night")
 
 
 class InvalidPlacementFile(Exception):
@@ -21,6 +34,11 @@ class PlacementFile:
         self.hints = {}
         self.dungeon_connections = {}
         self.trial_connections = {}
+        self.start_entrance = {}
+        # province -> bird statue entrance
+        self.start_statues = {}
+        # only set for freshly generated seeds, these aren't written to json
+        self.puzzles = None
         self.trial_object_seed = -1
         self.music_rando_seed = -1
         self.bk_angle_seed = -1
@@ -43,12 +61,77 @@ class PlacementFile:
             "hints": self.hints,
             "entrance-connections": self.dungeon_connections,
             "trial-connections": self.trial_connections,
+            "start-entrance": self.start_entrance,
+            "start-statues": self.start_statues,
             "trial-object-seed": self.trial_object_seed,
             "music-rando-seed": self.music_rando_seed,
             "bk-angle-seed": self.bk_angle_seed,
         }
         return json.dumps(retval, indent=2)
 
+    def to_binary(self, areas) -> bytes:
+        """
+        Compact encoding of everything to_json_str writes, names that are in the symbol
+        table of areas are written as their index, reading it needs the same areas
+        """
+        writer = BinaryPlacementWriter(areas)
+        writer.write_str(self.version)
+        writer.write_str(self.options.get_permalink(exclude_seed=True))
+        writer.write_str(self.hash_str)
+        writer.write_str_list(self.starting_items)
+        writer.write_str_list(self.required_dungeons)
+        writer.write_str_dict(self.item_locations)
+        writer.write_uint(len(self.chest_dowsing))
+        for loc, dowsing in self.chest_dowsing.items():
+            writer.write_str(loc)
+            writer.write_uint(dowsing)
+        writer.write_uint(len(self.hints))
+        for hint_key, hintlist in self.hints.items():
+            writer.write_str(hint_key)
+            writer.write_str_list(hintlist)
+        writer.write_str_dict(self.dungeon_connections)
+        writer.write_str_dict(self.trial_connections)
+        writer.write_uint(bool(self.start_entrance))
+        if self.start_entrance:
+            writer.write_str(self.start_entrance["statue-name"])
+            writer.write_str(self.start_entrance["stage"])
+            for key in START_ENTRANCE_NUMBERS:
+                writer.write_uint(self.start_entrance[key])
+        writer.write_str_dict(self.start_statues)
+        writer.write_int(self.trial_object_seed)
+        writer.write_int(self.music_rando_seed)
+        writer.write_int(self.bk_angle_seed)
+        return writer.getvalue()
+
+    def read_from_binary(self, data: bytes, areas):
+        reader = BinaryPlacementReader(areas, data)
+        self.version = reader.read_str()
+        self.options.update_from_permalink(reader.read_str())
+        self.options.set_option("seed", -1)
+        self.hash_str = reader.read_str()
+        self.starting_items = reader.read_str_list()
+        self.required_dungeons = reader.read_str_list()
+        self.item_locations = reader.read_str_dict()
+        self.chest_dowsing = {
+            reader.read_str(): reader.read_uint() for _ in range(reader.read_uint())
+        }
+        self.hints = {
+            reader.read_str(): reader.read_str_list() for _ in range(reader.read_uint())
+        }
+        self.dungeon_connections = reader.read_str_dict()
+        self.trial_connections = reader.read_str_dict()
+        self.start_entrance = {}
+        if reader.read_uint():
+            self.start_entrance["statue-name"] = reader.read_str()
+            self.start_entrance["stage"] = reader.read_str()
+            for key in START_ENTRANCE_NUMBERS:
+                self.start_entrance[key] = reader.read_uint()
+        self.start_statues = reader.read_str_dict()
+        self.trial_object_seed = reader.read_int()
+        self.music_rando_seed = reader.read_int()
+        self.bk_angle_seed = reader.read_int()
+        reader.check_end()
+
     def _read_from_json(self, jsn):
         self.version = jsn["version"]
         self.options.update_from_permalink(jsn["permalink"])
@@ -61,6 +144,9 @@ class PlacementFile:
         self.hints = jsn["hints"]
         self.dungeon_connections = jsn["entrance-connections"]
         self.trial_connections = jsn["trial-connections"]
+        # placement files from older versions don't have them
+        self.start_entrance = jsn.get("start-entrance", {})
+        self.start_statues = jsn.get("start-statues", {})
         self.trial_object_seed = jsn["trial-object-seed"]
         self.music_rando_seed = jsn["music-rando-seed"]
         self.bk_angle_seed = jsn["bk-angle-seed"]
@@ -99,6 +185,11 @@ class PlacementFile:
         if sorted(self.trial_connections.values()) != sorted(SILENT_REALM_GATES.keys()):
             raise InvalidPlacementFile("Trial entries are wrong.")
 
+        if self.start_statues and sorted(self.start_statues) != sorted(
+            ALL_SURFACE_PROVINCES
+        ):
+            raise InvalidPlacementFile("Start statue provinces are wrong.")
+
         for item in self.item_locations.values():
             if item not in ALL_ITEM_NAMES:
                 raise InvalidPlacementFile(f'Invalid item "{item}".')
@@ -139,3 +230,254 @@ def check_sets_equal(orig: set, actual: set, name: str):
             error_msg += f"Missing {name}:\n"
             error_msg += ", ".join(missing) + "\n"
         raise InvalidPlacementFile(error_msg)
+
+
+def encode_uint(value: int) -> bytes:
+    """LEB128 varint"""
+    if value < 0:
+        raise ValueError(f"{value} is negative.")
+    out = bytearray()
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+@cache
+def placement_symbols(areas) -> Tuple[Dict[str, int], List[str], int]:
+    """
+    names that placement files are made of, as name -> index, the names themselves and
+    a checksum, so binary placement files from another symbol table are detected
+    """
+    names = list(
+        dict.fromkeys(
+            [
+                *areas.checks,
+                *ALL_ITEM_NAMES,
+                FI_HINTS_KEY,
+                *areas.gossip_stones,
+                *SONG_HINTS,
+                *ALL_DUNGEONS,
+                *DUNGEON_OVERWORLD_ENTRANCES.values(),
+                *SILENT_REALM_GATES,
+                *SILENT_REALM_GATES.values(),
+            ]
+        )
+    )
+    checksum = zlib.crc32("\0".join(names).encode("utf-8"))
+    return {name: i for i, name in enumerate(names)}, names, checksum
+
+
+class BinaryPlacementWriter:
+    """
+    Integers are varints. A string is written as 2*index if it's in the symbol table,
+    otherwise as 2*index+1 into the strings of this record, followed by the utf-8 string
+    the first time it is used
+    """
+
+    def __init__(self, areas):
+        self.symbols, _, checksum = placement_symbols(areas)
+        self.strings: Dict[str, int] = {}
+        self.out = io.BytesIO()
+        self.out.write(PLACEMENT_BINARY_MAGIC)
+        self.write_uint(PLACEMENT_BINARY_VERSION)
+        self.out.write(struct.pack("<I", checksum))
+
+    def getvalue(self) -> bytes:
+        return self.out.getvalue()
+
+    def write_uint(self, value: int):
+        self.out.write(encode_uint(value))
+
+    def write_int(self, value: int):
+        # zigzag, so -1 still takes a single byte
+        self.write_uint(value << 1 if value >= 0 else (~value << 1) | 1)
+
+    def write_str(self, value: str):
+        if (index := self.symbols.get(value)) is not None:
+            self.write_uint(index << 1)
+        elif (index := self.strings.get(value)) is not None:
+            self.write_uint(index << 1 | 1)
+        else:
+            self.write_uint(len(self.strings) << 1 | 1)
+            self.strings[value] = len(self.strings)
+            encoded = value.encode("utf-8")
+            self.write_uint(len(encoded))
+            self.out.write(encoded)
+
+    def write_str_list(self, values: List[str]):
+        self.write_uint(len(values))
+        for value in values:
+            self.write_str(value)
+
+    def write_str_dict(self, values: Dict[str, str]):
+        self.write_uint(len(values))
+        for key, value in values.items():
+            self.write_str(key)
+            self.write_str(value)
+
+
+class BinaryPlacementReader:
+    def __init__(self, areas, data: bytes):
+        _, self.names, checksum = placement_symbols(areas)
+        self.strings: List[str] = []
+        self.data = data
+        self.pos = len(PLACEMENT_BINARY_MAGIC)
+        if data[: self.pos] != PLACEMENT_BINARY_MAGIC:
+            raise InvalidPlacementFile("Not a binary placement file.")
+        if (version := self.read_uint()) != PLACEMENT_BINARY_VERSION:
+            raise InvalidPlacementFile(
+                f"Binary placement file version {version} is not supported, expected {PLACEMENT_BINARY_VERSION}."
+            )
+        (file_checksum,) = struct.unpack_from("<I", data, self.pos)
+        self.pos += 4
+        if file_checksum != checksum:
+            raise InvalidPlacementFile(
+                "Binary placement file was written for a different randomizer version."
+            )
+
+    def read_uint(self) -> int:
+        value = 0
+        shift = 0
+        while True:
+            if self.pos >= len(self.data):
+                raise InvalidPlacementFile("Binary placement file is truncated.")
+            byte = self.data[self.pos]
+            self.pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def read_int(self) -> int:
+        value = self.read_uint()
+        return ~(value >> 1) if value & 1 else value >> 1
+
+    def read_str(self) -> str:
+        value = self.read_uint()
+        index = value >> 1
+        if not value & 1:
+            if index >= len(self.names):
+                raise InvalidPlacementFile(f"Invalid symbol {index}.")
+            return self.names[index]
+        if index < len(self.strings):
+            return self.strings[index]
+        if index > len(self.strings):
+            raise InvalidPlacementFile(f"Invalid string reference {index}.")
+        length = self.read_uint()
+        end = self.pos + length
+        if end > len(self.data):
+            raise InvalidPlacementFile("Binary placement file is truncated.")
+        string = self.data[self.pos : end].decode("utf-8")
+        self.pos = end
+        self.strings.append(string)
+        return string
+
+    def read_str_list(self) -> List[str]:
+        return [self.read_str() for _ in range(self.read_uint())]
+
+    def read_str_dict(self) -> Dict[str, str]:
+        return {self.read_str(): self.read_str() for _ in range(self.read_uint())}
+
+    def check_end(self):
+        if self.pos != len(self.data):
+            raise InvalidPlacementFile(
+                f"{len(self.data) - self.pos} unexpected bytes after the placement file."
+            )
+
+
+class PlacementArchive:
+    """
+    Binary placement files appended to a single file, each record is prefixed with its length.
+    <path>.idx holds the offset of every record as little endian u64, so any record
+    can be read without scanning, it is rebuilt from the archive if it is missing
+    """
+
+    OFFSET = struct.Struct("<Q")
+
+    def __init__(self, path: Path, areas):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        self.areas = areas
+        self.offsets: List[int] = []
+        if self.path.exists():
+            self._load_index()
+
+    def _load_index(self):
+        size = self.path.stat().st_size
+        if self.index_path.exists():
+            index = self.index_path.read_bytes()
+            self.offsets = [offset for (offset,) in self.OFFSET.iter_unpack(index)]
+            if self._end_of_last_record() == size:
+                return
+        # missing or stale index, e.g. an interrupted append
+        self.offsets = []
+        with self.path.open("rb") as f:
+            offset = 0
+            while offset < size:
+                self.offsets.append(offset)
+                offset += self._record_size(f, offset)
+        self.index_path.write_bytes(
+            b"".join(self.OFFSET.pack(offset) for offset in self.offsets)
+        )
+
+    def _end_of_last_record(self) -> int:
+        if not self.offsets:
+            return 0
+        with self.path.open("rb") as f:
+            return self.offsets[-1] + self._record_size(f, self.offsets[-1])
+
+    @staticmethod
+    def _read_length(f: BinaryIO) -> Tuple[int, int]:
+        length = 0
+        shift = 0
+        read = 0
+        while True:
+            byte = f.read(1)
+            if not byte:
+                raise InvalidPlacementFile("Placement archive is truncated.")
+            read += 1
+            length |= (byte[0] & 0x7F) << shift
+            if byte[0] < 0x80:
+                return length, read
+            shift += 7
+
+    def _record_size(self, f: BinaryIO, offset: int) -> int:
+        f.seek(offset)
+        length, prefix = self._read_length(f)
+        return prefix + length
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def clear(self):
+        """removes all the records"""
+        self.path.write_bytes(b"")
+        self.index_path.write_bytes(b"")
+        self.offsets = []
+
+    def append(self, placement_file: PlacementFile) -> int:
+        """appends the placement file and returns its index in the archive"""
+        data = placement_file.to_binary(self.areas)
+        with self.path.open("ab") as f:
+            offset = f.tell()
+            f.write(encode_uint(len(data)))
+            f.write(data)
+        with self.index_path.open("ab") as f:
+            f.write(self.OFFSET.pack(offset))
+        self.offsets.append(offset)
+        return len(self.offsets) - 1
+
+    def __getitem__(self, n: int) -> PlacementFile:
+        with self.path.open("rb") as f:
+            f.seek(self.offsets[n])
+            length, _ = self._read_length(f)
+            data = f.read(length)
+        placement_file = PlacementFile()
+        placement_file.read_from_binary(data, self.areas)
+        return placement_file
+
+    def __iter__(self) -> Iterator[PlacementFile]:
+        for n in range(len(self)):
+            yield self[n]
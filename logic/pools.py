@@ -1,70 +1,112 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
 from .constants import *
-from .logic import PoolEntrance, PoolExit
-
-DUNGEON_MAIN_ENTRANCES_POOL = {
-    entrance_of_exit(exit): PoolEntrance(entrance_of_exit(exit), [exit])
-    for exit in DUNGEON_MAIN_EXITS.values()
-}
-DUNGEON_REVERSE_ENTRANCES_POOL = {
-    exit: PoolExit(exit, [entrance_of_exit(exit)])
-    for exit in DUNGEON_MAIN_EXITS.values()
-}
-
-VANILLA_DUNGEON_ACCESSES = {
-    SV: EIN("Faron - Deep Woods - Exit to Skyview Temple"),
-    ET: EIN("Eldin - Volcano - Exit to Earth Temple"),
-    LMF: EIN("Lanayru - Desert - Exit to Lanayru Mining Facility"),
-    AC: EIN("Faron - Lake Floria - Exit to Ancient Cistern"),
-    SSH: EIN("Lanayru - Lanayru Sand Sea - Sandship Dock Exit"),
-    FS: EIN("Eldin - Volcano Summit - Exit to Fire Sanctuary"),
-    SK: EIN("Skyloft - Exit to Sky Keep"),
-}
-
-DUNGEON_ACCESSES_POOL = {
-    exit: PoolExit(exit, [entrance_of_exit(exit)])
-    for exit in VANILLA_DUNGEON_ACCESSES.values()
-}
-DUNGEON_REVERSE_ACCESSES_POOL = {
-    entrance_of_exit(exit): PoolEntrance(entrance_of_exit(exit), [exit])
-    for exit in VANILLA_DUNGEON_ACCESSES.values()
-}
-
-DUNGEON_ENTRANCES_COMPLETE_POOLS = [
-    (DUNGEON_MAIN_ENTRANCES_POOL, DUNGEON_ACCESSES_POOL),
-    (DUNGEON_REVERSE_ACCESSES_POOL, DUNGEON_REVERSE_ENTRANCES_POOL),
-]
-
-# Silent Realms
-SILENT_REALMS_EXITS = {
-    EIN("Skyloft - Silent Realm - Exit"),
-    EIN("Faron - Silent Realm - Exit"),
-    EIN("Lanayru - Silent Realm - Exit"),
-    EIN("Eldin - Silent Realm - Exit"),
-}
-
-SILENT_REALM_ENTRANCES_POOL = {
-    entrance_of_exit(exit): PoolEntrance(entrance_of_exit(exit), [exit])
-    for exit in SILENT_REALMS_EXITS
-}
-SILENT_REALM_EXITS_POOL = {
-    exit: PoolExit(exit, [entrance_of_exit(exit)]) for exit in SILENT_REALMS_EXITS
-}
-
-SILENT_REALM_ACCESSES = {
-    EIN("Skyloft - Trial Gate Exit"),
-    EIN("Faron - Faron Woods - Trial Gate Exit"),
-    EIN("Lanayru - Desert - Trial Gate Exit"),
-    EIN("Eldin - Volcano - Trial Gate Exit"),
-}
-SILENT_REALM_ACCESSES_POOL = {
-    exit: PoolExit(exit, [entrance_of_exit(exit)]) for exit in SILENT_REALM_ACCESSES
-}
-SILENT_REALM_REVERSE_ACCESSES_POOL = {
-    entrance_of_exit(exit): PoolEntrance(entrance_of_exit(exit), [exit])
-    for exit in SILENT_REALM_ACCESSES
-}
-
-SILENT_REALMNS_COMPLETE_POOLS = [
-    (SILENT_REALM_ENTRANCES_POOL, SILENT_REALM_ACCESSES_POOL),
-    (SILENT_REALM_REVERSE_ACCESSES_POOL, SILENT_REALM_EXITS_POOL),
-]
+
+
+@dataclass
+class PoolSlot:
+    # all these exits lead to the entrance of the target placed in this slot
+    exits: List[EIN]
+    # the exits of the target placed in this slot lead back to this entrance
+    entrance: EIN
+
+
+@dataclass
+class PoolTarget:
+    entrance: EIN
+    # lead back to the entrance of the slot this target is placed in
+    exits: List[EIN] = field(default_factory=list)
+    # exit -> vanilla entrance, these only lead back to the slot if the target isn't in its vanilla slot
+    exits_if_moved: Dict[EIN, EIN] = field(default_factory=dict)
+    # exit -> entrance, linked wherever the target is placed
+    fixed_exits: Dict[EIN, EIN] = field(default_factory=dict)
+
+
+@dataclass
+class EntrancePool:
+    """
+    Connections that are shuffled with one another, every slot gets exactly one target
+    """
+
+    slots: Dict[str, PoolSlot]
+    targets: Dict[str, PoolTarget]
+    # slot -> target
+    vanilla: Dict[str, str]
+    # slot -> target, filled in when the connections are placed
+    assignment: Dict[str, str]
+
+    def transitions(self, slot_name: str, target_name: str) -> Dict[EIN, EIN]:
+        """exit -> entrance of all exits linked when the target is placed in the slot"""
+        slot = self.slots[slot_name]
+        target = self.targets[target_name]
+        moved = self.vanilla[slot_name] != target_name
+        transitions = {exit: target.entrance for exit in slot.exits}
+        for exit in target.exits:
+            transitions[exit] = slot.entrance
+        for exit, vanilla_entrance in target.exits_if_moved.items():
+            transitions[exit] = slot.entrance if moved else vanilla_entrance
+        transitions |= target.fixed_exits
+        return transitions
+
+    def exits(self) -> List[EIN]:
+        """all exits that get linked when placing this pool"""
+        exits = [exit for slot in self.slots.values() for exit in slot.exits]
+        for target in self.targets.values():
+            exits.extend(target.exits)
+            exits.extend(target.exits_if_moved)
+            exits.extend(target.fixed_exits)
+        return exits
+
+
+def DUNGEON_ENTRANCES_POOL(
+    norm: Callable[[str], EIN],
+    dungeons: List[str],
+    map_transitions: Dict[EIN, EIN],
+    assignment: Dict[str, str],
+) -> EntrancePool:
+    """shuffles the dungeons among the overworld entrances of these dungeons"""
+    slots = {}
+    targets = {}
+    for dungeon in dungeons:
+        entrance_name = DUNGEON_OVERWORLD_ENTRANCES[dungeon]
+        exits = [norm(exit) for exit in DUNGEON_ENTRANCE_EXITS[entrance_name]]
+        slots[entrance_name] = PoolSlot(exits, EIN(entrance_of_exit(exits[0])))
+
+        main_exit = norm(DUNGEON_MAIN_EXITS[dungeon])
+        exits_if_moved = {}
+        if dungeon == LMF:
+            # the exit to the Temple of Time leads back to the dungeon entrance as well
+            second_exit = norm(LMF_SECOND_EXIT)
+            exits_if_moved[second_exit] = map_transitions[second_exit]
+        targets[dungeon] = PoolTarget(
+            EIN(entrance_of_exit(main_exit)), [main_exit], exits_if_moved
+        )
+
+    vanilla = {DUNGEON_OVERWORLD_ENTRANCES[dungeon]: dungeon for dungeon in dungeons}
+    return EntrancePool(slots, targets, vanilla, assignment)
+
+
+def SILENT_REALMS_POOL(
+    norm: Callable[[str], EIN], realms: List[str], assignment: Dict[str, str]
+) -> EntrancePool:
+    """
+    shuffles the silent realms among the trial gates, the exits of silent realms aren't part of logic
+    """
+    slots = {}
+    targets = {}
+    for realm in realms:
+        gate = SILENT_REALM_GATES[realm]
+        exit = norm(TRIAL_GATE_EXITS[gate])
+        slots[gate] = PoolSlot([exit], EIN(entrance_of_exit(exit)))
+        # Linking the trial exit before the realm is placed would make its entrance
+        # non-opaque while unreachable, the realm would get simplified away
+        trial_exit = norm(SILENT_REALM_EXITS[realm])
+        realm_entrance = EIN(entrance_of_exit(trial_exit))
+        targets[realm] = PoolTarget(
+            realm_entrance, fixed_exits={trial_exit: realm_entrance}
+        )
+
+    vanilla = {SILENT_REALM_GATES[realm]: realm for realm in realms}
+    return EntrancePool(slots, targets, vanilla, assignment)
@@ -7,7 +7,7 @@ from typing import List
 from .constants import *
 from .logic import Logic
 from .inventory import BANNED_BIT, EVERYTHING_UNBANNED_BIT, EXTENDED_ITEM
-from .fill_algo_common import RandomizationSettings, UserOutput
+from .fill_algo_common import FillStats, RandomizationSettings, UserOutput
 
 
 class RandomFill:
@@ -17,6 +17,7 @@ class RandomFill:
         self.logic = logic
         self.rng = rng
         self.randosettings = randosettings
+        self.stats = FillStats()
 
     def randomize(self, useroutput: UserOutput):
         self.useroutput = useroutput
@@ -3,13 +3,20 @@ from collections import defaultdict
 from dataclasses import dataclass
 from functools import cache
 import random
-from typing import List  # Only for typing purposes
+from typing import (
+    Any,
+    Callable,
+    Container,
+    Dict,
+    List,
+    Tuple,
+)  # Only for typing purposes
 
 from options import Options, OPTIONS
 from .random_fill import RandomFill
 from .front_fill import FrontFill
 from .assumed_fill import AssumedFill
-from .fill_algo_common import RandomizationSettings, UserOutput
+from .fill_algo_common import FillStats, RandomizationSettings, UserOutput
 from .logic import Logic, Placement, LogicSettings
 from .logic_utils import AdditionalInfo, LogicUtils
 from .logic_input import Areas
@@ -25,18 +32,6 @@ from .placements import *
 from .pools import *
 
 
-def shuffle_indices(self, list, indices=None):
-    if indices is None:
-        return self.shuffle(list)
-    else:
-        n = len(indices)
-        for i in range(n - 1):
-            j = self.randint(i, n - 1)
-            ii, jj = indices[i], indices[j]
-            list[ii], list[jj] = list[jj], list[ii]
-        return
-
-
 class Rando:
     def __init__(self, areas: Areas, options: Options, rng: random.Random):
         self.options = options
@@ -133,6 +128,25 @@ class Rando:
         self.rando_algo.randomize(useroutput)
         self.randomised = True
 
+    def use_placement(
+        self,
+        placement: Placement,
+        dungeon_entrances: Dict[str, str],
+        trial_entrances: Dict[str, str],
+        fill_stats: FillStats,
+    ):
+        """uses the finished placement of a fill done elsewhere, instead of randomizing"""
+        self.rando_algo.logic.placement = placement
+        # the entrance pools fill those in during the fill
+        self.randomized_dungeon_entrance.update(dungeon_entrances)
+        self.randomized_trial_entrance.update(trial_entrances)
+        self.rando_algo.stats = fill_stats
+        self.randomised = True
+
+    @property
+    def fill_stats(self) -> FillStats:
+        return self.rando_algo.stats
+
     def parse_options(self):
         # Initialize location related attributes.
         self.randomize_required_dungeons()  # self.required_dungeons, self.unrequired_dungeons
@@ -305,63 +319,14 @@ class Rando:
         self.placement.add_starting_items(starting_items)
 
     def ban_the_banned(self):
-        self.banned: List[EIN] = []
-        self.banned.extend(map(self.norm, self.options["excluded-locations"]))
-
-        if self.options["empty-unrequired-dungeons"]:
-            self.banned.extend(
-                self.norm(entrance_of_exit(DUNGEON_MAIN_EXITS[dungeon]))
-                for dungeon in self.unrequired_dungeons
-            )
-
-            if (
-                not self.options["triforce-required"]
-                or self.options["triforce-shuffle"] == "Anywhere"
-            ):
-                self.banned.append(self.norm(entrance_of_exit(DUNGEON_MAIN_EXITS[SK])))
-
-        # ban the forced vanilla relic checks to ensure songs can be counted as nonprogress items if the rewards are also off
-        if not self.options["treasuresanity-in-silent-realms"]:
-            self.banned.extend(map(self.norm, TRIAL_RELIC_CHECKS))
-
-    def get_endgame_requirements(self):
-        # needs to be able to open GoT and open it, requires required dungeons
-        got_raising_requirement = (
-            DNFInventory(self.short_to_full(SONG_IMPA_CHECK))
-            if self.options["got-start"]
-            else DNFInventory(True)
-        )
-        got_opening_requirement = InventoryAtom(
-            PROGRESSIVE_SWORD, SWORD_COUNT[self.options["got-sword-requirement"]]
-        )
-        horde_door_requirement = (
-            DNFInventory(self.short_to_full(COMPLETE_TRIFORCE))
-            if self.options["triforce-required"]
-            else DNFInventory(True)
+        self.banned: List[EIN] = banned_locations(
+            self.options, self.norm, self.unrequired_dungeons
         )
 
-        dungeons_req = Inventory()
-        for dungeon in self.required_dungeons:
-            dungeons_req |= Inventory(self.short_to_full(DUNGEON_FINAL_CHECK[dungeon]))
-
-        if self.options["got-dungeon-requirement"] == "Required":
-            got_opening_requirement &= DNFInventory(dungeons_req)
-        elif self.options["got-dungeon-requirement"] == "Unrequired":
-            horde_door_requirement &= DNFInventory(dungeons_req)
-
-        everything_list = (
-            {check["req_index"] for check in self.areas.checks.values()}
-            | {check["req_index"] for check in self.areas.gossip_stones.values()}
-            | {EXTENDED_ITEM[self.short_to_full(DEMISE)]}
+    def get_endgame_requirements(self):
+        self.endgame_requirements = endgame_requirements(
+            self.options, self.areas, self.required_dungeons
         )
-        everything_req = DNFInventory(Inventory(everything_list))
-
-        self.endgame_requirements = {
-            GOT_RAISING_REQUIREMENT: got_raising_requirement,
-            GOT_OPENING_REQUIREMENT: got_opening_requirement,
-            HORDE_DOOR_REQUIREMENT: horde_door_requirement,
-            EVERYTHING: everything_req,
-        }
 
     def initialize_items(self):
         # Initialize item related attributes.
@@ -418,56 +383,13 @@ class Rando:
         )
 
     def set_placement_options(self):
-        shopsanity = self.options["shopsanity"]
         place_gondo_progressives = self.options["gondo-upgrades"]
-        damage_multiplier = self.options["damage-multiplier"]
-
-        options = {
-            OPEN_THUNDERHEAD_OPTION: self.options["open-thunderhead"] == "Open",
-            OPEN_ET_OPTION: self.options["open-et"],
-            OPEN_LMF_OPTION: self.options["open-lmf"] == "Open",
-            LMF_NODES_ON_OPTION: self.options["open-lmf"] == "Main Node",
-            FLORIA_GATES_OPTION: self.options["open-lake-floria"] == "Floria Gates",
-            TALK_TO_YERBAL_OPTION: self.options["open-lake-floria"] == "Talk to Yerbal",
-            VANILLA_LAKE_FLORIA_OPTION: self.options["open-lake-floria"] == "Vanilla",
-            OPEN_LAKE_FLORIA_OPTION: self.options["open-lake-floria"] == "Open",
-            RANDOMIZED_BEEDLE_OPTION: shopsanity != "Vanilla",
-            GONDO_UPGRADES_ON_OPTION: not place_gondo_progressives,
-            NO_BIT_CRASHES: self.options["bit-patches"] == "Fix BiT Crashes",
-            NONLETHAL_HOT_CAVE: damage_multiplier < 12,
-            UPGRADED_SKYWARD_STRIKE: self.options["upgraded-skyward-strike"],
-            FS_LAVA_FLOW_OPTION: self.options["fs-lava-flow"],
-            NO_RANDOM_PUZZLES_OPTION: not self.options["random-puzzles"],
-        }
-
-        enabled_tricks = set(self.options["enabled-tricks-bitless"])
-
-        self.logic_options_requirements = {
-            k: DNFInventory(b) for k, b in options.items()
-        } | {
-            EIN(trick(trick_name)): DNFInventory(trick_name in enabled_tricks)
-            for trick_name in OPTIONS["enabled-tricks-bitless"]["choices"]
-        }
+        shopsanity = self.options["shopsanity"]
+        self.logic_options_requirements = logic_options_requirements(self.options)
 
         self.placement |= SINGLE_CRYSTAL_PLACEMENT(self.norm, self.areas.checks)
 
-        vanilla_map_transitions = {}
-        vanilla_reverse_map_transitions = {}
-        for exit, v in self.areas.map_exits.items():
-            if (
-                v["type"] == "entrance"
-                or v.get("disabled", False)
-                or "vanilla" not in v
-            ):
-                continue
-            entrance = self.norm(v["vanilla"])
-            vanilla_map_transitions[exit] = entrance
-            vanilla_reverse_map_transitions[entrance] = exit
-
-        self.placement |= Placement(
-            map_transitions=vanilla_map_transitions,
-            reverse_map_transitions=vanilla_reverse_map_transitions,
-        )
+        self.placement |= vanilla_map_transitions(self.areas)
 
         sword_reward_mode = self.options["sword-dungeon-reward"]
         if sword_reward_mode != "None":
@@ -564,94 +486,67 @@ class Rando:
             trial_treasure_amount, self.norm, self.areas.checks
         )
 
-    #
-    #
-    # Retro-compatibility
-
-    def reassign_entrances(
-        self, exs1: list[EIN] | list[list[EIN]], exs2: list[EIN] | list[list[EIN]]
-    ):
-        for ex1, ex2 in zip(exs1, exs2):
-            if isinstance(ex1, str):
-                ex1 = [ex1]
-            if isinstance(ex2, str):
-                ex2 = [ex2]
-            assert ex1[0] in self.placement.map_transitions
-            assert ex2[0] in self.placement.map_transitions
-            en1 = EIN(entrance_of_exit(ex1[0]))
-            en2 = EIN(entrance_of_exit(ex2[0]))
-            for exx1 in ex1:
-                self.placement.map_transitions[exx1] = en2
-            for exx2 in ex2:
-                self.placement.map_transitions[exx2] = en1
-            self.placement.reverse_map_transitions[en1] = ex2[0]
-            self.placement.reverse_map_transitions[en2] = ex1[0]
-
     def randomize_dungeons_trials_starting_entrances(self):
-        # Do this in a deliberately hacky way, this is not supposed to be how ER works
+        self.randomized_dungeon_entrance = {
+            DUNGEON_OVERWORLD_ENTRANCES[dungeon]: dungeon for dungeon in ALL_DUNGEONS
+        }
+        self.randomized_trial_entrance = {
+            SILENT_REALM_GATES[realm]: realm for realm in ALL_SILENT_REALMS
+        }
+
         # Dungeon Entrance Rando.
         der = self.options["randomize-entrances"]
-        dungeons = ALL_DUNGEONS.copy()
-        entrances = [DUNGEON_OVERWORLD_ENTRANCES[dungeon] for dungeon in ALL_DUNGEONS]
         if der == "All Surface Dungeons":
-            indices = list(range(len(REGULAR_DUNGEONS)))
-            shuffle_indices(self.rng, dungeons, indices=indices)
-
+            dungeon_pools = [REGULAR_DUNGEONS]
         elif der == "All Surface Dungeons + Sky Keep":
-            self.rng.shuffle(dungeons)
-
+            dungeon_pools = [ALL_DUNGEONS]
         elif der == "Required Dungeons Separately":
-            req_indices = [ALL_DUNGEONS.index(d) for d in self.required_dungeons]
-            unreq_indices = [ALL_DUNGEONS.index(d) for d in self.unrequired_dungeons]
+            required_pool = list(self.required_dungeons)
+            unrequired_pool = list(self.unrequired_dungeons)
             if (
                 not self.options["triforce-required"]
                 or self.options["triforce-shuffle"] == "Anywhere"
             ):
-                unreq_indices.append(ALL_DUNGEONS.index(SK))
+                unrequired_pool.append(SK)
             else:
-                req_indices.append(ALL_DUNGEONS.index(SK))
-            shuffle_indices(self.rng, dungeons, indices=req_indices)
-            shuffle_indices(self.rng, dungeons, indices=unreq_indices)
+                required_pool.append(SK)
+            dungeon_pools = [required_pool, unrequired_pool]
         else:
             assert der == "None"
-
-        self.randomized_dungeon_entrance = {}
-        for entrance, dungeon in zip(entrances, dungeons):
-            self.randomized_dungeon_entrance[entrance] = dungeon
-
-        pre_LMF_index = dungeons.index(LMF)
-
-        dungeon_entrances = [
-            [self.norm(e) for e in DUNGEON_ENTRANCE_EXITS[k]] for k in entrances
+            dungeon_pools = []
+
+        entrance_pools = [
+            DUNGEON_ENTRANCES_POOL(
+                self.norm,
+                dungeons,
+                self.placement.map_transitions,
+                self.randomized_dungeon_entrance,
+            )
+            for dungeons in dungeon_pools
+            if len(dungeons) > 1
         ]
-        dungeons = [[self.norm(DUNGEON_MAIN_EXITS[k])] for k in dungeons]
-
-        if ALL_DUNGEONS[pre_LMF_index] != LMF:
-            dungeons[pre_LMF_index].append(self.norm(LMF_SECOND_EXIT))
-
-        self.reassign_entrances(dungeon_entrances, dungeons)
 
         # Trial Gate Entrance Rando.
-        ter = self.options["randomize-trials"]
-        pool = ALL_SILENT_REALMS.copy()
-        gates = [SILENT_REALM_GATES[realm] for realm in ALL_SILENT_REALMS]
-        if ter:
-            self.rng.shuffle(pool)
-
-        self.randomized_trial_entrance = {}
-        for gate, realm in zip(gates, pool):
-            self.randomized_trial_entrance[gate] = realm
-
-        trial_entrances = [self.norm(TRIAL_GATE_EXITS[k]) for k in gates]
-        trials = [self.norm(SILENT_REALM_EXITS[k]) for k in pool]
-        self.reassign_entrances(trial_entrances, trials)
-
-        # Ugly patch for needlessly useful songs : remove the trial exits from logic
-        for trial_exit in trials:
-            self.placement.map_transitions[trial_exit] = EIN(
-                entrance_of_exit(trial_exit)
+        if self.options["randomize-trials"]:
+            entrance_pools.append(
+                SILENT_REALMS_POOL(
+                    self.norm, ALL_SILENT_REALMS, self.randomized_trial_entrance
+                )
             )
 
+        # The connections of shuffled entrances are placed by the fill algorithm
+        for pool in entrance_pools:
+            for exit in pool.exits():
+                entrance = self.placement.map_transitions.pop(exit)
+                if self.placement.reverse_map_transitions.get(entrance) == exit:
+                    del self.placement.reverse_map_transitions[entrance]
+        self.randosettings.entrance_pools = entrance_pools
+        shuffled_exits = {exit for pool in entrance_pools for exit in pool.exits()}
+
+        self.placement.map_transitions |= trial_exit_transitions(
+            self.norm, shuffled_exits
+        )
+
         self.randomize_starting_entrance()
 
         # Starting bird statue rando
@@ -678,13 +573,9 @@ class Rando:
         }
 
         # Logically bind the first-time dive to the statue to unlock it
-
-        for exit, values in self.areas.map_exits.items():
-            # First time dives have the 'pillar-province' field in entrances.yaml
-            if (province := values.get("pillar-province")) is not None:
-                self.placement.map_transitions[exit] = self.randomized_start_statues[
-                    province
-                ][0]
+        self.placement.map_transitions |= start_statue_transitions(
+            self.areas, self.randomized_start_statues
+        )
 
     def randomize_starting_entrance(self):
         # Starting Entrance Rando.
@@ -754,3 +645,144 @@ class Rando:
         assert self.randomized_start_entrance["layer"] is not None
         assert self.randomized_start_entrance["entrance"] is not None
         assert self.randomized_start_entrance["day-night"] is not None
+
+
+def banned_locations(
+    options: Options, norm: Callable[[str], EIN], unrequired_dungeons: List[str]
+) -> List[EIN]:
+    banned = list(map(norm, options["excluded-locations"]))
+
+    if options["empty-unrequired-dungeons"]:
+        banned.extend(
+            norm(entrance_of_exit(DUNGEON_MAIN_EXITS[dungeon]))
+            for dungeon in unrequired_dungeons
+        )
+
+        if (
+            not options["triforce-required"]
+            or options["triforce-shuffle"] == "Anywhere"
+        ):
+            banned.append(norm(entrance_of_exit(DUNGEON_MAIN_EXITS[SK])))
+
+    # ban the forced vanilla relic checks to ensure songs can be counted as nonprogress items if the rewards are also off
+    if not options["treasuresanity-in-silent-realms"]:
+        banned.extend(map(norm, TRIAL_RELIC_CHECKS))
+    return banned
+
+
+def endgame_requirements(
+    options: Options, areas: Areas, required_dungeons: List[str]
+) -> Dict[EIN, DNFInventory]:
+    """requirements of the endgame checks, they depend on the options and the required dungeons"""
+    # needs to be able to open GoT and open it, requires required dungeons
+    got_raising_requirement = (
+        DNFInventory(areas.short_to_full(SONG_IMPA_CHECK))
+        if options["got-start"]
+        else DNFInventory(True)
+    )
+    got_opening_requirement = InventoryAtom(
+        PROGRESSIVE_SWORD, SWORD_COUNT[options["got-sword-requirement"]]
+    )
+    horde_door_requirement = (
+        DNFInventory(areas.short_to_full(COMPLETE_TRIFORCE))
+        if options["triforce-required"]
+        else DNFInventory(True)
+    )
+
+    dungeons_req = Inventory()
+    for dungeon in required_dungeons:
+        dungeons_req |= Inventory(areas.short_to_full(DUNGEON_FINAL_CHECK[dungeon]))
+
+    if options["got-dungeon-requirement"] == "Required":
+        got_opening_requirement &= DNFInventory(dungeons_req)
+    elif options["got-dungeon-requirement"] == "Unrequired":
+        horde_door_requirement &= DNFInventory(dungeons_req)
+
+    everything_list = (
+        {check["req_index"] for check in areas.checks.values()}
+        | {check["req_index"] for check in areas.gossip_stones.values()}
+        | {EXTENDED_ITEM[areas.short_to_full(DEMISE)]}
+    )
+    everything_req = DNFInventory(Inventory(everything_list))
+
+    return {
+        GOT_RAISING_REQUIREMENT: got_raising_requirement,
+        GOT_OPENING_REQUIREMENT: got_opening_requirement,
+        HORDE_DOOR_REQUIREMENT: horde_door_requirement,
+        EVERYTHING: everything_req,
+    }
+
+
+def logic_options_requirements(options: Options) -> Dict[EIN, DNFInventory]:
+    """requirements of the option and trick items"""
+    shopsanity = options["shopsanity"]
+    place_gondo_progressives = options["gondo-upgrades"]
+    damage_multiplier = options["damage-multiplier"]
+
+    option_values = {
+        OPEN_THUNDERHEAD_OPTION: options["open-thunderhead"] == "Open",
+        OPEN_ET_OPTION: options["open-et"],
+        OPEN_LMF_OPTION: options["open-lmf"] == "Open",
+        LMF_NODES_ON_OPTION: options["open-lmf"] == "Main Node",
+        FLORIA_GATES_OPTION: options["open-lake-floria"] == "Floria Gates",
+        TALK_TO_YERBAL_OPTION: options["open-lake-floria"] == "Talk to Yerbal",
+        VANILLA_LAKE_FLORIA_OPTION: options["open-lake-floria"] == "Vanilla",
+        OPEN_LAKE_FLORIA_OPTION: options["open-lake-floria"] == "Open",
+        RANDOMIZED_BEEDLE_OPTION: shopsanity != "Vanilla",
+        GONDO_UPGRADES_ON_OPTION: not place_gondo_progressives,
+        NO_BIT_CRASHES: options["bit-patches"] == "Fix BiT Crashes",
+        NONLETHAL_HOT_CAVE: damage_multiplier < 12,
+        UPGRADED_SKYWARD_STRIKE: options["upgraded-skyward-strike"],
+        FS_LAVA_FLOW_OPTION: options["fs-lava-flow"],
+        NO_RANDOM_PUZZLES_OPTION: not options["random-puzzles"],
+    }
+
+    enabled_tricks = set(options["enabled-tricks-bitless"])
+
+    return {k: DNFInventory(b) for k, b in option_values.items()} | {
+        EIN(trick(trick_name)): DNFInventory(trick_name in enabled_tricks)
+        for trick_name in OPTIONS["enabled-tricks-bitless"]["choices"]
+    }
+
+
+def vanilla_map_transitions(areas: Areas) -> Placement:
+    map_transitions = {}
+    reverse_map_transitions = {}
+    for exit, v in areas.map_exits.items():
+        if v["type"] == "entrance" or v.get("disabled", False) or "vanilla" not in v:
+            continue
+        entrance = areas.short_to_full(v["vanilla"])
+        map_transitions[exit] = entrance
+        reverse_map_transitions[entrance] = exit
+
+    return Placement(
+        map_transitions=map_transitions,
+        reverse_map_transitions=reverse_map_transitions,
+    )
+
+
+def start_statue_transitions(
+    areas: Areas, start_statues: Dict[str, Tuple[EIN, Any]]
+) -> Dict[EIN, EIN]:
+    """the first time dive into each province leads to its starting statue"""
+    return {
+        exit: start_statues[province][0]
+        for exit, values in areas.map_exits.items()
+        # First time dives have the 'pillar-province' field in entrances.yaml
+        if (province := values.get("pillar-province")) is not None
+    }
+
+
+def trial_exit_transitions(
+    norm: Callable[[str], EIN], shuffled_exits: Container[EIN] = ()
+) -> Dict[EIN, EIN]:
+    """
+    Ugly patch for needlessly useful songs : remove the trial exits from logic
+    Shuffled realms only get this once they are placed
+    """
+    transitions = {}
+    for realm in ALL_SILENT_REALMS:
+        trial_exit = norm(SILENT_REALM_EXITS[realm])
+        if trial_exit not in shuffled_exits:
+            transitions[trial_exit] = EIN(entrance_of_exit(trial_exit))
+    return transitions
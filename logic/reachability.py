@@ -0,0 +1,88 @@
+from __future__ import annotations
+from typing import Iterable, List, Set
+
+from .inventory import EXTENDED_ITEM, Inventory
+from .logic_expression import DNFInventory
+
+
+def bitset_to_inventory(bitset: int) -> Inventory:
+    return Inventory(
+        {EXTENDED_ITEM(i) for i in range(bitset.bit_length()) if bitset >> i & 1}
+    )
+
+
+class ReachabilitySession:
+    """
+    Keeps the fill of an inventory up to date while inventory bits and single requirements change.
+    Only the bits whose requirements mention a changed bit are evaluated again,
+    the whole state is two bitsets so it is cheap to keep around
+    """
+
+    def __init__(self, requirements: List[DNFInventory], inventory: Inventory):
+        self.requirements = requirements
+        self.inventory = inventory.bitset
+        self.full = 0
+        # bit -> bits whose requirements mention it, stale entries only cost some evaluations
+        self.dependents: List[Set[int]] = [set() for _ in requirements]
+        for bit in range(len(requirements)):
+            self._add_dependencies(bit)
+        self._propagate(range(len(requirements)))
+
+    def __getitem__(self, bit: EXTENDED_ITEM) -> bool:
+        return bool(self.full >> bit & 1)
+
+    @property
+    def full_inventory(self) -> Inventory:
+        return bitset_to_inventory(self.full)
+
+    @property
+    def base_inventory(self) -> Inventory:
+        return bitset_to_inventory(self.inventory)
+
+    def add_item(self, bit: EXTENDED_ITEM):
+        self.inventory |= 1 << bit
+        self._propagate((bit,))
+
+    def remove_item(self, bit: EXTENDED_ITEM):
+        self.inventory &= ~(1 << bit)
+        self._invalidate(bit)
+
+    def update_requirement(self, bit: EXTENDED_ITEM):
+        """has to be called after requirements[bit] changed"""
+        self._add_dependencies(bit)
+        self._invalidate(bit)
+
+    def _add_dependencies(self, bit: int):
+        for conj in self.requirements[bit].disjunction:
+            for req_bit in conj.mentioned().intset:
+                self.dependents[req_bit].add(bit)
+
+    def _satisfied(self, bit: int) -> bool:
+        if self.inventory >> bit & 1:
+            return True
+        full = self.full
+        return any(
+            conj.satisfied_by(full) for conj in self.requirements[bit].disjunction
+        )
+
+    def _propagate(self, todo: Iterable[int]):
+        todo = list(todo)
+        while todo:
+            bit = todo.pop()
+            if not self.full >> bit & 1 and self._satisfied(bit):
+                self.full |= 1 << bit
+                todo.extend(self.dependents[bit])
+
+    def _invalidate(self, bit: int):
+        # everything reached that might have been reached through bit is unreached again,
+        # then filled again from what is left
+        affected = {bit}
+        todo = [bit]
+        while todo:
+            for dependent in self.dependents[todo.pop()]:
+                if dependent not in affected and self.full >> dependent & 1:
+                    affected.add(dependent)
+                    todo.append(dependent)
+        for affected_bit in affected:
+            self.full &= ~(1 << affected_bit)
+        self._propagate(affected)
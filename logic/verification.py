@@ -0,0 +1,176 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from options import Options
+from .constants import *
+from .inventory import BANNED_BIT, EMPTY_INV, EXTENDED_ITEM, Inventory
+from .logic import Logic, LogicSettings
+from .logic_expression import DNFInventory
+from .logic_input import Areas
+from .logic_utils import AdditionalInfo, LogicUtils
+from .placement_file import InvalidPlacementFile, PlacementFile
+from .pools import DUNGEON_ENTRANCES_POOL, SILENT_REALMS_POOL
+from .reachability import ReachabilitySession
+from .randomize import (
+    banned_locations,
+    endgame_requirements,
+    logic_options_requirements,
+    start_statue_transitions,
+    trial_exit_transitions,
+    vanilla_map_transitions,
+)
+
+
+@dataclass
+class PlacementVerification:
+    # the goals in the order they are checked, the required dungeons first, then Demise
+    goals: List[EIN]
+    unreachable_goal: EIN | None = None
+    unreachable_locations: List[EIN] = field(default_factory=list)
+    # only computed if asked for
+    spheres: List[List[EIN]] | None = None
+
+    @property
+    def beatable(self) -> bool:
+        return self.unreachable_goal is None
+
+
+def start_entrance_of(areas: Areas, start_entrance: Dict[str, Any]) -> EIN:
+    """entrance described by a randomized start entrance, the vanilla start if there's none"""
+    for entrance, values in areas.map_entrances.items():
+        if not start_entrance:
+            if "Start Entrance" in str(entrance):
+                return entrance
+        elif values.get("statue-name", values["short_name"]) == start_entrance[
+            "statue-name"
+        ] and all(
+            values.get(key) == start_entrance[key]
+            for key in ("stage", "room", "layer", "entrance")
+        ):
+            return entrance
+    raise ValueError(f"Unknown start entrance {start_entrance}.")
+
+
+def vanilla_start_statues(areas: Areas) -> Dict[str, Tuple[EIN, Any]]:
+    return {
+        values["province"]: (entrance, values)
+        for entrance, values in areas.map_entrances.items()
+        if values.get("subtype") == "bird-statue-entrance"
+        and values.get("vanilla-start-statue")
+        and "Fire Sanctuary" not in entrance
+    }
+
+
+def placement_logic(areas: Areas, placement_file: PlacementFile, utils=True) -> Logic:
+    """
+    Logic with the items and entrances of the placement file, under its options.
+    Placement files from older versions don't have the start entrance and statues,
+    the vanilla ones are used for those unless the options randomize them.
+    Without utils, only a plain Logic is built, that's enough for reachability and much cheaper
+    """
+    options: Options = placement_file.options
+    norm = areas.short_to_full
+    if (
+        not placement_file.start_entrance
+        and options["random-start-entrance"] != "Vanilla"
+    ):
+        raise InvalidPlacementFile(
+            "The start entrance is randomized, but the placement file doesn't have it."
+        )
+    if not placement_file.start_statues and options["random-start-statues"]:
+        raise InvalidPlacementFile(
+            "The start statues are randomized, but the placement file doesn't have them."
+        )
+
+    placement = vanilla_map_transitions(areas)
+    map_transitions = placement.map_transitions
+    pools = [
+        DUNGEON_ENTRANCES_POOL(
+            norm, ALL_DUNGEONS, map_transitions, placement_file.dungeon_connections
+        ),
+        SILENT_REALMS_POOL(norm, ALL_SILENT_REALMS, placement_file.trial_connections),
+    ]
+    for pool in pools:
+        for slot_name, target_name in pool.assignment.items():
+            map_transitions |= pool.transitions(slot_name, target_name)
+    map_transitions |= trial_exit_transitions(norm)
+    map_transitions["\\Start"] = start_entrance_of(areas, placement_file.start_entrance)
+    start_statues = {
+        province: (entrance, areas.map_entrances[entrance])
+        for province, entrance in placement_file.start_statues.items()
+    } or vanilla_start_statues(areas)
+    map_transitions |= start_statue_transitions(areas, start_statues)
+
+    placement.locations = dict(placement_file.item_locations)
+    placement.items = {item: loc for loc, item in placement.locations.items()}
+    placement.starting_items = set(placement_file.starting_items)
+
+    required_dungeons = list(placement_file.required_dungeons)
+    unrequired_dungeons = [
+        dungeon for dungeon in REGULAR_DUNGEONS if dungeon not in required_dungeons
+    ]
+    banned = banned_locations(options, norm, unrequired_dungeons)
+    runtime_requirements = (
+        logic_options_requirements(options)
+        | endgame_requirements(options, areas, required_dungeons)
+        | {item: DNFInventory(True) for item in placement.starting_items}
+    )
+    if options["logic-mode"] == "No Logic":
+        runtime_requirements |= {
+            item: DNFInventory(True)
+            for item in EXTENDED_ITEM.items_list
+            if EXTENDED_ITEM[item] != BANNED_BIT
+        }
+
+    if not utils:
+        starting_inventory = Inventory(
+            {EXTENDED_ITEM[item] for item in placement.starting_items}
+        )
+        settings = LogicSettings(
+            starting_inventory, EMPTY_INV, runtime_requirements, banned
+        )
+        return Logic(areas, settings, placement, optim=False)
+
+    additional_info = AdditionalInfo(
+        required_dungeons,
+        unrequired_dungeons,
+        placement_file.dungeon_connections,
+        placement_file.trial_connections,
+        placement_file.start_entrance,
+        start_statues,
+        list(placement.locations),
+        placement_file.puzzles,
+    )
+    return LogicUtils(areas, placement, additional_info, runtime_requirements, banned)
+
+
+def verify_placement(
+    areas: Areas, placement_file: PlacementFile, spheres=False
+) -> PlacementVerification:
+    """
+    Checks that the goals of the required dungeons and Demise can be reached
+    with the placement file, without going through the randomizer
+    """
+    logic = placement_logic(areas, placement_file, utils=spheres)
+    # only evaluates the requirements mentioning newly reached bits, unlike Logic.fill_inventory
+    full_inventory = ReachabilitySession(logic.requirements, EMPTY_INV)
+
+    goals = [DUNGEON_GOALS[dungeon] for dungeon in placement_file.required_dungeons]
+    goal_checks = [areas.short_to_full(GOAL_CHECKS[goal]) for goal in goals]
+    goals.append(DEMISE)
+    goal_checks.append(areas.short_to_full(DEMISE))
+
+    verification = PlacementVerification(goals)
+    for goal, check in zip(goals, goal_checks):
+        if not full_inventory[EXTENDED_ITEM[check]]:
+            verification.unreachable_goal = goal
+            break
+    # excluded locations can still be reached, they just can't be required
+    full_inventory.add_item(BANNED_BIT)
+    verification.unreachable_locations = [
+        loc for loc in areas.checks if not full_inventory[EXTENDED_ITEM[loc]]
+    ]
+    if spheres:
+        verification.spheres = logic.calculate_playthrough_progression_spheres()
+    return verification
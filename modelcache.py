@@ -0,0 +1,73 @@
+from hashlib import sha1
+from pathlib import Path
+from typing import Iterable, Optional
+import json
+
+import numpy as np
+
+# recoloured model arcs and preview images only depend on the model pack files and the chosen colors,
+# so they are kept between runs
+MODEL_CACHE_PATH = Path("model-cache")
+# bump this when the recolouring changes, so old results aren't used anymore
+MODEL_CACHE_VERSION = 2
+# how many different recolours of the same file are kept
+MAX_CACHED_PER_NAME = 8
+
+
+def recolour_key(source_paths: Iterable[Path], colors) -> str:
+    """
+    Returns a key for the recolour of the given files (model arc, masks etc.) with the given colors,
+    it changes whenever the content of any of the files or the colors change
+    """
+    digest = sha1(str(MODEL_CACHE_VERSION).encode())
+    for path in sorted(source_paths):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    digest.update(json.dumps(colors, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def _cache_path(name: str, key: str, suffix: str) -> Path:
+    return MODEL_CACHE_PATH / f"{name}-{key}{suffix}"
+
+
+def _prune(name: str, suffix: str):
+    cached = sorted(
+        MODEL_CACHE_PATH.glob(f"{name}-*{suffix}"),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for path in cached[MAX_CACHED_PER_NAME:]:
+        path.unlink(missing_ok=True)
+
+
+def get_cached_arc(arc_name: str, key: str) -> Optional[Path]:
+    path = _cache_path(arc_name.removesuffix(".arc"), key, ".arc")
+    if path.is_file():
+        # keep recently used entries from being pruned
+        path.touch()
+        return path
+    return None
+
+
+def store_arc(arc_name: str, key: str, data: bytes) -> Path:
+    MODEL_CACHE_PATH.mkdir(parents=True, exist_ok=True)
+    name = arc_name.removesuffix(".arc")
+    path = _cache_path(name, key, ".arc")
+    path.write_bytes(data)
+    _prune(name, ".arc")
+    return path
+
+
+def get_cached_image(name: str, key: str) -> Optional[np.array]:
+    path = _cache_path(name, key, ".npy")
+    if path.is_file():
+        path.touch()
+        return np.load(path)
+    return None
+
+
+def store_image(name: str, key: str, image: np.array):
+    MODEL_CACHE_PATH.mkdir(parents=True, exist_ok=True)
+    np.save(_cache_path(name, key, ".npy"), image)
+    _prune(name, ".npy")
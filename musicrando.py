@@ -1,6 +1,5 @@
 import os
 import yaml
-import shutil
 import random
 from collections import defaultdict
 import struct
@@ -30,7 +29,9 @@ def get_derangement(length: int, rng: random.Random) -> List[int]:
     return lst
 
 
-def music_rando(placement_file, modified_extract_path, actual_extract_path):
+def music_rando(
+    placement_file, modified_extract_path, actual_extract_path, extract_writer
+):
     musiclist = yaml_load(RANDO_ROOT_PATH / "music.yaml")
 
     NON_SHUFFLED_TYPES = [10, 11]
@@ -72,14 +73,13 @@ def music_rando(placement_file, modified_extract_path, actual_extract_path):
         music[TADTONES_FILE_NAME] = TADTONES_FILE_NAME
 
     # Really force it.
-    shutil.copy(
-        actual_extract_path / "DATA" / "files" / "Sound" / "wzs" / TADTONES_FILE_NAME,
+    extract_writer.restore_vanilla(
         modified_extract_path / "DATA" / "files" / "Sound" / "wzs" / TADTONES_FILE_NAME,
     )
 
     # patch WZSound.brsar for filename and length requirements
-    with (modified_extract_path / "DATA" / "files" / "Sound" / "WZSound.brsar").open(
-        "r+b"
+    with extract_writer.open_for_update(
+        modified_extract_path / "DATA" / "files" / "Sound" / "WZSound.brsar"
     ) as brsar:
         for original_track, new_track in music.items():
             # patch filename
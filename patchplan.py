@@ -0,0 +1,107 @@
+from collections import defaultdict
+from copy import deepcopy
+from heapq import merge
+from typing import Dict, List, Tuple
+
+from logic.bool_expression import BoolExpression
+import yaml_files
+
+
+def load_patch_sources() -> Tuple[dict, dict]:
+    """
+    Returns the (patches, eventpatches) dictionaries from patches.yaml and eventpatches.yaml.
+    yaml_files already parsed them, every call returns new copies, so they can be modified freely
+    """
+    return deepcopy(yaml_files.patches), deepcopy(yaml_files.eventpatches)
+
+
+class PatchIndex:
+    """
+    Patches grouped by a key (for example (stage, room) or an event file name) and patch type,
+    with all "onlyif" conditions already evaluated for one set of options.
+    Patches of the same key keep their original order, also across types
+    """
+
+    def __init__(self):
+        self._entries: Dict[object, Dict[str, List[Tuple[int, dict]]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+        self._next_position = 0
+
+    def add(self, key, patch: dict):
+        self._entries[key][patch["type"]].append((self._next_position, patch))
+        self._next_position += 1
+
+    def keys(self):
+        return self._entries.keys()
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def get(self, key, *patch_types: str) -> List[dict]:
+        """
+        Returns all patches for this key with one of the given types, in their original order
+        """
+        by_type = self._entries.get(key)
+        if by_type is None:
+            return []
+        if len(patch_types) == 1:
+            return [patch for _, patch in by_type.get(patch_types[0], ())]
+        return [patch for _, patch in merge(*(by_type.get(t, ()) for t in patch_types))]
+
+
+class OptionRequirementFilter:
+    """
+    Evaluates "onlyif" conditions of patches for one set of options,
+    every distinct condition only gets parsed and evaluated once
+    """
+
+    def __init__(self, options, required_dungeons):
+        self.options = options
+        self.required_dungeons = required_dungeons
+        self._results: Dict[str, bool] = {}
+
+    def __call__(self, entry) -> bool:
+        if not isinstance(entry, dict) or "onlyif" not in entry:
+            return True
+        requirement = entry["onlyif"]
+        result = self._results.get(requirement)
+        if result is None:
+            result = BoolExpression.parse(requirement).eval(
+                self.options, self.required_dungeons
+            )
+            self._results[requirement] = result
+        return result
+
+
+def index_stage_patches(
+    patches: dict, requirement_filter: OptionRequirementFilter
+) -> PatchIndex:
+    """
+    Indexes the stage patches by (stage, room), room is None for patches to the stage itself.
+    layeroverride patches only apply to the stage, so they are always indexed with room None
+    """
+    index = PatchIndex()
+    for stage, stagepatches in patches.items():
+        if stage == "global":
+            continue
+        for patch in filter(requirement_filter, stagepatches):
+            if patch["type"] == "layeroverride":
+                room = None
+            else:
+                room = patch.get("room", None)
+            index.add((stage, room), patch)
+    return index
+
+
+def index_event_patches(
+    eventpatches: dict, requirement_filter: OptionRequirementFilter
+) -> PatchIndex:
+    """
+    Indexes the event and text patches by event file name, for example `110-DivingGame`
+    """
+    index = PatchIndex()
+    for filename, filepatches in eventpatches.items():
+        for patch in filter(requirement_filter, filepatches):
+            index.add(filename, patch)
+    return index
@@ -0,0 +1,188 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import List
+import csv
+
+import numpy as np
+
+from logic.constants import *
+from logic.logic_input import Areas
+
+# playthrough spheres past this are counted in the last bin
+MAX_SPHERE_DEPTH = 64
+
+GOALS = [DEMISE] + [DUNGEON_GOALS[dungeon] for dungeon in REGULAR_DUNGEONS]
+
+
+def indices(values) -> np.ndarray:
+    return np.fromiter(values, dtype=np.intp)
+
+
+class PlacementStats:
+    """
+    Counts over many seeds, with a fixed size no matter how many seeds are added.
+    Items are counted by their name without copy number, so all Progressive Swords
+    count towards the same row
+    """
+
+    def __init__(self, locations: List[EIN], items: List[str] | None = None):
+        self.items = list(RAW_ITEM_NAMES) if items is None else items
+        self.locations = locations
+        self.regions = list(ALL_HINT_REGIONS)
+        self.goals = GOALS
+        self.item_index = {item: i for i, item in enumerate(self.items)}
+        self.location_index = {loc: i for i, loc in enumerate(self.locations)}
+        self.region_index = {region: i for i, region in enumerate(self.regions)}
+        self.goal_index = {goal: i for i, goal in enumerate(self.goals)}
+
+        self.seeds = 0
+        self.item_locations = np.zeros(
+            (len(self.items), len(self.locations)), dtype=np.int64
+        )
+        self.sphere_depths = np.zeros(
+            (len(self.items), MAX_SPHERE_DEPTH), dtype=np.int64
+        )
+        self.sots_items = np.zeros((len(self.items), len(self.goals)), dtype=np.int64)
+        self.barren_regions = np.zeros(len(self.regions), dtype=np.int64)
+        self.nonprogress_regions = np.zeros(len(self.regions), dtype=np.int64)
+
+    @classmethod
+    def for_areas(cls, areas: Areas) -> PlacementStats:
+        return cls(list(areas.checks))
+
+    def add_seed(self, rando):
+        """adds a finished Randomizer, the spoiler log data has to be computed"""
+        placement = rando.logic.placement
+        spoiler = rando.spoiler
+        self.seeds += 1
+
+        item_indices = indices(
+            self.item_index[strip_item_number(item)]
+            for item in placement.locations.values()
+        )
+        location_indices = indices(
+            self.location_index[loc] for loc in placement.locations
+        )
+        np.add.at(self.item_locations, (item_indices, location_indices), 1)
+
+        sphere_items = []
+        sphere_depths = []
+        for depth, sphere in enumerate(spoiler.progression_spheres):
+            for loc in sphere:
+                if loc in placement.locations:
+                    item = strip_item_number(placement.locations[loc])
+                    sphere_items.append(self.item_index[item])
+                    sphere_depths.append(min(depth, MAX_SPHERE_DEPTH - 1))
+        np.add.at(
+            self.sphere_depths, (indices(sphere_items), indices(sphere_depths)), 1
+        )
+
+        sots_items = []
+        sots_goals = []
+        for goal, items in spoiler.sots_items.items():
+            for item in items:
+                sots_items.append(self.item_index[strip_item_number(item)])
+                sots_goals.append(self.goal_index[goal])
+        np.add.at(self.sots_items, (indices(sots_items), indices(sots_goals)), 1)
+
+        barren, nonprogress = spoiler.barren_nonprogress
+        self.barren_regions[indices(self.region_index[r] for r in barren)] += 1
+        self.nonprogress_regions[
+            indices(self.region_index[r] for r in nonprogress)
+        ] += 1
+
+    def merge(self, other: PlacementStats):
+        if (
+            self.items != other.items
+            or self.locations != other.locations
+            or self.regions != other.regions
+            or self.goals != other.goals
+        ):
+            raise ValueError(
+                "Can only merge statistics over the same checks and items."
+            )
+        self.seeds += other.seeds
+        self.item_locations += other.item_locations
+        self.sphere_depths += other.sphere_depths
+        self.sots_items += other.sots_items
+        self.barren_regions += other.barren_regions
+        self.nonprogress_regions += other.nonprogress_regions
+
+    def save_npz(self, path: Path):
+        np.savez_compressed(
+            path,
+            seeds=np.array(self.seeds),
+            items=np.array(self.items),
+            locations=np.array(self.locations),
+            regions=np.array(self.regions),
+            goals=np.array(self.goals),
+            item_locations=self.item_locations,
+            sphere_depths=self.sphere_depths,
+            sots_items=self.sots_items,
+            barren_regions=self.barren_regions,
+            nonprogress_regions=self.nonprogress_regions,
+        )
+
+    @classmethod
+    def load_npz(cls, path: Path) -> PlacementStats:
+        with np.load(path) as data:
+            stats = cls(data["locations"].tolist(), data["items"].tolist())
+            if (
+                data["regions"].tolist() != stats.regions
+                or data["goals"].tolist() != stats.goals
+            ):
+                raise ValueError(
+                    f"{path} was written by a different randomizer version."
+                )
+            stats.seeds = int(data["seeds"])
+            stats.item_locations = data["item_locations"]
+            stats.sphere_depths = data["sphere_depths"]
+            stats.sots_items = data["sots_items"]
+            stats.barren_regions = data["barren_regions"]
+            stats.nonprogress_regions = data["nonprogress_regions"]
+        return stats
+
+    def save_csv(self, directory: Path):
+        """one file per statistic, only rows that were counted at least once"""
+        directory.mkdir(parents=True, exist_ok=True)
+
+        def write(name, header, rows):
+            with (directory / name).open("w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(rows)
+
+        write(
+            "item_locations.csv",
+            ["item", "location", "count"],
+            (
+                (self.items[item], self.locations[loc], self.item_locations[item, loc])
+                for item, loc in zip(*np.nonzero(self.item_locations))
+            ),
+        )
+        write(
+            "sphere_depths.csv",
+            ["item", "sphere", "count"],
+            (
+                (self.items[item], depth + 1, self.sphere_depths[item, depth])
+                for item, depth in zip(*np.nonzero(self.sphere_depths))
+            ),
+        )
+        write(
+            "sots_items.csv",
+            ["item", "goal", "count"],
+            (
+                (self.items[item], self.goals[goal], self.sots_items[item, goal])
+                for item, goal in zip(*np.nonzero(self.sots_items))
+            ),
+        )
+        write(
+            "barren_regions.csv",
+            ["region", "barren", "nonprogress", "seeds"],
+            (
+                (region, barren, nonprogress, self.seeds)
+                for region, barren, nonprogress in zip(
+                    self.regions, self.barren_regions, self.nonprogress_regions
+                )
+            ),
+        )
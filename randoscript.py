@@ -1,6 +1,7 @@
 from collections import OrderedDict
 import sys
 import argparse
+import multiprocessing
 import yaml
 import json
 from logic.dump import dump_constants
@@ -8,7 +9,7 @@ from logic.logic_input import Areas
 from yaml_files import requirements, checks, hints, map_exits
 
 from ssrando import Randomizer, PlandoRandomizer, VERSION
-from logic.placement_file import PlacementFile
+from logic.placement_file import PlacementArchive, PlacementFile
 from options import OPTIONS, Options
 
 
@@ -36,12 +37,27 @@ def main():
         "--placement-file",
         help="Specify the location of a placement file json that is used directly as a plandomizer, overrides all other options",
     )
+    parser.add_argument(
+        "--verify-placement",
+        help="Checks that the placement files (json, or .sspa archives) are beatable and exits",
+        nargs="+",
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--print-spheres",
+        help="With --verify-placement, also prints the playthrough spheres of each placement",
+        action="store_true",
+    )
     parser.add_argument(
         "--dump-graph",
         help="Dumps the graph used for logic and exits",
         const=True,
         nargs="?",
     )
+    parser.add_argument(
+        "--apply-delta",
+        help="Rebuilds modified-extract from actual-extract and the specified delta package and exits",
+    )
     parser.add_argument(
         "--version",
         help="Prints the version and exits",
@@ -96,11 +112,32 @@ def main():
         type=int,
         dest="bulk_threads",
     )
+    bulk_opts.add_argument(
+        "--db",
+        help="specify a sqlite database the outcome, placement and hints of every seed are recorded in",
+        dest="bulk_db",
+    )
+    bulk_opts.add_argument(
+        "--stats",
+        help="specify a directory, placement statistics over all seeds are written there as npz and csv files",
+        dest="bulk_stats",
+    )
 
     parsed_args = parser.parse_args()
     if parsed_args.version:
         print(VERSION)
         exit(0)
+    if delta_path := parsed_args.apply_delta:
+        from pathlib import Path
+        from deltapackage import apply_delta_package
+
+        apply_delta_package(
+            Path(delta_path),
+            Path("actual-extract"),
+            Path("modified-extract"),
+            progress_cb=lambda action, percent: print(f"{action} {percent:.0f}%"),
+        )
+        exit(0)
     options = Options()
     if parsed_args.permalink is not None:
         options.update_from_permalink(parsed_args.permalink)
@@ -140,6 +177,54 @@ def main():
 
     areas = Areas(requirements, checks, hints, map_exits)
 
+    if parsed_args.verify_placement is not None:
+        from logic.constants import DEMISE
+        from logic.placement_file import InvalidPlacementFile
+        from logic.verification import verify_placement
+
+        def placement_files(path):
+            if path.endswith(".sspa"):
+                for i, placement_file in enumerate(PlacementArchive(path, areas)):
+                    yield f"{path}[{i}]", placement_file
+            else:
+                placement_file = PlacementFile()
+                with open(path) as f:
+                    placement_file.read_from_file(f)
+                yield path, placement_file
+
+        failed = 0
+        for path in parsed_args.verify_placement:
+            for name, placement_file in placement_files(path):
+                try:
+                    placement_file.check_valid(areas)
+                    verification = verify_placement(
+                        areas, placement_file, spheres=parsed_args.print_spheres
+                    )
+                except InvalidPlacementFile as e:
+                    failed += 1
+                    print(f"{name}: invalid placement file: {e}")
+                    continue
+                if verification.beatable:
+                    print(f"{name}: beatable")
+                else:
+                    failed += 1
+                    print(
+                        f"{name}: cannot reach {verification.unreachable_goal} "
+                        f"({len(verification.unreachable_locations)} unreachable locations)"
+                    )
+                if verification.spheres is not None:
+                    for i, sphere in enumerate(verification.spheres, start=1):
+                        print(f"  Sphere {i}:")
+                        for loc in sphere:
+                            if loc == DEMISE:
+                                print(f"    {DEMISE}")
+                            else:
+                                item = placement_file.item_locations[loc]
+                                print(f"    {areas.prettify(loc)}: {item}")
+        if failed:
+            print(f"{failed} placements failed verification")
+        exit(1 if failed else 0)
+
     plcmt_file_name = parsed_args.placement_file
     if plcmt_file_name is not None:
         plcmt_file = PlacementFile()
@@ -171,36 +256,112 @@ def main():
         bulk_threads = parsed_args.bulk_threads
 
         options.set_option("dry-run", True)
+        # the seeds themselves already run in parallel
+        options.set_option("fill-attempts", 1)
+
+        if parsed_args.bulk_stats is not None:
+            if options["no-spoiler-log"]:
+                print("--stats needs the spoiler log, disable no-spoiler-log")
+                exit(1)
+            from multiprocessing import Queue
+            from pathlib import Path
+            from queue import Empty
+            from placementstats import PlacementStats
+
+            stats_queue = Queue()
+
+        result_writer = None
+        if parsed_args.bulk_db is not None:
+            from bulkresults import ResultWriter, SeedResult
+
+            result_writer = ResultWriter(parsed_args.bulk_db)
 
         def randothread(start, end, local_opts):
-            for i in range(start, end):
-                try:
-                    local_opts.set_option("seed", i)
-                    rando = Randomizer(areas, local_opts)
-                    rando.randomize()
-                except KeyboardInterrupt:
-                    raise
-                except Exception as e:
-                    import traceback
-
-                    stack_trace = traceback.format_exc()
-                    error_message = (
-                        f"error seed {i}:\n\n" + str(e) + "\n\n" + stack_trace
-                    )
-                    print(error_message, file=sys.stderr)
+            # one archive per process, so appends never interleave
+            placement_archive = None
+            stats = None
+            if parsed_args.bulk_stats is not None:
+                stats = PlacementStats.for_areas(areas)
+            try:
+                for i in range(start, end):
+                    rando = None
+                    try:
+                        local_opts.set_option("seed", i)
+                        rando = Randomizer(areas, local_opts)
+                        if local_opts["out-placement-file"]:
+                            if placement_archive is None:
+                                placement_archive = PlacementArchive(
+                                    rando.log_file_path
+                                    / f"placement_files_{start}-{end - 1}.sspa",
+                                    areas,
+                                )
+                                # running the same range again replaces its records
+                                placement_archive.clear()
+                            rando.placement_archive = placement_archive
+                        rando.randomize()
+                        if result_writer is not None:
+                            result_writer.queue.put(SeedResult.from_randomizer(rando))
+                        if stats is not None:
+                            stats.add_seed(rando)
+                    except KeyboardInterrupt:
+                        raise
+                    except Exception as e:
+                        if result_writer is not None:
+                            result_writer.queue.put(
+                                SeedResult.from_error(i, local_opts, e, rando)
+                            )
+                        import traceback
+
+                        stack_trace = traceback.format_exc()
+                        error_message = (
+                            f"error seed {i}:\n\n" + str(e) + "\n\n" + stack_trace
+                        )
+                        print(error_message, file=sys.stderr)
+            finally:
+                # the main process waits for the statistics of every process
+                if stats is not None:
+                    stats_queue.put(stats)
 
+        threads = []
         if bulk_threads == 1:
             randothread(bulk_low, bulk_high, options)
+            thread_count = 1
         else:
             from multiprocessing import Process
 
-            threads = []
             for start, end in get_ranges(bulk_low, bulk_high, bulk_threads):
                 thread = Process(target=randothread, args=(start, end, options.copy()))
                 thread.start()
                 threads.append(thread)
+            thread_count = len(threads)
+        if parsed_args.bulk_stats is not None:
+            # the partial statistics have to be taken out of the queue before joining
+            stats = PlacementStats.for_areas(areas)
+            received = 0
+            while received < thread_count:
+                try:
+                    stats.merge(stats_queue.get(timeout=5))
+                    received += 1
+                except Empty:
+                    # a killed process never sends its statistics
+                    if not any(thread.is_alive() for thread in threads):
+                        break
+            if received < thread_count:
+                print(
+                    f"{thread_count - received} bulk processes died, their seeds are missing from the statistics",
+                    file=sys.stderr,
+                )
+            stats_path = Path(parsed_args.bulk_stats)
+            stats.save_csv(stats_path)
+            stats.save_npz(stats_path / "placement_stats.npz")
+            print(
+                f"placement statistics over {stats.seeds} seeds written to {stats_path}"
+            )
+        if bulk_threads != 1:
             for thread in threads:
                 thread.join()
+        if result_writer is not None:
+            result_writer.close()
     elif options["noui"]:
         rando = Randomizer(areas, options)
         if not options["dry-run"]:
@@ -223,4 +384,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # fill attempts run in worker processes, which re-import this module on windows
+    multiprocessing.freeze_support()
     main()
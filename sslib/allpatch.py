@@ -1,21 +1,20 @@
 from pathlib import Path
-from typing import Callable, Iterable, Dict, Optional, List
+from typing import Callable, Iterable, Dict, Optional, List, Tuple
 import re
 from io import BytesIO
 from collections import defaultdict
-import shutil
 
 import colorReplace as cr
+from modelcache import get_cached_arc, recolour_key, store_arc
 from paths import RANDO_ROOT_PATH
 import os
 import json
-import tempfile
 
 import nlzss11
 from .bzs import ParsedBzs, parseBzs, buildBzs
 from .msb import ParsedMsb, parseMSB, buildMSB
 from .u8file import U8File
-from .utils import write_bytes_create_dirs
+from .overlay import ExtractOverlay, ExtractWriter
 
 from brresTools.brres import BRRES
 from brresTools.TEX0 import TEX0
@@ -38,6 +37,56 @@ OARC_PATH = Path("oarc")
 MASK_REGEX = re.compile(r"(.+(/|\\))*(?P<texName>.+)__(?P<colorGroupName>.+).png")
 
 
+def create_oarc_cache(actual_extract_path: Path, oarc_cache_path: Path, extracts):
+    """extracts all oarcs needed for patching from the vanilla stages and the object pack"""
+    oarc_cache_path.mkdir(parents=True, exist_ok=True)
+    for extract in extracts:
+        if "objectpack" in extract:
+            # special case: object pack
+            arcs = extract["objectpack"]
+            all_not_existing = [
+                objname
+                for objname in arcs
+                if not (oarc_cache_path / f"{objname}.arc").exists()
+            ]
+            if len(all_not_existing) == 0:
+                continue
+            data = (
+                actual_extract_path / "DATA" / "files" / "Object" / "ObjectPack.arc.LZ"
+            ).read_bytes()
+            data = nlzss11.decompress(data)
+            data = U8File.parse_u8(BytesIO(data))
+            for arcname in all_not_existing:
+                arcdata = data.get_file_data(f"oarc/{arcname}.arc")
+                (oarc_cache_path / f"{arcname}.arc").write_bytes(arcdata)
+        else:
+            # check if it already exists first
+            objs = extract["oarcs"]
+            stage = extract["stage"]
+            layer = extract["layer"]
+            all_exits = all(
+                ((oarc_cache_path / f"{objname}.arc").exists() for objname in objs)
+            )
+            if all_exits:
+                # print(f'already in cache for {stage}, l{layer}')
+                continue
+            data = (
+                actual_extract_path
+                / "DATA"
+                / "files"
+                / "Stage"
+                / f"{stage}"
+                / f"{stage}_stg_l{layer}.arc.LZ"
+            ).read_bytes()
+            data = nlzss11.decompress(data)
+            data = U8File.parse_u8(BytesIO(data))
+
+            for objname in objs:
+                # print(f'loading {objname} from {stage}, l{layer}')
+                outdata = data.get_file_data(f"oarc/{objname}.arc")
+                (oarc_cache_path / f"{objname}.arc").write_bytes(outdata)
+
+
 class AllPatcher:
     def __init__(
         self,
@@ -49,12 +98,14 @@ class AllPatcher:
         current_player_model_pack_name: str,
         current_loftwing_model_pack_name: str,
         copy_unmodified: bool = True,
+        overlay: bool = False,
     ):
         """
         Creates a new instance of the AllPatcher, which patches the game files but with a single callback for each resource type
         actual_extract_path: a path pointing to the root directory of the extracted game, so that it has the subdirectories DATA and UPDATE
         modified_extract_path: a path where to write the patched files to, should be a copy of the actual extract if intended to be repacked into an iso
         copy_unmodified: If unmodified Stage and Event files should be copied, other files are never copied
+        overlay: If modified_extract_path should only store the patched files, with links to the actual extract for all others
         """
         self.actual_extract_path = actual_extract_path
         self.modified_extract_path = modified_extract_path
@@ -63,6 +114,14 @@ class AllPatcher:
         self.current_player_model_pack_name = current_player_model_pack_name
         self.current_loftwing_model_pack_name = current_loftwing_model_pack_name
         self.copy_unmodified = copy_unmodified
+        if overlay:
+            self.extract_writer = ExtractOverlay(
+                actual_extract_path, modified_extract_path
+            )
+        else:
+            self.extract_writer = ExtractWriter(
+                actual_extract_path, modified_extract_path
+            )
         self.arc_replacements = {}
         if arc_replacement_path.is_dir():
             for replace_path in arc_replacement_path.rglob("*.arc"):
@@ -78,7 +137,10 @@ class AllPatcher:
         self.event_patch = None
         self.event_text_patch = None
         self.room_brres_patch = None
-        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.bzs_patch_interest = None
+        self.room_brres_patch_interest = None
+        self.event_patch_interest = None
+        self.event_text_patch_interest = None
 
         def dummy_progress_callback(action):
             pass
@@ -119,13 +181,58 @@ class AllPatcher:
         self, patchfunc: Callable[[BRRES, str, int], Optional[BRRES]]
     ):
         """
-        The function gets called for every room brres file (in layer 0 stages), it passes the parsed bzs,
+        The function gets called for every room brres file (in layer 0 stages), it passes the parsed brres,
         the stage name and the room id.
-        if the return value of the function is not None, it will override the game files,
-        otherwise nothing will change
+        if the return value of the function is not None and any of its subfiles were set, it will override
+        the game files, otherwise nothing will change
         """
         self.room_brres_patch = patchfunc
 
+    def set_bzs_patch_interest(self, interest: Iterable[Tuple[str, Optional[int]]]):
+        """
+        Restricts the bzs patch function to the given (stage, room id) pairs, room id is None for the stage bzs.
+        bzs files of other stages and rooms are not decompressed or parsed at all, so the patch function
+        has to return None for them anyways.
+        If this is never called, the patch function gets called for every bzs
+        """
+        self.bzs_patch_interest = set(interest)
+
+    def set_room_brres_patch_interest(self, interest: Iterable[Tuple[str, int]]):
+        """
+        Restricts the room brres patch function to the given (stage, room id) pairs, other room brres files
+        are not parsed at all.
+        If this is never called, the patch function gets called for every room brres
+        """
+        self.room_brres_patch_interest = set(interest)
+
+    def wants_bzs_patch(self, stage: str, room: Optional[int]) -> bool:
+        if not self.bzs_patch:
+            return False
+        return (
+            self.bzs_patch_interest is None or (stage, room) in self.bzs_patch_interest
+        )
+
+    def wants_room_brres_patch(self, stage: str, room: int) -> bool:
+        if not self.room_brres_patch:
+            return False
+        return (
+            self.room_brres_patch_interest is None
+            or (stage, room) in self.room_brres_patch_interest
+        )
+
+    def wants_stage_patch(self, stage: str) -> bool:
+        # if any bzs or room brres of this stage could be patched
+        if self.bzs_patch and self.bzs_patch_interest is None:
+            return True
+        if self.room_brres_patch and self.room_brres_patch_interest is None:
+            return True
+        return any(
+            interest_stage == stage
+            for interest in (self.bzs_patch_interest, self.room_brres_patch_interest)
+            if interest
+            for interest_stage, _ in interest
+        )
+
     def set_event_patch(self, patchfunc: Callable[[ParsedMsb, str], ParsedMsb]):
         """
         The function gets called for every event file, which stores the logic of events (msbf)
@@ -144,74 +251,51 @@ class AllPatcher:
         """
         self.event_text_patch = patchfunc
 
+    def set_event_patch_interest(self, filenames: Iterable[str]):
+        """
+        Restricts the event patch function to the given event files (for example `110-DivingGame`),
+        other msbf files are not parsed at all.
+        If this is never called, the patch function gets called for every event file
+        """
+        self.event_patch_interest = set(filenames)
+
+    def set_event_text_patch_interest(self, filenames: Iterable[str]):
+        """
+        Restricts the event text patch function to the given event files (for example `110-DivingGame`),
+        other msbt files are not parsed at all.
+        If this is never called, the patch function gets called for every event file
+        """
+        self.event_text_patch_interest = set(filenames)
+
+    def wants_event_patch(self, filename: str) -> bool:
+        if not self.event_patch:
+            return False
+        return (
+            self.event_patch_interest is None or filename in self.event_patch_interest
+        )
+
+    def wants_event_text_patch(self, filename: str) -> bool:
+        if not self.event_text_patch:
+            return False
+        return (
+            self.event_text_patch_interest is None
+            or filename in self.event_text_patch_interest
+        )
+
     def create_oarc_cache(self, extracts):
-        self.oarc_cache_path.mkdir(parents=True, exist_ok=True)
-        for extract in extracts:
-            if "objectpack" in extract:
-                # special case: object pack
-                arcs = extract["objectpack"]
-                all_not_existing = [
-                    objname
-                    for objname in arcs
-                    if not (self.oarc_cache_path / f"{objname}.arc").exists()
-                ]
-                if len(all_not_existing) == 0:
-                    continue
-                data = (
-                    self.actual_extract_path
-                    / "DATA"
-                    / "files"
-                    / "Object"
-                    / "ObjectPack.arc.LZ"
-                ).read_bytes()
-                data = nlzss11.decompress(data)
-                data = U8File.parse_u8(BytesIO(data))
-                for arcname in all_not_existing:
-                    arcdata = data.get_file_data(f"oarc/{arcname}.arc")
-                    (self.oarc_cache_path / f"{arcname}.arc").write_bytes(arcdata)
-            else:
-                # check if it already exists first
-                objs = extract["oarcs"]
-                stage = extract["stage"]
-                layer = extract["layer"]
-                all_exits = all(
-                    (
-                        (self.oarc_cache_path / f"{objname}.arc").exists()
-                        for objname in objs
-                    )
-                )
-                if all_exits:
-                    # print(f'already in cache for {stage}, l{layer}')
-                    continue
-                data = (
-                    self.actual_extract_path
-                    / "DATA"
-                    / "files"
-                    / "Stage"
-                    / f"{stage}"
-                    / f"{stage}_stg_l{layer}.arc.LZ"
-                ).read_bytes()
-                data = nlzss11.decompress(data)
-                data = U8File.parse_u8(BytesIO(data))
-
-                for objname in objs:
-                    # print(f'loading {objname} from {stage}, l{layer}')
-                    outdata = data.get_file_data(f"oarc/{objname}.arc")
-                    (self.oarc_cache_path / f"{objname}.arc").write_bytes(outdata)
+        create_oarc_cache(self.actual_extract_path, self.oarc_cache_path, extracts)
 
     def patch_arc_replacements(self):
         # handles arc replacement for all other arcs
         for path in self.actual_extract_path.glob("**/*.arc"):
             modified = False
-            modified_path = str(path).replace(
-                str(self.actual_extract_path), str(self.modified_extract_path)
+            modified_path = Path(
+                str(path).replace(
+                    str(self.actual_extract_path), str(self.modified_extract_path)
+                )
             )
             replacement = Path()
 
-            # replaces arc with actual arc if deleted
-            if not Path(modified_path).exists():
-                shutil.copy(path, modified_path)
-
             # handles stage text arcs as they have duplicate names for each language
             if match := TEXT_ARC_REGEX.match(str(path)):
                 if match.group("lang") == "en":
@@ -242,10 +326,10 @@ class AllPatcher:
                 modified = True
 
             if modified:
-                shutil.copy(replacement, modified_path)
+                self.extract_writer.copy(replacement, modified_path)
             else:
-                # replaces arc with actual arc if unchanged
-                shutil.copy(path, modified_path)
+                # replaces arc with actual arc if unchanged, arcs patched later on are left alone
+                self.extract_writer.restore_vanilla_at_finish(modified_path)
 
     def patch_custom_models(self):
         meta_data = {}
@@ -274,18 +358,25 @@ class AllPatcher:
                     meta_data = json.load(f)
             else:
                 meta_data = None
-            arc_bytes = arc_path.read_bytes()
-            parsed_arc = U8File.parse_u8(BytesIO(arc_bytes))
-
             masks_path = data_path / "Masks"
-            if masks_path.is_dir() and meta_data.get("Colors"):
-                parsed_arc = self.do_texture_recolour(
-                    parsed_arc, masks_path, color_data=meta_data["Colors"]
+            if masks_path.is_dir() and meta_data and meta_data.get("Colors"):
+                # recolouring only depends on the arc, the masks and the colors,
+                # so reuse the result of an earlier run if none of them changed
+                cache_key = recolour_key(
+                    [arc_path, *masks_path.glob("*.png")], meta_data["Colors"]
                 )
-
-            arc_tmp = self.tmp_dir / arc_name
-            arc_tmp.write_bytes(parsed_arc.to_buffer())
-            self.arc_replacements[arc_name] = arc_tmp
+                recoloured_path = get_cached_arc(arc_name, cache_key)
+                if recoloured_path is None:
+                    parsed_arc = U8File.parse_u8(BytesIO(arc_path.read_bytes()))
+                    parsed_arc = self.do_texture_recolour(
+                        parsed_arc, masks_path, color_data=meta_data["Colors"]
+                    )
+                    recoloured_path = store_arc(
+                        arc_name, cache_key, parsed_arc.to_buffer()
+                    )
+                self.arc_replacements[arc_name] = recoloured_path
+            else:
+                self.arc_replacements[arc_name] = arc_path
 
             if model == "Player" and (data_path / "AdditionalArcs").is_dir():
                 for arc_path in (data_path / "AdditionalArcs").glob("*.arc"):
@@ -311,7 +402,6 @@ class AllPatcher:
 
         for tex_name in mask_lookup:
             tex_path = f"Textures(NW4R)/{tex_name}"
-            image_data: np.array = parsed_BRRES.get_file_data(path=tex_path)
             mask_paths = []
             colors = []
             process = False
@@ -327,12 +417,14 @@ class AllPatcher:
                 process = True
 
             if process:
+                image_data: np.array = parsed_BRRES.get_file_data(path=tex_path)
                 modified_texture: np.array = cr.process_texture(
                     texture=image_data, maskPaths=mask_paths, colors=colors
                 )
                 parsed_BRRES.set_file_data(path=tex_path, data=modified_texture)
 
-        arc_data.set_file_data("g3d/model.brres", parsed_BRRES.to_buffer().read())
+        if parsed_BRRES.modified:
+            arc_data.set_file_data("g3d/model.brres", parsed_BRRES.to_buffer().read())
         return arc_data
 
     def do_patch(self):
@@ -365,11 +457,15 @@ class AllPatcher:
             remove_arcs = set(self.stage_oarc_delete.get((stage, layer), []))
             # add additional arcs if needed
             additional_arcs = set(self.stage_oarc_add.get((stage, layer), []))
+            zev_path = self.assets_path / f"{stage}zev.dat"
+            patch_stage = layer == 0 and (
+                self.wants_stage_patch(stage) or zev_path.is_file()
+            )
             if (
                 patch_arcs
                 or remove_arcs
                 or additional_arcs
-                or layer == 0
+                or patch_stage
                 or self.arc_replacements
             ):
                 # only decompress and extract files, if needed
@@ -428,60 +524,54 @@ class AllPatcher:
                                 stageu8.set_file_data(path, replacement.read_bytes())
                                 patched_arcs.add(arc)
                                 modified = True
-                if layer == 0:
-                    stagebzs = parseBzs(stageu8.get_file_data("dat/stage.bzs"))
+                if patch_stage:
                     # patch stage
-                    if self.bzs_patch or self.room_brres_patch:
-                        if self.bzs_patch:
-                            newstagebzs = self.bzs_patch(stagebzs, stage, None)
-                            if newstagebzs is not None:
-                                stageu8.set_file_data(
-                                    "dat/stage.bzs", buildBzs(newstagebzs)
-                                )
-                                modified = True
+                    if self.wants_bzs_patch(stage, None):
+                        stagebzs = parseBzs(stageu8.get_file_data("dat/stage.bzs"))
+                        newstagebzs = self.bzs_patch(stagebzs, stage, None)
+                        if newstagebzs is not None:
+                            stageu8.set_file_data(
+                                "dat/stage.bzs", buildBzs(newstagebzs)
+                            )
+                            modified = True
 
-                        # patch rooms
-                        room_path_matches = (
-                            ROOM_REGEX.match(x) for x in stageu8.get_all_paths()
-                        )
-                        room_path_matches = (
-                            x for x in room_path_matches if not x is None
-                        )
-                        for room_path_match in room_path_matches:
-                            roomid = int(room_path_match.group("roomid"))
-                            roomdata = stageu8.get_file_data(room_path_match.group(0))
-                            roomarc = U8File.parse_u8(BytesIO(roomdata))
-
-                            if self.bzs_patch:
-                                roombzs = parseBzs(
-                                    roomarc.get_file_data("dat/room.bzs")
-                                )
-                                roombzs = self.bzs_patch(roombzs, stage, roomid)
-                                if roombzs is not None:
-                                    roomarc.set_file_data(
-                                        "dat/room.bzs", buildBzs(roombzs)
-                                    )
-                                    stageu8.set_file_data(
-                                        room_path_match.group(0), roomarc.to_buffer()
-                                    )
-                                    modified = True
-                            if self.room_brres_patch:
-                                roombrres = BRRES.parse_brres(
-                                    BytesIO(roomarc.get_file_data("g3d/room.brres"))
-                                )
-                                roombrres = self.room_brres_patch(
-                                    roombrres, stage, roomid
+                    # patch rooms, only the ones that can actually be patched get parsed
+                    room_path_matches = (
+                        ROOM_REGEX.match(x) for x in stageu8.get_all_paths()
+                    )
+                    room_path_matches = (x for x in room_path_matches if not x is None)
+                    for room_path_match in room_path_matches:
+                        roomid = int(room_path_match.group("roomid"))
+                        patch_room_bzs = self.wants_bzs_patch(stage, roomid)
+                        patch_room_brres = self.wants_room_brres_patch(stage, roomid)
+                        if not (patch_room_bzs or patch_room_brres):
+                            continue
+                        roomdata = stageu8.get_file_data(room_path_match.group(0))
+                        roomarc = U8File.parse_u8(BytesIO(roomdata))
+                        room_modified = False
+
+                        if patch_room_bzs:
+                            roombzs = parseBzs(roomarc.get_file_data("dat/room.bzs"))
+                            roombzs = self.bzs_patch(roombzs, stage, roomid)
+                            if roombzs is not None:
+                                roomarc.set_file_data("dat/room.bzs", buildBzs(roombzs))
+                                room_modified = True
+                        if patch_room_brres:
+                            roombrres = BRRES.parse_brres(
+                                BytesIO(roomarc.get_file_data("g3d/room.brres"))
+                            )
+                            roombrres = self.room_brres_patch(roombrres, stage, roomid)
+                            if roombrres is not None and roombrres.modified:
+                                roomarc.set_file_data(
+                                    "g3d/room.brres", roombrres.to_buffer().read()
                                 )
-                                if roombrres is not None:
-                                    roomarc.set_file_data(
-                                        "g3d/room.brres", roombrres.to_buffer().read()
-                                    )
-                                    stageu8.set_file_data(
-                                        room_path_match.group(0), roomarc.to_buffer()
-                                    )
-                                    modified = True
+                                room_modified = True
+                        if room_modified:
+                            stageu8.set_file_data(
+                                room_path_match.group(0), roomarc.to_buffer()
+                            )
+                            modified = True
                     # check if zev.dat can be patched
-                    zev_path = self.assets_path / f"{stage}zev.dat"
                     if zev_path.is_file():
                         zev_data = zev_path.read_bytes()
                         stageu8.set_file_data("dat/zev.dat", zev_data)
@@ -489,11 +579,13 @@ class AllPatcher:
             # repack u8 and compress it if modified
             if modified:
                 stagedata = stageu8.to_buffer()
-                write_bytes_create_dirs(modified_stagepath, nlzss11.compress(stagedata))
+                self.extract_writer.write_bytes(
+                    modified_stagepath, nlzss11.compress(stagedata)
+                )
                 # print(f'patched {stage} l{layer}')
             elif self.copy_unmodified or layer == 0 or should_be_copied:
                 # always copy layer 0 because it contains the stage definitions
-                shutil.copy(stagepath, modified_stagepath)
+                self.extract_writer.restore_vanilla(modified_stagepath)
                 # print(f"copied {stage} l{layer}")
 
         # events and text
@@ -518,30 +610,42 @@ class AllPatcher:
             filename = eventpath.parts[-1]
             self.progress_callback(f"patching {filename}")
             modified_eventpath = modified_eventrootpath / filename
-            eventarc = U8File.parse_u8(BytesIO(eventpath.read_bytes()))
+            eventdata = eventpath.read_bytes()
+            # only parse archives that contain a file that gets patched
+            if not any(
+                (name.endswith(".msbf") and self.wants_event_patch(name[:-5]))
+                or (name.endswith(".msbt") and self.wants_event_text_patch(name[:-5]))
+                for name in U8File.file_names(eventdata)
+            ):
+                continue
+            eventarc = U8File.parse_u8(BytesIO(eventdata))
             # make sure to handle text files first for labels
             for eventfilepath in sorted(
                 eventarc.get_all_paths(), key=lambda x: x[-1], reverse=True
             ):
                 eventfilename = eventfilepath.split("/")[-1]
                 if eventfilename.endswith(".msbf"):
-                    parsedMsb = parseMSB(eventarc.get_file_data(eventfilepath))
-                    if self.event_patch:
-                        patchedMsb = self.event_patch(parsedMsb, eventfilename[:-5])
-                        if patchedMsb:
-                            eventarc.set_file_data(eventfilepath, buildMSB(patchedMsb))
-                            modified = True
+                    if not self.wants_event_patch(eventfilename[:-5]):
+                        continue
+                    patchfunc = self.event_patch
                 elif eventfilename.endswith(".msbt"):
-                    parsedMsb = parseMSB(eventarc.get_file_data(eventfilepath))
-                    if self.event_text_patch:
-                        patchedMsb = self.event_text_patch(
-                            parsedMsb, eventfilename[:-5]
-                        )
-                        if patchedMsb:
-                            eventarc.set_file_data(eventfilepath, buildMSB(patchedMsb))
-                            modified = True
+                    if not self.wants_event_text_patch(eventfilename[:-5]):
+                        continue
+                    patchfunc = self.event_text_patch
+                else:
+                    continue
+                msbdata = eventarc.get_file_data(eventfilepath)
+                patchedMsb = patchfunc(parseMSB(msbdata), eventfilename[:-5])
+                if patchedMsb:
+                    patchedMsbData = buildMSB(patchedMsb)
+                    # patches can end up not changing anything
+                    if patchedMsbData != msbdata:
+                        eventarc.set_file_data(eventfilepath, patchedMsbData)
+                        modified = True
             if modified:
-                write_bytes_create_dirs(modified_eventpath, eventarc.to_buffer())
+                self.extract_writer.write_bytes(
+                    modified_eventpath, eventarc.to_buffer()
+                )
                 # print(f'patched {filename}')
 
         self.progress_callback("patching ObjectPack...")
@@ -580,7 +684,7 @@ class AllPatcher:
 
         if objpack_modified:
             objpack_data = object_arc.to_buffer()
-            write_bytes_create_dirs(
+            self.extract_writer.write_bytes(
                 self.modified_extract_path
                 / "DATA"
                 / "files"
@@ -588,5 +692,3 @@ class AllPatcher:
                 / "ObjectPack.arc.LZ",
                 nlzss11.compress(objpack_data),
             )
-
-        shutil.rmtree(self.tmp_dir)
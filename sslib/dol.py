@@ -85,6 +85,11 @@ class DOL:
 
         offset = self.convert_address_to_offset(address)
 
+        if offset is None:
+            raise Exception(
+                "Address %08X is not in the data for any of the DOL sections." % address
+            )
+
         self.data.seek(offset)
         self.data.write(data_bytes)
 
@@ -0,0 +1,242 @@
+from contextlib import contextmanager
+from hashlib import sha1
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Set
+import json
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:  # not available on windows
+    fcntl = None
+
+# linux ioctl to share the data of a file on copy on write filesystems (btrfs, xfs)
+FICLONE = 0x40049409
+OVERLAY_MANIFEST_NAME = "overlay-manifest.json"
+# manifest hash for files that were patched in place
+PATCHED_IN_PLACE = "patched-in-place"
+# manifest hash for files that were removed, they have no size and modification time
+REMOVED = "removed"
+
+
+def link_file(src: Path, dst: Path):
+    """
+    Makes dst have the same content as src, as cheaply as possible:
+    a reflink if the filesystem supports it, otherwise a hardlink, a symlink or a copy
+    """
+    if fcntl is not None:
+        try:
+            with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+                fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+            return
+        except OSError:
+            dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+    try:
+        os.symlink(src.resolve(), dst)
+        return
+    except OSError:
+        pass
+    shutil.copy(src, dst)
+
+
+def overlay_manifest_path(modified_extract_path: Path) -> Path:
+    # everything in modified-extract ends up in the iso, so the manifest is kept next to it
+    return modified_extract_path.with_name(
+        f"{modified_extract_path.name}.{OVERLAY_MANIFEST_NAME}"
+    )
+
+
+def unlink_existing(path: Path):
+    # files in modified-extract can be links to actual-extract, so they are always replaced
+    # instead of written to, otherwise the original file would be changed as well
+    if path.is_symlink() or path.exists():
+        path.unlink()
+
+
+class ExtractWriter:
+    """
+    Writes the patched files to modified-extract, which is a full copy of actual-extract
+    """
+
+    def __init__(self, actual_extract_path: Path, modified_extract_path: Path):
+        self.actual_extract_path = actual_extract_path
+        self.modified_extract_path = modified_extract_path
+        # files written with patched data and files removed by this writer,
+        # everything else in modified-extract is left as in actual-extract
+        self.patched_paths: Set[Path] = set()
+        self.removed_paths: Set[Path] = set()
+        # files to restore to vanilla in finish, unless they were patched by then
+        self.vanilla_at_finish: Set[Path] = set()
+
+    def vanilla_path(self, path: Path) -> Path:
+        return self.actual_extract_path / path.relative_to(self.modified_extract_path)
+
+    def mark_patched(self, path: Path):
+        self.patched_paths.add(path)
+        self.removed_paths.discard(path)
+
+    def mark_vanilla(self, path: Path):
+        self.patched_paths.discard(path)
+        self.removed_paths.discard(path)
+
+    def write_bytes(self, path: Path, data: bytes):
+        self.mark_patched(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        unlink_existing(path)
+        path.write_bytes(data)
+
+    def restore_vanilla(self, path: Path):
+        """makes the file the same as in actual-extract again"""
+        self.mark_vanilla(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        unlink_existing(path)
+        shutil.copy(self.vanilla_path(path), path)
+
+    def restore_vanilla_at_finish(self, path: Path):
+        """restores the file in finish, if nothing patched or removed it until then"""
+        self.vanilla_at_finish.add(path)
+
+    def remove(self, path: Path):
+        self.patched_paths.discard(path)
+        self.removed_paths.add(path)
+        unlink_existing(path)
+
+    def copy(self, src: Path, dst: Path):
+        if src == self.vanilla_path(dst):
+            self.restore_vanilla(dst)
+        else:
+            self.write_bytes(dst, src.read_bytes())
+
+    @contextmanager
+    def open_for_update(self, path: Path) -> Iterator[BinaryIO]:
+        """opens a file to patch it in place"""
+        self.mark_patched(path)
+        if path.is_symlink() or path.stat().st_nlink > 1:
+            # make sure the file has its own data first
+            self.write_bytes(path, path.read_bytes())
+        with path.open("r+b") as f:
+            yield f
+
+    def finish(self):
+        for path in self.vanilla_at_finish - self.patched_paths - self.removed_paths:
+            self.restore_vanilla(path)
+        self.vanilla_at_finish.clear()
+
+
+class ExtractOverlay(ExtractWriter):
+    """
+    Writes the patched files to modified-extract, but only stores files that differ from actual-extract,
+    all other files are links to actual-extract (or copies, if linking isn't possible).
+    A manifest keeps the size, modification time and hash of every file in there, so files that are
+    the same as in the last run are never written again.
+    """
+
+    def __init__(self, actual_extract_path: Path, modified_extract_path: Path):
+        super().__init__(actual_extract_path, modified_extract_path)
+        self.manifest_path = overlay_manifest_path(modified_extract_path)
+        # older versions kept the manifest inside modified-extract
+        old_manifest_path = modified_extract_path / OVERLAY_MANIFEST_NAME
+        if old_manifest_path.is_file():
+            if self.manifest_path.is_file():
+                old_manifest_path.unlink()
+            else:
+                old_manifest_path.replace(self.manifest_path)
+        # relative path -> (size, mtime, hash), the hash is None for unpatched files
+        self.manifest = {}
+        if self.manifest_path.is_file():
+            with self.manifest_path.open() as f:
+                self.manifest = {k: tuple(v) for k, v in json.load(f).items()}
+        # files that were written or restored since the last finish
+        self.touched = set()
+
+    def manifest_key(self, path: Path) -> str:
+        return path.relative_to(self.modified_extract_path).as_posix()
+
+    def is_unchanged(self, path: Path, digest: Optional[str]) -> bool:
+        entry = self.manifest.get(self.manifest_key(path))
+        if entry is None or entry[2] != digest:
+            return False
+        try:
+            stat = os.stat(path, follow_symlinks=False)
+        except FileNotFoundError:
+            return False
+        return entry[:2] == (stat.st_size, stat.st_mtime_ns)
+
+    def record(self, path: Path, digest: Optional[str]):
+        stat = os.stat(path, follow_symlinks=False)
+        self.manifest[self.manifest_key(path)] = (
+            stat.st_size,
+            stat.st_mtime_ns,
+            digest,
+        )
+
+    def setup(self, progress_cb=lambda action, percent: None):
+        """creates modified-extract with only links to actual-extract"""
+        vanilla_paths = [p for p in self.actual_extract_path.rglob("*") if p.is_file()]
+        for i, vanilla_path in enumerate(vanilla_paths):
+            path = self.modified_extract_path / vanilla_path.relative_to(
+                self.actual_extract_path
+            )
+            self.restore_vanilla(path)
+            progress_cb("linking to modified...", (i + 1) / len(vanilla_paths) * 100)
+        self.save()
+
+    def write_bytes(self, path: Path, data: bytes):
+        self.touched.add(self.manifest_key(path))
+        self.mark_patched(path)
+        digest = sha1(data).hexdigest()
+        if self.is_unchanged(path, digest):
+            return
+        super().write_bytes(path, data)
+        self.record(path, digest)
+
+    def restore_vanilla(self, path: Path):
+        self.touched.add(self.manifest_key(path))
+        self.mark_vanilla(path)
+        if self.is_unchanged(path, None):
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        unlink_existing(path)
+        link_file(self.vanilla_path(path), path)
+        self.record(path, None)
+
+    def remove(self, path: Path):
+        self.touched.add(self.manifest_key(path))
+        super().remove(path)
+        # kept in the manifest, so a later run that doesn't remove it restores it
+        self.manifest[self.manifest_key(path)] = (None, None, REMOVED)
+
+    @contextmanager
+    def open_for_update(self, path: Path) -> Iterator[BinaryIO]:
+        self.touched.add(self.manifest_key(path))
+        self.mark_patched(path)
+        if self.manifest.get(self.manifest_key(path), (None,) * 3)[2] in (
+            None,
+            REMOVED,
+        ):
+            # still shares its data with actual-extract, or doesn't exist anymore
+            unlink_existing(path)
+            shutil.copy(self.vanilla_path(path), path)
+        with path.open("r+b") as f:
+            yield f
+        # the content isn't hashed, since files patched in place aren't compared later on
+        self.record(path, PATCHED_IN_PLACE)
+
+    def finish(self):
+        super().finish()
+        # files patched in an earlier run but not in this one go back to vanilla
+        for key, (_size, _mtime, digest) in list(self.manifest.items()):
+            if key not in self.touched and digest is not None:
+                self.restore_vanilla(self.modified_extract_path / key)
+        self.touched.clear()
+        self.save()
+
+    def save(self):
+        with self.manifest_path.open("w") as f:
+            json.dump(self.manifest, f)
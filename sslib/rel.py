@@ -1,8 +1,15 @@
 from sslib.fs_helpers import *
 
 from io import BytesIO
+from bisect import bisect_left
 from collections import OrderedDict
 from enum import Enum
+import struct
+
+# offset from the previous relocation, type, section, symbol address
+RELOCATION_ENTRY = struct.Struct(">HBBI")
+# module number, offset of its relocations
+IMP_ENTRY = struct.Struct(">II")
 
 
 class REL:
@@ -77,7 +84,7 @@ class REL:
             module_num,
             relocation_data_offset,
         ) in relocation_data_offset_for_module.items():
-            self.relocation_entries_for_module[module_num] = []
+            self.relocation_entries_for_module[module_num] = RELModuleRelocations()
 
             offset = relocation_data_offset
             prev_relocation_offset = 0
@@ -100,8 +107,14 @@ class REL:
                         relocation_data_entry.section_num_to_relocate_against
                     )
                     prev_relocation_offset = 0
+                elif (
+                    relocation_data_entry.relocation_type
+                    == RELRelocationType.R_DOLPHIN_NOP
+                ):
+                    # only bridges a gap between two relocations
+                    pass
                 else:
-                    self.relocation_entries_for_module[module_num].append(
+                    self.relocation_entries_for_module[module_num].add(
                         relocation_data_entry
                     )
 
@@ -198,24 +211,16 @@ class REL:
 
         write_callback(data, relative_offset, *args)
 
-    def delete_relocation_in_range(self, offset, length):
-        for module_num, relocations in self.relocation_entries_for_module.items():
-            relocations_to_delete = []
-
-            for relocation in relocations:
-                curr_section = self.sections[relocation.curr_section_num]
-                relocation_absolute_offset = (
-                    relocation.relocation_offset + curr_section.offset
-                )
-
-                if (
-                    relocation_absolute_offset >= offset
-                    and relocation_absolute_offset < offset + length
-                ):
-                    relocations_to_delete.append(relocation)
+    def add_relocation(self, module_num, relocation):
+        if module_num not in self.relocation_entries_for_module:
+            self.relocation_entries_for_module[module_num] = RELModuleRelocations()
+        self.relocation_entries_for_module[module_num].add(relocation)
 
-            for relocation in relocations_to_delete:
-                relocations.remove(relocation)
+    def delete_relocation_in_range(self, offset, length):
+        for relocations in self.relocation_entries_for_module.values():
+            for section_num in relocations.section_nums():
+                start = offset - self.sections[section_num].offset
+                relocations.delete_range(section_num, start, start + length)
 
     def save_to_file(self, file_path, preserve_section_data_offsets=False):
         self.save_changes(preserve_section_data_offsets=preserve_section_data_offsets)
@@ -280,63 +285,41 @@ class REL:
             relocations_against_main = self.relocation_entries_for_module.pop(0)
             self.relocation_entries_for_module[0] = relocations_against_main
 
-        self.imp_table_offset = data_len(data)
-        imp_table_size = len(self.relocation_entries_for_module) * 8
-        imp_table_end = self.imp_table_offset + imp_table_size
-        self.relocation_table_offset = imp_table_end
-        self.fix_size = self.relocation_table_offset
-        write_u32(data, 0x24, self.relocation_table_offset)
-        write_u32(data, 0x28, self.imp_table_offset)
-        write_u32(data, 0x2C, imp_table_size)
-        next_imp_offset = self.imp_table_offset
-        next_relocation_entry_offset = self.relocation_table_offset
+        relocation_entries = []
+        # index of the first relocation entry for every module
+        first_entry_for_module = []
+        # number of relocation entries that have to stay after the rel is loaded
+        fixed_entry_count = 0
         for (
             module_num,
             relocation_data_entries,
         ) in self.relocation_entries_for_module.items():
-            write_u32(data, next_imp_offset + 0x00, module_num)
-            write_u32(data, next_imp_offset + 0x04, next_relocation_entry_offset)
-            next_imp_offset += 8
-
-            # Sort the relocations first by their section, then by their offset within the section.
-            relocation_data_entries.sort(
-                key=lambda reloc: (reloc.curr_section_num, reloc.relocation_offset)
-            )
+            first_entry_for_module.append((module_num, len(relocation_entries)))
 
+            # relocations are sorted first by their section, then by their offset within the section
             curr_section_num = None
             prev_relocation_offset = 0
             for relocation_data_entry in relocation_data_entries:
                 if relocation_data_entry.curr_section_num != curr_section_num:
                     curr_section_num = relocation_data_entry.curr_section_num
                     prev_relocation_offset = 0
-
-                    section_start_entry = RELRelocation()
-                    section_start_entry.relocation_type = (
-                        RELRelocationType.R_DOLPHIN_SECTION
+                    relocation_entries.append(
+                        (
+                            0,
+                            RELRelocationType.R_DOLPHIN_SECTION.value,
+                            curr_section_num,
+                            0,
+                        )
                     )
-                    section_start_entry.section_num_to_relocate_against = (
-                        curr_section_num
-                    )
-
-                    section_start_entry.save(data, next_relocation_entry_offset)
-                    next_relocation_entry_offset += RELRelocation.ENTRY_SIZE
 
                 offset_diff = (
                     relocation_data_entry.relocation_offset - prev_relocation_offset
                 )
                 while offset_diff > 0xFFFF:
                     # The offset change is stored as a halfword, so if the gap is too large, we must insert a NOP command (or several) to bridge the gap.
-                    nop_entry = RELRelocation()
-                    nop_entry.relocation_type = RELRelocationType.R_DOLPHIN_NOP
-
-                    relocation_data_entry.relocation_offset = (
-                        prev_relocation_offset + 0xFFFF
+                    relocation_entries.append(
+                        (0xFFFF, RELRelocationType.R_DOLPHIN_NOP.value, 0, 0)
                     )
-                    relocation_data_entry.offset_of_curr_relocation_from_prev = 0xFFFF
-                    nop_entry.save(data, next_relocation_entry_offset)
-                    prev_relocation_offset = relocation_data_entry.relocation_offset
-                    next_relocation_entry_offset += RELRelocation.ENTRY_SIZE
-
                     offset_diff -= 0xFFFF
 
                 if offset_diff < 0:
@@ -345,23 +328,51 @@ class REL:
                     )
 
                 relocation_data_entry.offset_of_curr_relocation_from_prev = offset_diff
-                relocation_data_entry.save(data, next_relocation_entry_offset)
+                relocation_entries.append(
+                    (
+                        offset_diff,
+                        relocation_data_entry.relocation_type.value,
+                        relocation_data_entry.section_num_to_relocate_against,
+                        relocation_data_entry.symbol_address,
+                    )
+                )
                 prev_relocation_offset = relocation_data_entry.relocation_offset
-                next_relocation_entry_offset += RELRelocation.ENTRY_SIZE
-
-            table_end_entry = RELRelocation()
-            table_end_entry.relocation_type = RELRelocationType.R_DOLPHIN_END
-            table_end_entry.section_num_to_relocate_against = curr_section_num
 
-            table_end_entry.save(data, next_relocation_entry_offset)
-            next_relocation_entry_offset += RELRelocation.ENTRY_SIZE
+            relocation_entries.append((0, RELRelocationType.R_DOLPHIN_END.value, 0, 0))
 
             if module_num != 0 and module_num != self.id:
                 # Normally fix_size wouldn't need to include any of the relocation table in it, because all relocations happen when the REL is first loaded, and the whole relocation table can be repurposed afterwards.
                 # But when the REL has relocations against a module besides main.dol and itself, that is no longer the case.
                 # Relocations against a different REL can happen after this REL is initially loaded, so we need to include those relocations in fix_size.
                 # Only relocations after the end of the last REL-to-REL relocation can be repurposed.
-                self.fix_size = next_relocation_entry_offset
+                fixed_entry_count = len(relocation_entries)
+
+        self.imp_table_offset = data_len(data)
+        imp_table_size = len(first_entry_for_module) * IMP_ENTRY.size
+        self.relocation_table_offset = self.imp_table_offset + imp_table_size
+        self.fix_size = (
+            self.relocation_table_offset + fixed_entry_count * RELOCATION_ENTRY.size
+        )
+        write_u32(data, 0x24, self.relocation_table_offset)
+        write_u32(data, 0x28, self.imp_table_offset)
+        write_u32(data, 0x2C, imp_table_size)
+
+        # the imp table and the relocations directly after it are written at once
+        tables = bytearray(
+            imp_table_size + len(relocation_entries) * RELOCATION_ENTRY.size
+        )
+        for i, (module_num, first_entry) in enumerate(first_entry_for_module):
+            IMP_ENTRY.pack_into(
+                tables,
+                i * IMP_ENTRY.size,
+                module_num,
+                self.relocation_table_offset + first_entry * RELOCATION_ENTRY.size,
+            )
+        for i, entry in enumerate(relocation_entries):
+            RELOCATION_ENTRY.pack_into(
+                tables, imp_table_size + i * RELOCATION_ENTRY.size, *entry
+            )
+        write_bytes(data, self.imp_table_offset, tables)
 
         write_u8(data, 0x30, self.prolog_section)
         write_u8(data, 0x31, self.epilog_section)
@@ -377,6 +388,63 @@ class REL:
         write_u32(data, 0x48, self.fix_size)
 
 
+class RELModuleRelocations:
+    """
+    All relocations against one module, sorted by their section and their offset within the section.
+    Adding only appends, a section is sorted once the next time it gets iterated or deleted from.
+    """
+
+    def __init__(self):
+        # section number -> offsets of the relocations, sorted
+        self.offsets_for_section = {}
+        # section number -> relocations, in the same order as the offsets
+        self.entries_for_section = {}
+        # sections with relocations added since they were last sorted
+        self.unsorted_sections = set()
+
+    def add(self, relocation):
+        section_num = relocation.curr_section_num
+        if section_num not in self.offsets_for_section:
+            self.offsets_for_section[section_num] = []
+            self.entries_for_section[section_num] = []
+        self.offsets_for_section[section_num].append(relocation.relocation_offset)
+        self.entries_for_section[section_num].append(relocation)
+        self.unsorted_sections.add(section_num)
+
+    def sort_section(self, section_num):
+        if section_num not in self.unsorted_sections:
+            return
+        self.unsorted_sections.remove(section_num)
+        entries = self.entries_for_section[section_num]
+        # the sort is stable, relocations with the same offset stay in the order they were added
+        entries.sort(key=lambda relocation: relocation.relocation_offset)
+        self.offsets_for_section[section_num] = [
+            relocation.relocation_offset for relocation in entries
+        ]
+
+    def section_nums(self):
+        return self.offsets_for_section.keys()
+
+    def delete_range(self, section_num, start, end):
+        """deletes all relocations in the section with start <= offset < end"""
+        self.sort_section(section_num)
+        offsets = self.offsets_for_section.get(section_num)
+        if not offsets:
+            return
+        first = bisect_left(offsets, start)
+        last = bisect_left(offsets, end, first)
+        del offsets[first:last]
+        del self.entries_for_section[section_num][first:last]
+
+    def __iter__(self):
+        for section_num in sorted(self.entries_for_section):
+            self.sort_section(section_num)
+            yield from self.entries_for_section[section_num]
+
+    def __len__(self):
+        return sum(len(offsets) for offsets in self.offsets_for_section.values())
+
+
 class RELSection:
     ENTRY_SIZE = 8
 
@@ -99,6 +99,28 @@ class U8File:
         self.data = data
         self.nodes = nodes
 
+    @staticmethod
+    def file_names(data: bytes) -> List[str]:
+        """
+        Reads only the node table and returns the names of all files,
+        without parsing the archive
+        """
+        if data[:4] != MAGIC_HEADER:
+            raise InvalidU8File("Invalid magic header.")
+        first_node_offset = struct.unpack_from(">I", data, 4)[0]
+        if first_node_offset != U8File.FIRST_NODE_OFFSET:
+            raise InvalidU8File("Invalid first node offset.")
+        total_node_count = struct.unpack_from(">I", data, first_node_offset + 8)[0]
+        string_pool_base_offset = first_node_offset + total_node_count * 12
+        names = []
+        for i in range(1, total_node_count):
+            (header,) = struct.unpack_from(">I", data, first_node_offset + i * 12)
+            if header >> 24 == 0:
+                start = string_pool_base_offset + (header & 0xFFFFFF)
+                end = data.index(b"\x00", start)
+                names.append(data[start:end].decode("shift_jis"))
+        return names
+
     @staticmethod
     def parse_u8(data: BufferedIOBase):
         nodes = []
@@ -3,28 +3,35 @@ from functools import cached_property
 import sys
 import re
 import random
+import multiprocessing
+import os
 from pathlib import Path
 import hashlib
 import json
 import yaml
 import subprocess
+import time
 
 from logic.constants import *
 from logic.inventory import EXTENDED_ITEM
 from logic.fill_algo_common import UserOutput
 from logic.randomize import Rando
 from logic.hints import Hints
+from logic.logic import Placement
+from logic.logic_utils import LogicUtils
 from logic.logic_input import Areas
-from logic.placement_file import PlacementFile
+from logic.placement_file import PlacementArchive, PlacementFile
 import SpoilerLog
+from deltapackage import write_delta_package
 
 from gamepatches import GamePatcher, GAMEPATCH_TOTAL_STEP_COUNT
 from paths import CUSTOM_HINT_DISTRIBUTION_PATH, RANDO_ROOT_PATH, IS_RUNNING_FROM_SOURCE
 from options import OPTIONS, Options
+from sslib.overlay import ExtractOverlay
 from sslib.utils import encodeBytes
 from version import VERSION, VERSION_WITHOUT_COMMIT
 
-from typing import List, Callable
+from typing import Dict, List, Callable, Tuple
 
 
 class StartupException(Exception):
@@ -39,6 +46,101 @@ def dummy_progress_callback(current_action_name):
     pass
 
 
+# fork doesn't need to build the logic areas again in the worker processes, but isn't safe on macos
+# or from a process with other threads, like the gui, which uses THREADED_START_METHOD instead
+FILL_ATTEMPT_START_METHOD = "fork" if sys.platform.startswith("linux") else "spawn"
+THREADED_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def fill_attempt_rng(seed: int, attempt: int, no_logs: bool) -> random.Random:
+    # the first attempt uses the seed itself, so a single attempt gives the same result as always
+    rng = random.Random(seed if attempt == 0 else f"{seed}-{attempt}")
+    if no_logs:
+        for _ in range(100):
+            rng.random()
+    return rng
+
+
+def fill_and_hint(
+    areas: Areas,
+    options: Options,
+    rng: random.Random,
+    useroutput: UserOutput,
+    rando: Rando | None = None,
+    timings: Dict[str, float] | None = None,
+) -> Tuple[LogicUtils, Hints]:
+    """
+    places all items and hints, raises GenerationFailed if that isn't possible
+    the seconds spent on each phase are stored in timings, if given
+    """
+    if rando is None:
+        rando = Rando(areas, options, rng)
+    if timings is None:
+        timings = {}
+    start = time.perf_counter()
+    useroutput.progress_callback("randomizing items...")
+    rando.randomize(useroutput)
+    fill_end = time.perf_counter()
+    timings["fill"] = fill_end - start
+    useroutput.progress_callback("preparing for hints...")
+    logic = rando.extract_hint_logic()
+    logic.check(useroutput)
+    useroutput.progress_callback("generating hints...")
+    hints = Hints(options, rng, areas, logic)
+    hints.do_hints(useroutput)
+    timings["hints"] = time.perf_counter() - fill_end
+    return logic, hints
+
+
+_fill_attempt_areas = None
+
+# hints change those on top of what rebuilding the logic from the placement gives
+HINTED_LOGIC_ATTRIBUTES = (
+    "requirements",
+    "backup_requirements",
+    "opaque",
+    "inventory",
+    "full_inventory",
+)
+
+
+def init_fill_attempt_worker(areas: Areas | None):
+    global _fill_attempt_areas
+    if areas is None:
+        from yaml_files import requirements, checks, hints, map_exits
+
+        areas = Areas(requirements, checks, hints, map_exits)
+    _fill_attempt_areas = areas
+
+
+def try_fill_attempt(options: Options, seed: int, attempt: int) -> Dict | None:
+    """
+    returns what's needed to rebuild the result of the attempt without filling again,
+    None if it failed
+    """
+    rng = fill_attempt_rng(seed, attempt, options["no-spoiler-log"])
+    useroutput = UserOutput(GenerationFailed, dummy_progress_callback)
+    rando = Rando(_fill_attempt_areas, options, rng)
+    timings = {}
+    try:
+        logic, _ = fill_and_hint(
+            _fill_attempt_areas, options, rng, useroutput, rando, timings
+        )
+    except GenerationFailed:
+        return None
+    return {
+        "placement": logic.placement.to_plain(),
+        "dungeon_entrances": rando.randomized_dungeon_entrance,
+        "trial_entrances": rando.randomized_trial_entrance,
+        "logic_state": {name: getattr(logic, name) for name in HINTED_LOGIC_ATTRIBUTES},
+        "rng_state": rng.getstate(),
+        "fill_stats": rando.fill_stats,
+        "timings": timings,
+    }
+
+
 class BaseRandomizer:
     """Class holding all the path and callback info for the GamePatcher"""
 
@@ -99,14 +201,16 @@ class Randomizer(BaseRandomizer):
         self.options.set_option("seed", self.seed)
 
         print(f"Seed: {self.seed}")
-        self.rng = random.Random(self.seed)
-        if self.no_logs:
-            for _ in range(100):
-                self.rng.random()
+        self.fill_attempts = self.options["fill-attempts"]
+        self.rng = fill_attempt_rng(self.seed, 0, self.no_logs)
         self.rando = Rando(self.areas, self.options, self.rng)
         self.excluded_locations = self.options["excluded-locations"]
         self.dry_run = bool(self.options["dry-run"])
         self.randomizer_hash = calculate_rando_hash(self.seed, self.options)
+        # if set, placement files are appended here instead of written as json
+        self.placement_archive: PlacementArchive | None = None
+        # phase -> seconds, filled in by randomize
+        self.timings: Dict[str, float] = {}
 
     def check_valid_directory_setup(self):
         # catch common errors with directory setup
@@ -114,6 +218,13 @@ class Randomizer(BaseRandomizer):
             raise StartupException(
                 "ERROR: directory actual-extract doesn't exist! Make sure you have the ISO extracted into that directory."
             )
+        if (
+            self.options["overlay-extract"]
+            and (self.actual_extract_path / "DATA").is_dir()
+            and not (self.modified_extract_path / "DATA").is_dir()
+        ):
+            # an overlay only consists of links, so it's cheap to set up here
+            ExtractOverlay(self.actual_extract_path, self.modified_extract_path).setup()
         if not self.modified_extract_path.is_dir():
             raise StartupException(
                 "ERROR: directory modified-extract doesn't exist! Make sure you have the contents of actual-extract copied over to modified-extract."
@@ -142,7 +253,8 @@ class Randomizer(BaseRandomizer):
         if self.dry_run:
             return rando_steps + 1
         else:
-            return rando_steps + 1 + 1 + GAMEPATCH_TOTAL_STEP_COUNT
+            delta_steps = 1 if self.options["delta-package"] else 0
+            return rando_steps + 1 + 1 + GAMEPATCH_TOTAL_STEP_COUNT + delta_steps
 
     def set_progress_callback(self, progress_callback: Callable[[str], None]):
         self.progress_callback = progress_callback
@@ -156,24 +268,31 @@ class Randomizer(BaseRandomizer):
                 f"Path {dir} is not a directory. Please specify a valid output folder."
             )
         useroutput = UserOutput(GenerationFailed, self.progress_callback)
-        self.progress_callback("randomizing items...")
-        self.rando.randomize(useroutput)
-        self.progress_callback("preparing for hints...")
-        self.logic = self.rando.extract_hint_logic()
+        if self.fill_attempts > 1:
+            self.run_fill_attempts(useroutput)
+        else:
+            self.logic, self.hints = fill_and_hint(
+                self.areas,
+                self.options,
+                self.rng,
+                useroutput,
+                self.rando,
+                self.timings,
+            )
+        self.fill_stats = self.rando.fill_stats
         del self.rando
-        self.logic.check(useroutput)
-        self.progress_callback("generating hints...")
-        self.hints = Hints(self.options, self.rng, self.areas, self.logic)
-        self.hints.do_hints(useroutput)
         if self.no_logs:
             self.progress_callback("writing anti spoiler log...")
         else:
             self.progress_callback("writing spoiler log...")
         plcmt_file = self.get_placement_file()
         if self.options["out-placement-file"] and not self.no_logs:
-            (self.log_file_path / f"placement_file_{self.seed}.json").write_text(
-                plcmt_file.to_json_str()
-            )
+            if self.placement_archive is not None:
+                self.placement_archive.append(plcmt_file)
+            else:
+                (self.log_file_path / f"placement_file_{self.seed}.json").write_text(
+                    plcmt_file.to_json_str()
+                )
 
         anti = "Anti " if self.no_logs else ""
         ext = "json" if self.options["json"] else "txt"
@@ -181,53 +300,23 @@ class Randomizer(BaseRandomizer):
             f"SS Random {self.seed} - {anti}Spoiler Log.{ext}"
         )
 
-        goals = [DUNGEON_GOALS[dun] for dun in self.logic.required_dungeons] + [DEMISE]
-        sots_items = {
-            goal: self.logic.get_sots_items(
-                EXTENDED_ITEM[self.areas.short_to_full(GOAL_CHECKS[goal])]
-            )
-            for goal in goals
-        }
-
-        if self.options["json"]:
-            dump = SpoilerLog.dump_json(
-                self.logic.placement,
-                self.options,
-                hash=self.randomizer_hash,
-                progression_spheres=self.logic.calculate_playthrough_progression_spheres(),
-                hints=self.logic.placement.hints,
-                required_dungeons=self.logic.required_dungeons,
-                sots_items=sots_items,
-                barren_nonprogress=self.logic.get_barren_regions(),
-                randomized_dungeon_entrance=self.logic.randomized_dungeon_entrance,
-                randomized_trial_entrance=self.logic.randomized_trial_entrance,
-                randomized_start_entrance=self.logic.randomized_start_entrance,
-                randomized_start_statues=self.logic.randomized_start_statues,
-                puzzles=self.logic.puzzles,
-            )
-            with log_address.open("w") as f:
-                json.dump(dump, f, indent=2)
-        else:
-            with log_address.open("w") as f:
+        start = time.perf_counter()
+        self.spoiler = SpoilerLog.SpoilerData.from_logic(
+            self.logic, self.areas, self.options, self.randomizer_hash
+        )
+        with log_address.open("w") as f:
+            if self.options["json"]:
+                SpoilerLog.dump_json(
+                    f, self.logic.placement, self.options, self.spoiler
+                )
+            else:
                 SpoilerLog.write(
-                    f,
-                    self.logic.placement,
-                    self.options,
-                    self.areas,
-                    hash=self.randomizer_hash,
-                    progression_spheres=self.logic.calculate_playthrough_progression_spheres(),
-                    hints=self.logic.placement.hints,
-                    required_dungeons=self.logic.required_dungeons,
-                    sots_items=sots_items,
-                    barren_nonprogress=self.logic.get_barren_regions(),
-                    randomized_dungeon_entrance=self.logic.randomized_dungeon_entrance,
-                    randomized_trial_entrance=self.logic.randomized_trial_entrance,
-                    randomized_start_entrance=self.logic.randomized_start_entrance,
-                    randomized_start_statues=self.logic.randomized_start_statues,
-                    puzzles=self.logic.puzzles,
+                    f, self.logic.placement, self.options, self.areas, self.spoiler
                 )
+        self.timings["spoiler log"] = time.perf_counter() - start
         if not self.dry_run:
-            GamePatcher(
+            start = time.perf_counter()
+            game_patcher = GamePatcher(
                 self.areas,
                 self.options,
                 self.progress_callback,
@@ -238,9 +327,80 @@ class Randomizer(BaseRandomizer):
                 self.oarc_cache_path,
                 self.arc_replacement_path,
                 plcmt_file,
-            ).do_all_gamepatches()
+            )
+            game_patcher.do_all_gamepatches()
+            if self.options["delta-package"]:
+                self.progress_callback("writing delta package...")
+                write_delta_package(
+                    game_patcher.patcher.extract_writer,
+                    self.options["output-folder"]
+                    / f"SS Random {self.seed} - Delta.zip",
+                )
+            self.timings["patching"] = time.perf_counter() - start
             self.progress_callback("patching done")
 
+    def run_fill_attempts(self, useroutput: UserOutput):
+        """
+        Fills with the seed itself here, while the other attempts run in worker processes.
+        The attempt with the lowest index that succeeds is used, so the result doesn't depend on timing
+        """
+        use_fork = FILL_ATTEMPT_START_METHOD == "fork"
+        context = multiprocessing.get_context(FILL_ATTEMPT_START_METHOD)
+        processes = max(1, min(self.fill_attempts - 1, (os.cpu_count() or 1) - 1))
+        # leaving the pool terminates the attempts that are still running
+        with context.Pool(
+            processes,
+            initializer=init_fill_attempt_worker,
+            initargs=(self.areas if use_fork else None,),
+        ) as pool:
+            results = [
+                pool.apply_async(try_fill_attempt, (self.options, self.seed, attempt))
+                for attempt in range(1, self.fill_attempts)
+            ]
+            try:
+                self.logic, self.hints = fill_and_hint(
+                    self.areas,
+                    self.options,
+                    self.rng,
+                    useroutput,
+                    self.rando,
+                    self.timings,
+                )
+                return
+            except GenerationFailed as e:
+                error = e
+            self.progress_callback("waiting for other fill attempts...")
+            for attempt, async_result in enumerate(results, start=1):
+                if (result := async_result.get()) is not None:
+                    break
+            else:
+                raise GenerationFailed(
+                    f"All {self.fill_attempts} fill attempts failed: {error}"
+                )
+
+        print(f"Using fill attempt {attempt}")
+        self.use_fill_attempt(attempt, result)
+
+    def use_fill_attempt(self, attempt: int, result: Dict):
+        """
+        Rebuilds the logic of an attempt from what try_fill_attempt returned, without filling again.
+        Rando draws the same settings (required dungeons, entrances...) from the attempt's rng
+        """
+        self.rng = fill_attempt_rng(self.seed, attempt, self.no_logs)
+        self.rando = Rando(self.areas, self.options, self.rng)
+        self.rando.use_placement(
+            Placement.from_plain(result["placement"]),
+            result["dungeon_entrances"],
+            result["trial_entrances"],
+            result["fill_stats"],
+        )
+        self.rng.setstate(result["rng_state"])
+        self.timings.update(result["timings"])
+        self.logic = self.rando.extract_hint_logic()
+        for name, value in result["logic_state"].items():
+            setattr(self.logic, name, value)
+        self.hints = None
+
     def get_placement_file(self):
         MAX_SEED = 1_000_000
         # temporary placement file stuff
@@ -249,7 +409,10 @@ class Randomizer(BaseRandomizer):
         plcmt_file.dungeon_connections = self.logic.randomized_dungeon_entrance
         plcmt_file.trial_connections = self.logic.randomized_trial_entrance
         plcmt_file.start_entrance = self.logic.randomized_start_entrance
-        plcmt_file.start_statues = self.logic.randomized_start_statues
+        plcmt_file.start_statues = {
+            province: entrance
+            for province, (entrance, _) in self.logic.randomized_start_statues.items()
+        }
         plcmt_file.puzzles = self.logic.puzzles
         plcmt_file.hash_str = self.randomizer_hash
         plcmt_file.hints = {
@@ -0,0 +1,93 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from io import BytesIO
+import struct
+
+import numpy as np
+import pytest
+from brresTools.brres import BRRES, FileNotFoundError
+
+RGBA32 = 6
+
+
+def index_group(group_offset: int, entries) -> bytes:
+    # entries are (name offset, data offset) pairs, relative to the whole file
+    data = struct.pack(">II", 8 + 16 * (len(entries) + 1), len(entries))
+    data += bytes(16)  # reference point entry
+    for name_offset, data_offset in entries:
+        data += bytes(8)
+        data += struct.pack(
+            ">II", name_offset - group_offset, data_offset - group_offset
+        )
+    return data
+
+
+def make_brres(image: np.array) -> bytes:
+    # root group -> Textures(NW4R) group -> one RGBA32 texture called "tex"
+    height, width, _ = image.shape
+    root_group, textures_group, tex0 = 0x18, 0x40, 0x68
+    tex0_header_size = 0x40
+    image_data = image.reshape(height // 4, 4, width // 4, 4, 4).transpose(
+        0, 2, 4, 1, 3
+    )
+    # RGBA32 blocks store AR pairs and then GB pairs
+    image_data = np.stack(
+        [
+            np.stack([image_data[:, :, 3], image_data[:, :, 0]], -1).reshape(-1, 32),
+            np.stack([image_data[:, :, 1], image_data[:, :, 2]], -1).reshape(-1, 32),
+        ],
+        1,
+    ).tobytes()
+    names = tex0 + tex0_header_size + len(image_data)
+
+    tex0_data = b"TEX0" + struct.pack(">I", tex0_header_size + len(image_data))
+    tex0_data += bytes(8) + struct.pack(">I", tex0_header_size) + bytes(8)
+    tex0_data += struct.pack(">HHI", width, height, RGBA32)
+    tex0_data = tex0_data.ljust(tex0_header_size, b"\x00") + image_data
+
+    data = b"bres\xfe\xff" + bytes(6) + struct.pack(">HH", 0x10, 1)
+    data += b"root" + struct.pack(">I", 0)
+    data += index_group(root_group, [(names, textures_group)])
+    data += index_group(textures_group, [(names + 16, tex0)])
+    data += tex0_data
+    data += b"Textures(NW4R)\x00\x00" + b"tex\x00"
+    return data
+
+
+def test_texture_access():
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (4, 8, 4), dtype=np.uint8)
+    brres = BRRES.parse_brres(BytesIO(make_brres(image)))
+
+    assert brres.get_file_node("Textures(NW4R)/tex").name == "tex"
+    with pytest.raises(FileNotFoundError):
+        brres.get_file_node("Textures(NW4R)/missing")
+
+    texture = brres.get_file_data("Textures(NW4R)/tex")
+    assert np.array_equal(texture, image)
+    # the decoded texture is cached, changing the returned copy doesn't change it
+    texture[:] = 0
+    assert np.array_equal(brres.get_file_data("Textures(NW4R)/tex"), image)
+    assert not brres.modified
+
+    brres.set_file_data("Textures(NW4R)/tex", image[::-1].copy())
+    assert brres.modified
+    assert np.array_equal(brres.get_file_data("Textures(NW4R)/tex"), image[::-1])
+
+
+def test_raw_access():
+    image = np.zeros((4, 8, 4), dtype=np.uint8)
+    brres = BRRES.parse_brres(BytesIO(make_brres(image)))
+
+    raw = brres.get_file_bytes("Textures(NW4R)/tex")
+    assert raw[:4] == b"TEX0" and len(raw) == 0x40 + 8 * 4 * 4
+    with pytest.raises(Exception):
+        brres.set_file_bytes("Textures(NW4R)/tex", raw[:-1])
+
+    raw = raw[:-1] + b"\xff"
+    brres.set_file_bytes("Textures(NW4R)/tex", raw)
+    assert brres.modified
+    assert brres.get_file_data("Textures(NW4R)/tex")[3, 7, 2] == 0xFF
@@ -0,0 +1,55 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import sqlite3
+
+from bulkresults import ResultWriter, SeedResult
+from logic.fill_algo_common import FillStats
+from options import Options
+
+
+def test_results_written_once_writer_closes(tmp_path):
+    path = tmp_path / "results.sqlite"
+    options = Options()
+    permalink = options.get_permalink(exclude_seed=True)
+    writer = ResultWriter(path)
+    for seed in range(100):
+        writer.queue.put(
+            SeedResult(
+                seed,
+                permalink,
+                "2.0",
+                f"Hash {seed}",
+                fill_stats=FillStats(swaps=seed % 3),
+                timings={"fill": 1.5, "hints": 0.5},
+                item_locations={
+                    "Skyloft - Chest": "Progressive Sword" if seed % 4 else "Clawshots",
+                    "Sky - Chest": "Gratitude Crystal",
+                },
+                required_dungeons=["Skyview"],
+                barren_regions=[("Lanayru Gorge", False), ("Batreaux", True)],
+                hints=[("Skyloft - Stone", 0, "They say that ...")],
+            )
+        )
+    writer.queue.put(SeedResult.from_error(100, options, ValueError("no room")))
+    writer.close()
+
+    connection = sqlite3.connect(path)
+    ((clawshots_count,),) = connection.execute(
+        "SELECT COUNT(*) FROM placements p "
+        "JOIN seeds s ON s.id = p.seed_id "
+        "JOIN permalinks l ON l.id = s.permalink_id "
+        "WHERE p.item = ? AND p.location = ? AND l.permalink = ?",
+        ("Clawshots", "Skyloft - Chest", permalink),
+    ).fetchall()
+    assert clawshots_count == 25
+    assert connection.execute(
+        "SELECT seed, success, error FROM seeds WHERE success = 0"
+    ).fetchall() == [(100, 0, "ValueError: no room")]
+    ((swaps,),) = connection.execute("SELECT SUM(swaps) FROM seeds").fetchall()
+    assert swaps == sum(seed % 3 for seed in range(100))
+    ((timings,),) = connection.execute("SELECT COUNT(*) FROM timings").fetchall()
+    assert timings == 200
+    connection.close()
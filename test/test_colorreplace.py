@@ -0,0 +1,84 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import colorsys
+import cv2
+import numpy as np
+from colorReplace import cvt_hex_to_RGBA, recolour_texture
+
+
+# the original recolour, converting the whole texture for every mask
+def replace_mask(texture, mask, new_color):
+    mask_inv = cv2.bitwise_not(mask)
+
+    new_color = cvt_hex_to_RGBA(new_color)
+    new_color = [i / 255 for i in new_color]
+
+    unmaskedTexture = cv2.bitwise_and(texture, texture, mask=mask)
+
+    maskedTexture = cv2.bitwise_or(texture, texture, mask=mask_inv)
+    maskedTexture = cv2.cvtColor(maskedTexture, cv2.COLOR_BGR2HSV)
+    hChannel = maskedTexture[:, :, 0]
+    sChannel = maskedTexture[:, :, 1]
+    vChannel = maskedTexture[:, :, 2]
+    targetHSV = colorsys.rgb_to_hsv(new_color[0], new_color[1], new_color[2])
+    hChannel = (targetHSV[0] * 180) + (0 * hChannel)
+    sChannel = (targetHSV[1] * 255) + (0 * sChannel)
+    vChannel = targetHSV[2] * (vChannel * (255 / vChannel.max()))
+    maskedTexture[:, :, 0] = hChannel
+    maskedTexture[:, :, 1] = sChannel
+    maskedTexture[:, :, 2] = vChannel
+
+    maskedTexture = cv2.cvtColor(maskedTexture, cv2.COLOR_HSV2BGR)
+    maskedTexture = cv2.cvtColor(maskedTexture, cv2.COLOR_BGR2RGBA)
+    maskedTexture = cv2.bitwise_or(maskedTexture, maskedTexture, mask=mask_inv)
+
+    return maskedTexture + unmaskedTexture
+
+
+def random_color(rng):
+    return "#" + bytes(rng.integers(0, 256, 3, dtype=np.uint8)).hex().upper() + "FF"
+
+
+def test_matches_sequential_replace():
+    # OpenCV's HSV to BGR conversion rounds differently depending on where a pixel
+    # ends up in its vectorized loop, so the old recolour itself is only accurate to
+    # 1 per channel. Soft masks add onto the pixel with wraparound, so they're only
+    # used as the last mask where that can't change which pixels later masks see.
+    rng = np.random.default_rng(0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for _ in range(50):
+            height, width = rng.integers(4, 64, 2)
+            texture = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+            mask_count = rng.integers(1, 6)
+            masks = []
+            for i in range(mask_count):
+                # overlapping rectangles
+                mask = np.full((height, width), 255, dtype=np.uint8)
+                y, x = rng.integers(0, height), rng.integers(0, width)
+                region = mask[
+                    y : y + rng.integers(1, height), x : x + rng.integers(1, width)
+                ]
+                if i == mask_count - 1 and rng.random() < 0.5:
+                    region[:] = rng.integers(0, 256, region.shape)
+                else:
+                    region[:] = 0
+                masks.append(mask)
+            colors = [random_color(rng) for _ in masks]
+
+            expected = texture
+            for mask, color in zip(masks, colors):
+                expected = replace_mask(expected, mask, color)
+
+            result = recolour_texture(texture, masks, colors)
+            assert result.shape == expected.shape
+            difference = (result - expected).view(np.int8)
+            assert np.abs(difference.astype(int)).max() <= 2
+
+
+def test_unused_mask():
+    texture = np.zeros((4, 4, 4), dtype=np.uint8)
+    mask = np.full((4, 4), 255, dtype=np.uint8)
+    assert np.array_equal(recolour_texture(texture, [mask], ["#FF0000"]), texture)
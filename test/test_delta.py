@@ -0,0 +1,124 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import zipfile
+
+import pytest
+from deltapackage import (
+    BLOCK_SIZE,
+    DeltaPackageException,
+    apply_delta_package,
+    write_delta_package,
+)
+import shutil
+
+from sslib.overlay import ExtractOverlay, ExtractWriter
+
+
+def make_extracts(tmp_path):
+    actual = tmp_path / "actual-extract"
+    files = actual / "DATA" / "files"
+    files.mkdir(parents=True)
+    (files / "big.arc").write_bytes(bytes(range(256)) * (BLOCK_SIZE // 8))
+    (files / "small.arc").write_bytes(b"vanilla small")
+    (files / "same.arc").write_bytes(b"vanilla same")
+    (files / "removed.arc").write_bytes(b"vanilla removed")
+    overlay = ExtractOverlay(actual, tmp_path / "modified-extract")
+    overlay.setup()
+    return actual, tmp_path / "modified-extract", overlay
+
+
+def test_delta_roundtrip(tmp_path):
+    actual, modified, overlay = make_extracts(tmp_path)
+    files = modified / "DATA" / "files"
+    big = bytearray((files / "big.arc").read_bytes())
+    big[BLOCK_SIZE + 5] ^= 0xFF
+    big += b"appended"
+    overlay.write_bytes(files / "big.arc", bytes(big))
+    overlay.write_bytes(files / "small.arc", b"patched small")
+    overlay.write_bytes(files / "new.arc", b"new file")
+    overlay.remove(files / "removed.arc")
+    overlay.finish()
+
+    delta_path = tmp_path / "delta.zip"
+    write_delta_package(overlay, delta_path)
+    with zipfile.ZipFile(delta_path) as delta:
+        names = set(delta.namelist())
+        # only the changed blocks of big files are stored
+        assert delta.getinfo("blocks/DATA/files/big.arc").file_size < 3 * BLOCK_SIZE
+    assert "files/DATA/files/same.arc" not in names
+    assert "files/DATA/files/small.arc" in names
+    assert "files/DATA/files/new.arc" in names
+
+    rebuilt = tmp_path / "rebuilt-extract"
+    apply_delta_package(delta_path, actual, rebuilt)
+    for path in modified.rglob("*.arc"):
+        assert (rebuilt / path.relative_to(modified)).read_bytes() == path.read_bytes()
+    assert not (rebuilt / "DATA" / "files" / "removed.arc").exists()
+    # actual-extract must stay untouched
+    assert (actual / "DATA" / "files" / "small.arc").read_bytes() == b"vanilla small"
+
+
+def test_delta_over_patched_extract(tmp_path):
+    actual, modified, overlay = make_extracts(tmp_path)
+    files = modified / "DATA" / "files"
+    big = bytearray((files / "big.arc").read_bytes())
+    big[BLOCK_SIZE + 5] ^= 0xFF
+    overlay.write_bytes(files / "big.arc", bytes(big))
+    overlay.finish()
+    delta_path = tmp_path / "delta.zip"
+    write_delta_package(overlay, delta_path)
+
+    # an earlier run left another patched version of the file
+    rebuilt = tmp_path / "rebuilt-extract"
+    earlier = ExtractOverlay(actual, rebuilt)
+    earlier.setup()
+    other = bytearray(big)
+    other[0] ^= 0xFF
+    earlier.write_bytes(rebuilt / "DATA" / "files" / "big.arc", bytes(other))
+    earlier.finish()
+
+    for _ in range(2):
+        apply_delta_package(delta_path, actual, rebuilt)
+        assert (rebuilt / "DATA" / "files" / "big.arc").read_bytes() == bytes(big)
+    assert (actual / "DATA" / "files" / "big.arc").read_bytes() != bytes(big)
+
+
+def test_delta_wrong_base(tmp_path):
+    actual, modified, overlay = make_extracts(tmp_path)
+    big = bytearray((modified / "DATA" / "files" / "big.arc").read_bytes())
+    big[0] ^= 0xFF
+    overlay.write_bytes(modified / "DATA" / "files" / "big.arc", bytes(big))
+    overlay.finish()
+    delta_path = tmp_path / "delta.zip"
+    write_delta_package(overlay, delta_path)
+
+    (actual / "DATA" / "files" / "big.arc").write_bytes(b"other version")
+    with pytest.raises(DeltaPackageException):
+        apply_delta_package(delta_path, actual, tmp_path / "rebuilt-extract")
+
+
+def test_delta_copy_mode(tmp_path):
+    actual, _, _ = make_extracts(tmp_path)
+    modified = tmp_path / "copied-extract"
+    shutil.copytree(actual, modified)
+    files = modified / "DATA" / "files"
+    # only what the writer patched is compared, not the whole extract
+    (files / "same.arc").write_bytes(b"left over from another run")
+    writer = ExtractWriter(actual, modified)
+    writer.write_bytes(files / "small.arc", b"patched small")
+    writer.write_bytes(files / "big.arc", (actual / "DATA/files/big.arc").read_bytes())
+    writer.remove(files / "removed.arc")
+    writer.finish()
+
+    delta_path = tmp_path / "delta.zip"
+    write_delta_package(writer, delta_path)
+    with zipfile.ZipFile(delta_path) as delta:
+        assert set(delta.namelist()) == {"manifest.json", "files/DATA/files/small.arc"}
+    rebuilt = tmp_path / "rebuilt-extract"
+    apply_delta_package(delta_path, actual, rebuilt)
+    assert (rebuilt / "DATA" / "files" / "small.arc").read_bytes() == b"patched small"
+    assert (rebuilt / "DATA" / "files" / "same.arc").read_bytes() == b"vanilla same"
+    assert not (rebuilt / "DATA" / "files" / "removed.arc").exists()
@@ -0,0 +1,36 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+pytest.importorskip("disc_riider_py")
+
+from extractmanager import ExtractManager
+
+
+def test_copy_to_modified(tmp_path):
+    files = tmp_path / "actual-extract" / "DATA" / "files"
+    (files / "Stage").mkdir(parents=True)
+    (tmp_path / "actual-extract" / "DATA" / "sys").mkdir()
+    (tmp_path / "actual-extract" / "DATA" / "sys" / "main.dol").write_bytes(b"dol")
+    (files / "Stage" / "big.arc").write_bytes(os.urandom(3 * 1024 * 1024 + 5))
+    (files / "empty.arc").write_bytes(b"")
+    progress = []
+
+    manager = ExtractManager(tmp_path)
+    manager.copy_to_modified(lambda action, percent: progress.append(percent), 2)
+
+    for path in (tmp_path / "actual-extract").rglob("*"):
+        copied = (
+            tmp_path
+            / "modified-extract"
+            / path.relative_to(tmp_path / "actual-extract")
+        )
+        if path.is_file():
+            assert copied.read_bytes() == path.read_bytes()
+        else:
+            assert copied.is_dir()
+    assert manager.modified_extract_already_exists()
+    assert progress == sorted(progress) and progress[-1] == 100
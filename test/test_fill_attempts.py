@@ -0,0 +1,20 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import random
+
+from ssrando import fill_attempt_rng
+
+
+def test_first_attempt_uses_seed():
+    assert fill_attempt_rng(1234, 0, False).random() == random.Random(1234).random()
+
+
+def test_attempts_are_reproducible():
+    firsts = [fill_attempt_rng(1234, attempt, True).random() for attempt in range(4)]
+    assert firsts == [
+        fill_attempt_rng(1234, attempt, True).random() for attempt in range(4)
+    ]
+    assert len(set(firsts)) == 4
@@ -0,0 +1,33 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import random
+
+from hints.hint_distribution import IndexedCandidatePool
+
+
+def test_candidate_pool_matches_list():
+    rng = random.Random(5)
+    candidates = [f"Location {i}" for i in range(100)]
+    pool = IndexedCandidatePool(list(candidates))
+    remaining = list(candidates)
+    while remaining:
+        assert len(pool) == len(remaining)
+        assert [pool[i] for i in range(len(pool))] == remaining
+        removed = rng.choice(candidates)
+        pool.remove(removed)
+        if removed in remaining:
+            remaining.remove(removed)
+
+
+def test_candidate_pool_same_choice():
+    candidates = [f"Location {i}" for i in range(50)]
+    pool = IndexedCandidatePool(list(candidates))
+    for loc in candidates[::3]:
+        pool.remove(loc)
+    remaining = [loc for loc in candidates if loc not in candidates[::3]]
+    assert pool[random.Random(1).randrange(len(pool))] == random.Random(1).choice(
+        remaining
+    )
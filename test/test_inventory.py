@@ -0,0 +1,60 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import random
+from itertools import combinations
+
+from logic.constants import *
+from logic.inventory import EXTENDED_ITEM, Inventory, copy_group_mask
+from logic.logic_expression import DNFInventory, InventoryAtom, LogicExpression
+
+COPIES = [EXTENDED_ITEM[number(GRATITUDE_CRYSTAL, i)] for i in range(15)]
+
+
+def expanded_atom(quantity):
+    return DNFInventory(
+        {Inventory(set(comb)) for comb in combinations(COPIES, quantity)}
+    )
+
+
+def test_threshold_matches_combinations():
+    rng = random.Random(5)
+    atoms = {
+        quantity: InventoryAtom(GRATITUDE_CRYSTAL, quantity)
+        for quantity in (1, 5, 10, 15)
+    }
+    assert len(atoms[10].disjunction) == 1
+    assert (
+        LogicExpression.parse("Gratitude Crystal x10").disjunction
+        == atoms[10].disjunction
+    )
+    for _ in range(200):
+        inventory = Inventory({bit for bit in COPIES if rng.random() < 0.6})
+        for quantity, atom in atoms.items():
+            assert atom.eval(inventory) == expanded_atom(quantity).eval(inventory)
+
+
+def test_threshold_terms_simplify():
+    mask = copy_group_mask(GRATITUDE_CRYSTAL)
+    first, second = COPIES[:2]
+    assert Inventory.at_least(mask, 2) <= Inventory.at_least(mask, 3)
+    assert not Inventory.at_least(mask, 3) <= Inventory.at_least(mask, 2)
+    # owned copies count towards the threshold
+    others = mask & ~(1 << first) & ~(1 << second)
+    assert Inventory.at_least(mask, 3) <= Inventory(
+        {first, second}
+    ) | Inventory.at_least(others, 1)
+    assert not Inventory.at_least(mask, 4) <= Inventory(
+        {first, second}
+    ) | Inventory.at_least(others, 1)
+    assert Inventory({first}) | Inventory.at_least(mask, 1) == Inventory({first})
+
+    req = InventoryAtom(GRATITUDE_CRYSTAL, 2) | InventoryAtom(GRATITUDE_CRYSTAL, 5)
+    assert set(req.disjunction) == set(InventoryAtom(GRATITUDE_CRYSTAL, 2).disjunction)
+
+    assert InventoryAtom(GRATITUDE_CRYSTAL, 15).remove(first).is_impossible()
+    (removed,) = InventoryAtom(GRATITUDE_CRYSTAL, 14).remove(first).disjunction
+    assert removed == Inventory.at_least(mask & ~(1 << first), 14)
+    assert removed.mentioned_bitset == mask & ~(1 << first)
@@ -3,14 +3,28 @@ import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from ssrando import Randomizer
+from ssrando import (
+    Randomizer,
+    fill_and_hint,
+    fill_attempt_rng,
+    init_fill_attempt_worker,
+    try_fill_attempt,
+)
 from options import Options
 from yaml_files import requirements, checks, hints, map_exits
 from logic.logic_input import Areas
 from logic.fill_algo_common import UserOutput
+from logic.constants import *
+from logic.inventory import EVERYTHING_UNBANNED_BIT, EXTENDED_ITEM
+from logic.randomize import Rando
+from logic.placement_file import InvalidPlacementFile, PlacementFile
+from logic.verification import verify_placement
 
 import time
 import json
+import pickle
+
+import pytest
 
 areas = Areas(requirements, checks, hints, map_exits)
 useroutput = UserOutput(Exception, lambda s: None)
@@ -81,3 +95,138 @@ def test_barren():
         rando.logic.get_barren_regions()
         # with open(f'testlogs/log4_{i:02}.json','w') as f:
         #     json.dump(rando.logic.get_barren_regions(), f, indent=2)
+
+
+def test_entrances_connected():
+    opts = Options()
+    opts.set_option("dry-run", True)
+    opts.set_option("seed", 7)
+    opts.set_option("randomize-entrances", "All Surface Dungeons + Sky Keep")
+    opts.set_option("randomize-trials", True)
+    rando = Randomizer(areas, opts)
+    # only place the connections, the items are all assumed to be owned
+    rando.rando.rando_algo.entrance_shuffle.place(useroutput)
+    logic = rando.rando.rando_algo.logic
+    norm = areas.short_to_full
+
+    dungeon_connections = rando.rando.randomized_dungeon_entrance
+    assert sorted(dungeon_connections.values()) == sorted(ALL_DUNGEONS)
+    for entrance, dungeon in dungeon_connections.items():
+        dungeon_entrance = entrance_of_exit(norm(DUNGEON_MAIN_EXITS[dungeon]))
+        for exit in DUNGEON_ENTRANCE_EXITS[entrance]:
+            assert logic.placement.map_transitions[norm(exit)] == dungeon_entrance
+
+    trial_connections = rando.rando.randomized_trial_entrance
+    assert sorted(trial_connections.values()) == sorted(ALL_SILENT_REALMS)
+    for gate, realm in trial_connections.items():
+        realm_entrance = entrance_of_exit(norm(SILENT_REALM_EXITS[realm]))
+        exit = norm(TRIAL_GATE_EXITS[gate])
+        assert logic.placement.map_transitions[exit] == realm_entrance
+        # the trial reward is reachable through whichever gate the realm is behind
+        assert logic.full_inventory[EXTENDED_ITEM[norm(SILENT_REALM_CHECKS[realm])]]
+
+    # every shuffled connection keeps the whole world reachable
+    assert logic.full_inventory[EVERYTHING_UNBANNED_BIT]
+
+
+def test_dungeon_keys_placed_first():
+    opts = Options()
+    opts.set_option("dry-run", True)
+    opts.set_option("seed", 3)
+    rando = Randomizer(areas, opts)
+    order = rando.rando.rando_algo.order_progress_items()
+    # by default, keys can only go in their own dungeon,
+    # the ones of unrequired dungeons aren't progress items
+    keys = [
+        order.index(key)
+        for dungeon in ALL_DUNGEONS
+        for key in [*SMALL_KEYS[dungeon], *BOSS_KEYS[dungeon]]
+        if key in order
+    ]
+    assert keys
+    assert max(keys) < order.index(CLAWSHOTS)
+    assert max(keys) < order.index(GUST_BELLOWS)
+
+
+def test_verify_placement():
+    opts = Options()
+    opts.set_option("dry-run", True)
+    opts.set_option("seed", 1)
+    opts.set_option("randomize-entrances", "All Surface Dungeons + Sky Keep")
+    opts.set_option("randomize-trials", True)
+    rando = Randomizer(areas, opts)
+    rando.logic, rando.hints = fill_and_hint(
+        areas, opts, rando.rng, useroutput, rando.rando
+    )
+    placement_file = rando.get_placement_file()
+
+    verification = verify_placement(areas, placement_file, spheres=True)
+    assert verification.beatable
+    assert not verification.unreachable_locations
+    assert (
+        verification.spheres == rando.logic.calculate_playthrough_progression_spheres()
+    )
+
+    placement_file.item_locations = {
+        loc: RED_RUPEE if item.startswith(PROGRESSIVE_SWORD) else item
+        for loc, item in placement_file.item_locations.items()
+    }
+    verification = verify_placement(areas, placement_file)
+    assert not verification.beatable
+    assert verification.unreachable_goal == DEMISE
+    assert verification.unreachable_locations
+
+
+def test_verify_json_placement():
+    opts = Options()
+    opts.set_option("dry-run", True)
+    opts.set_option("seed", 4)
+    opts.set_option("random-start-entrance", "Any Surface Region")
+    opts.set_option("random-start-statues", True)
+    rando = Randomizer(areas, opts)
+    rando.logic, rando.hints = fill_and_hint(
+        areas, opts, rando.rng, useroutput, rando.rando
+    )
+    placement_file = PlacementFile()
+    placement_file.read_from_str(rando.get_placement_file().to_json_str())
+
+    verification = verify_placement(areas, placement_file, spheres=True)
+    assert verification.beatable
+    assert (
+        verification.spheres == rando.logic.calculate_playthrough_progression_spheres()
+    )
+
+    # placement files from older versions don't have them
+    placement_file.start_entrance = {}
+    with pytest.raises(InvalidPlacementFile):
+        verify_placement(areas, placement_file)
+
+
+def test_use_fill_attempt():
+    opts = Options()
+    opts.set_option("dry-run", True)
+    opts.set_option("seed", 2)
+    opts.set_option("randomize-entrances", "All Surface Dungeons + Sky Keep")
+    opts.set_option("randomize-trials", True)
+
+    init_fill_attempt_worker(areas)
+    # what the worker process sends back
+    result = pickle.loads(pickle.dumps(try_fill_attempt(opts, 2, 1)))
+    rebuilt = Randomizer(areas, opts)
+    rebuilt.use_fill_attempt(1, result)
+
+    filled = Randomizer(areas, opts)
+    filled.rng = fill_attempt_rng(2, 1, False)
+    filled.rando = Rando(areas, opts, filled.rng)
+    filled.logic, filled.hints = fill_and_hint(
+        areas, opts, filled.rng, useroutput, filled.rando
+    )
+
+    assert (
+        rebuilt.get_placement_file().to_json_str()
+        == filled.get_placement_file().to_json_str()
+    )
+    assert (
+        rebuilt.logic.calculate_playthrough_progression_spheres()
+        == filled.logic.calculate_playthrough_progression_spheres()
+    )
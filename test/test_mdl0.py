@@ -0,0 +1,103 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from io import BytesIO
+import struct
+
+import numpy as np
+import pytest
+from brresTools.MDL0 import MDL0, UV_SECTION, VERTEX_SECTION
+
+FLOAT = 4
+S16 = 3
+
+
+def make_mdl0(vertex_buffers: dict, uv_buffers: dict, uv_divisor: int = 0) -> bytes:
+    """builds a MDL0 with only float XYZ vertex buffers and s16 ST UV buffers"""
+    header_size = 0x10 + 14 * 4
+    sections = {}
+    data = bytearray(header_size)
+    names = []
+
+    for section, buffers in (
+        (VERTEX_SECTION, vertex_buffers),
+        (UV_SECTION, uv_buffers),
+    ):
+        group_offset = len(data)
+        sections[section] = group_offset
+        group_size = 8 + 16 * (len(buffers) + 1)
+        data += bytes(group_size)
+        struct.pack_into(">II", data, group_offset, group_size, len(buffers))
+        for i, (name, values) in enumerate(buffers.items()):
+            entry_offset = len(data)
+            if section == VERTEX_SECTION:
+                raw = np.asarray(values, dtype=">f4")
+                data_fmt, comp_count, divisor = FLOAT, 1, 0
+            else:
+                raw = np.asarray(values, dtype=">i2")
+                data_fmt, comp_count, divisor = S16, 1, uv_divisor
+            data += struct.pack(
+                ">IiiiIIIBBH",
+                0x20 + raw.nbytes,
+                -entry_offset,
+                0x20,
+                0,
+                i,
+                comp_count,
+                data_fmt,
+                divisor,
+                raw.shape[1] * raw.itemsize,
+                raw.shape[0],
+            )
+            data += raw.tobytes()
+            names.append((group_offset, group_offset + 24 + 16 * i, name))
+            struct.pack_into(
+                ">I", data, group_offset + 24 + 16 * i + 12, entry_offset - group_offset
+            )
+
+    for group_offset, entry, name in names:
+        struct.pack_into(">I", data, entry + 8, len(data) - group_offset)
+        data += name.encode() + b"\x00"
+
+    data[0:4] = b"MDL0"
+    struct.pack_into(">II", data, 4, len(data), 11)
+    for section, offset in sections.items():
+        struct.pack_into(">I", data, 0x10 + section * 4, offset)
+    return bytes(data)
+
+
+def parse(data: bytes) -> MDL0:
+    return MDL0.parse_MDL0(BytesIO(data), 0)
+
+
+def test_vertices():
+    rng = np.random.default_rng(0)
+    vertices = rng.normal(0, 1000, (10, 3)).astype(np.float32)
+    mdl = parse(make_mdl0({"verts": vertices}, {}))
+
+    assert np.array_equal(mdl.get_vertices("verts"), vertices)
+    with pytest.raises(ValueError):
+        mdl.get_vertices("missing")
+    with pytest.raises(ValueError):
+        mdl.set_vertices("verts", vertices[:-1])
+
+    mdl.set_vertices("verts", vertices[::-1])
+    assert np.array_equal(parse(mdl.to_bytes()).get_vertices("verts"), vertices[::-1])
+
+
+def test_fixed_point_uvs():
+    uvs = np.array([[0, 256], [-128, 512]])
+    mdl = parse(make_mdl0({}, {"#0": uvs}, uv_divisor=8))
+
+    assert np.array_equal(mdl.get_uvs("#0"), [[0, 1], [-0.5, 2]])
+    assert np.array_equal(mdl.get_raw_buffer(UV_SECTION, "#0"), uvs)
+
+    mdl.set_uvs("#0", [[0.25, 1], [-0.5, 127]])
+    assert np.array_equal(
+        parse(mdl.to_bytes()).get_raw_buffer(UV_SECTION, "#0"),
+        [[64, 256], [-128, 127 * 256]],
+    )
+    with pytest.raises(ValueError):
+        mdl.set_uvs("#0", [[0, 0], [0, 128]])
@@ -0,0 +1,99 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sslib.overlay import ExtractOverlay, ExtractWriter, overlay_manifest_path
+
+
+def make_extracts(tmp_path):
+    actual = tmp_path / "actual-extract"
+    (actual / "DATA" / "files").mkdir(parents=True)
+    (actual / "DATA" / "files" / "a.arc").write_bytes(b"vanilla a")
+    (actual / "DATA" / "files" / "b.arc").write_bytes(b"vanilla b")
+    return actual, tmp_path / "modified-extract"
+
+
+def test_overlay_only_writes_changes(tmp_path):
+    actual, modified = make_extracts(tmp_path)
+    ExtractOverlay(actual, modified).setup()
+    a = modified / "DATA" / "files" / "a.arc"
+    b = modified / "DATA" / "files" / "b.arc"
+    assert a.read_bytes() == b"vanilla a"
+    # the manifest must not end up in the iso
+    assert overlay_manifest_path(modified).is_file()
+    assert all(p.is_relative_to(modified / "DATA") for p in modified.rglob("*.*"))
+
+    overlay = ExtractOverlay(actual, modified)
+    overlay.write_bytes(a, b"patched a")
+    with overlay.open_for_update(b) as f:
+        f.write(b"patched")
+    overlay.finish()
+    assert a.read_bytes() == b"patched a"
+    assert b.read_bytes() == b"patched b"
+    # links to actual-extract must never be written through
+    assert (actual / "DATA" / "files" / "a.arc").read_bytes() == b"vanilla a"
+    assert (actual / "DATA" / "files" / "b.arc").read_bytes() == b"vanilla b"
+
+    # writing the same content again doesn't touch the file
+    a_stat = a.stat()
+    overlay = ExtractOverlay(actual, modified)
+    overlay.write_bytes(a, b"patched a")
+    assert a.stat().st_ino == a_stat.st_ino
+    assert a.stat().st_mtime_ns == a_stat.st_mtime_ns
+    # files that aren't patched anymore go back to vanilla
+    overlay.finish()
+    assert a.read_bytes() == b"patched a"
+    assert b.read_bytes() == b"vanilla b"
+
+
+def test_writer_replaces_links(tmp_path):
+    actual, modified = make_extracts(tmp_path)
+    ExtractOverlay(actual, modified).setup()
+    a = modified / "DATA" / "files" / "a.arc"
+
+    # switching back to full copies must not change actual-extract either
+    writer = ExtractWriter(actual, modified)
+    writer.write_bytes(a, b"patched a")
+    assert a.read_bytes() == b"patched a"
+    assert (actual / "DATA" / "files" / "a.arc").read_bytes() == b"vanilla a"
+    writer.restore_vanilla(a)
+    assert a.read_bytes() == b"vanilla a"
+
+
+def test_restore_vanilla_at_finish(tmp_path):
+    actual, modified = make_extracts(tmp_path)
+    ExtractOverlay(actual, modified).setup()
+    a = modified / "DATA" / "files" / "a.arc"
+    b = modified / "DATA" / "files" / "b.arc"
+    overlay = ExtractOverlay(actual, modified)
+    overlay.write_bytes(a, b"patched a")
+    overlay.write_bytes(b, b"patched b")
+    overlay.finish()
+    a_stat = a.stat()
+
+    # a file patched after asking for vanilla keeps its patched content, untouched
+    overlay = ExtractOverlay(actual, modified)
+    overlay.restore_vanilla_at_finish(a)
+    overlay.restore_vanilla_at_finish(b)
+    overlay.write_bytes(a, b"patched a")
+    overlay.finish()
+    assert a.read_bytes() == b"patched a"
+    assert a.stat().st_ino == a_stat.st_ino
+    assert a.stat().st_mtime_ns == a_stat.st_mtime_ns
+    assert b.read_bytes() == b"vanilla b"
+
+
+def test_removed_file_restored(tmp_path):
+    actual, modified = make_extracts(tmp_path)
+    ExtractOverlay(actual, modified).setup()
+    b = modified / "DATA" / "files" / "b.arc"
+    overlay = ExtractOverlay(actual, modified)
+    overlay.remove(b)
+    overlay.finish()
+    assert not b.exists()
+
+    # a later run that doesn't remove it anymore brings it back
+    overlay = ExtractOverlay(actual, modified)
+    overlay.finish()
+    assert b.read_bytes() == b"vanilla b"
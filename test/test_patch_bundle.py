@@ -0,0 +1,37 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import yaml
+from asm.patch_bundle import PATCH_DIFFS_PATH, compile_patch_bundle, load_patch_bundle
+
+
+def test_bundle_matches_diffs(tmp_path):
+    cache_path = tmp_path / "asm-patches.pickle"
+    compiled = load_patch_bundle(cache_path)
+    cached = load_patch_bundle(cache_path)
+    for path in PATCH_DIFFS_PATH.glob("*_diff.txt"):
+        with path.open("r") as f:
+            diff = yaml.safe_load(f)
+        name = path.name.removesuffix("_diff.txt")
+        for bundle in (compiled, cached):
+            patch = bundle.get_patch(name)
+            assert list(patch.keys()) == list(diff.keys())
+            for exec_file, patchlets in diff.items():
+                assert list(patch[exec_file].keys()) == list(patchlets.keys())
+                for address, patchlet in patchlets.items():
+                    assert list(patch[exec_file][address]["Data"]) == patchlet["Data"]
+                    assert patch[exec_file][address].get("Relocations") == patchlet.get(
+                        "Relocations"
+                    )
+
+
+def test_patches_are_copies():
+    bundle = compile_patch_bundle()
+    patch = bundle.get_patch("custom_funcs")
+    address, patchlet = next(iter(patch["main.dol"].items()))
+    patchlet["Data"][0] ^= 0xFF
+    assert bundle.get_patch("custom_funcs")["main.dol"][address]["Data"][0] != (
+        patchlet["Data"][0]
+    )
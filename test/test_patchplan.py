@@ -0,0 +1,59 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from options import Options
+from patchplan import (
+    OptionRequirementFilter,
+    index_event_patches,
+    index_stage_patches,
+    load_patch_sources,
+)
+from yaml_files import patches, eventpatches
+from logic.bool_expression import check_static_option_req
+
+
+def test_patch_sources_are_copies():
+    assert load_patch_sources() == (patches, eventpatches)
+    # every load has to return fresh objects, since patches get added to them
+    loaded_patches, _ = load_patch_sources()
+    loaded_patches["global"]["startitems"].append(0)
+    assert load_patch_sources()[0] == patches
+    assert loaded_patches != patches
+
+
+def test_index_matches_filter():
+    opts = Options()
+    required_dungeons = ["Skyview", "Earth Temple"]
+    requirement_filter = OptionRequirementFilter(opts, required_dungeons)
+
+    def old_filter(entry):
+        return not (
+            isinstance(entry, dict)
+            and "onlyif" in entry
+            and not check_static_option_req(entry["onlyif"], opts, required_dungeons)
+        )
+
+    stage_index = index_stage_patches(patches, requirement_filter)
+    for stage, stagepatches in patches.items():
+        if stage == "global":
+            continue
+        stagepatches = list(filter(old_filter, stagepatches))
+        for room in set(p.get("room", None) for p in stagepatches) | {None}:
+            for patch_type in ("objadd", "objpatch", "objdelete", "oarcadd"):
+                assert stage_index.get((stage, room), patch_type) == [
+                    p
+                    for p in stagepatches
+                    if p["type"] == patch_type and p.get("room", None) == room
+                ]
+
+    event_index = index_event_patches(eventpatches, requirement_filter)
+    for filename, filepatches in eventpatches.items():
+        filepatches = list(filter(old_filter, filepatches))
+        assert event_index.get(filename, "flowadd", "switchadd") == [
+            p for p in filepatches if p["type"] in ["flowadd", "switchadd"]
+        ]
+        assert event_index.get(filename, "textpatch") == [
+            p for p in filepatches if p["type"] == "textpatch"
+        ]
@@ -1,12 +1,18 @@
 import sys
 import os
 
+import pytest
+
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from ssrando import Hints, Randomizer
 from options import Options
 from logic.logic_input import Areas
-from logic.placement_file import PlacementFile
+from logic.placement_file import (
+    InvalidPlacementFile,
+    PlacementArchive,
+    PlacementFile,
+)
 from logic.fill_algo_common import UserOutput
 from yaml_files import requirements, checks, hints, map_exits
 
@@ -37,4 +43,57 @@ def test_roundtrip():
         ) == round_tripped_file.options.get_permalink(exclude_seed=True)
         assert plcmt_file.required_dungeons == round_tripped_file.required_dungeons
         assert plcmt_file.starting_items == round_tripped_file.starting_items
+        assert plcmt_file.start_entrance == round_tripped_file.start_entrance
+        assert plcmt_file.start_statues == round_tripped_file.start_statues
         assert plcmt_file.version == round_tripped_file.version
+
+        binary_file = PlacementFile()
+        binary_file.read_from_binary(round_tripped_file.to_binary(areas), areas)
+        assert binary_file.to_json_str() == round_tripped_file.to_json_str()
+
+
+class SymbolAreas:
+    """only the parts of Areas the binary placement files use"""
+
+    def __init__(self, checks, gossip_stones):
+        self.checks = dict.fromkeys(checks, {})
+        self.gossip_stones = dict.fromkeys(gossip_stones, {})
+
+
+def test_binary_archive(tmp_path):
+    areas = SymbolAreas(["Skyloft - Chest", "Sky - Chest"], ["Skyloft - Stone"])
+    files = []
+    for i in range(3):
+        plcmt_file = PlacementFile()
+        plcmt_file.version = "2.0"
+        plcmt_file.hash_str = f"Hash {i}"
+        plcmt_file.item_locations = {
+            "Skyloft - Chest": "Progressive Sword",
+            "Sky - Chest": "Not An Item",
+        }
+        plcmt_file.chest_dowsing = {"Skyloft - Chest": i}
+        plcmt_file.hints = {"Skyloft - Stone": ["Some hint", "Some hint", ""]}
+        plcmt_file.trial_object_seed = 300 * i - 1
+        files.append(plcmt_file)
+
+    path = tmp_path / "placements.sspa"
+    archive = PlacementArchive(path, areas)
+    for plcmt_file in files:
+        archive.append(plcmt_file)
+
+    (tmp_path / "placements.sspa.idx").unlink()
+    reopened = PlacementArchive(path, areas)
+    assert len(reopened) == 3
+    for plcmt_file, read_file in zip(files, reopened):
+        assert read_file.to_json_str() == plcmt_file.to_json_str()
+
+    other_areas = SymbolAreas(["Sky - Chest"], [])
+    with pytest.raises(InvalidPlacementFile):
+        PlacementArchive(path, other_areas)[0]
+
+    # a new run over the same range starts from an empty archive
+    reopened.clear()
+    reopened.append(files[0])
+    reopened = PlacementArchive(path, areas)
+    assert len(reopened) == 1
+    assert reopened[0].to_json_str() == files[0].to_json_str()
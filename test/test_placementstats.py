@@ -0,0 +1,68 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from logic.constants import *
+from placementstats import PlacementStats
+from SpoilerLog import SpoilerData
+
+LOCATIONS = ["Skyloft - Chest", "Sky - Chest", "Faron - Chest"]
+
+
+def finished_seed(locations):
+    placement = SimpleNamespace(
+        locations=locations, items={item: loc for loc, item in locations.items()}
+    )
+    spoiler = SpoilerData(
+        "Hash",
+        progression_spheres=[["Skyloft - Chest"], ["Sky - Chest", DEMISE]],
+        sots_items={DEMISE: ["Clawshots"]},
+        barren_nonprogress=([CENTRAL_SKYLOFT], []),
+    )
+    return SimpleNamespace(logic=SimpleNamespace(placement=placement), spoiler=spoiler)
+
+
+def test_merged_statistics_round_trip(tmp_path):
+    first = PlacementStats(LOCATIONS)
+    second = PlacementStats(LOCATIONS)
+    for _ in range(3):
+        first.add_seed(
+            finished_seed(
+                {
+                    "Skyloft - Chest": "Clawshots",
+                    "Sky - Chest": "Progressive Sword #1",
+                    "Faron - Chest": "Progressive Sword #0",
+                }
+            )
+        )
+    second.add_seed(
+        finished_seed(
+            {
+                "Skyloft - Chest": "Progressive Sword #0",
+                "Sky - Chest": "Clawshots",
+                "Faron - Chest": "Progressive Sword #1",
+            }
+        )
+    )
+    first.merge(second)
+
+    first.save_npz(tmp_path / "stats.npz")
+    loaded = PlacementStats.load_npz(tmp_path / "stats.npz")
+    assert loaded.seeds == 4
+    clawshots = loaded.item_index["Clawshots"]
+    sword = loaded.item_index["Progressive Sword"]
+    assert loaded.item_locations[clawshots].tolist() == [3, 1, 0]
+    assert loaded.item_locations[sword].tolist() == [1, 3, 4]
+    assert loaded.sphere_depths[clawshots, :2].tolist() == [3, 1]
+    assert loaded.sots_items[clawshots, loaded.goal_index[DEMISE]] == 4
+    assert loaded.barren_regions[loaded.region_index[CENTRAL_SKYLOFT]] == 4
+    assert np.array_equal(loaded.item_locations, first.item_locations)
+
+    loaded.save_csv(tmp_path / "csv")
+    with (tmp_path / "csv" / "item_locations.csv").open() as f:
+        assert len(f.readlines()) == 1 + 5
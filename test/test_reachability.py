@@ -0,0 +1,65 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import random
+
+from logic.inventory import EXTENDED_ITEM, Inventory
+from logic.logic_expression import DNFInventory
+from logic.reachability import ReachabilitySession
+
+BITS = 40
+
+
+def random_requirement(rng):
+    if rng.random() < 0.2:
+        return DNFInventory()
+    return DNFInventory(
+        {
+            Inventory(
+                {EXTENDED_ITEM(rng.randrange(BITS)) for _ in range(rng.randint(0, 2))}
+            )
+            for _ in range(rng.randint(1, 3))
+        }
+    )
+
+
+def full_bits(requirements, inventory):
+    full = inventory
+    keep_going = True
+    while keep_going:
+        keep_going = False
+        for bit, req in enumerate(requirements):
+            if not full >> bit & 1 and any(
+                conj.bitset & full == conj.bitset for conj in req.disjunction
+            ):
+                full |= 1 << bit
+                keep_going = True
+    return full
+
+
+def test_session_matches_full_fill():
+    rng = random.Random(3)
+    for _ in range(20):
+        requirements = [random_requirement(rng) for _ in range(BITS)]
+        inventory = Inventory(
+            {EXTENDED_ITEM(bit) for bit in range(BITS) if rng.random() < 0.1}
+        )
+        session = ReachabilitySession(requirements, inventory)
+        base = inventory.bitset
+        for _ in range(30):
+            bit = EXTENDED_ITEM(rng.randrange(BITS))
+            action = rng.randrange(3)
+            if action == 0:
+                session.add_item(bit)
+                base |= 1 << bit
+            elif action == 1:
+                session.remove_item(bit)
+                base &= ~(1 << bit)
+            else:
+                requirements[bit] = random_requirement(rng)
+                session.update_requirement(bit)
+            assert session.full == full_bits(requirements, base)
+        assert session.base_inventory.bitset == base
+        assert session.full_inventory.bitset == session.full
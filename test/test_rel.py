@@ -0,0 +1,104 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from io import BytesIO
+
+from sslib.rel import REL, RELRelocation, RELRelocationType, RELSection
+
+REL_ID = 0x55
+
+
+def make_relocation(section_num, offset, symbol_address, section_against=1):
+    relocation = RELRelocation()
+    relocation.relocation_type = RELRelocationType.R_PPC_ADDR32
+    relocation.curr_section_num = section_num
+    relocation.relocation_offset = offset
+    relocation.section_num_to_relocate_against = section_against
+    relocation.symbol_address = symbol_address
+    return relocation
+
+
+def make_rel() -> REL:
+    rel = REL()
+    rel.id = REL_ID
+    rel.sections = [RELSection()]
+    for length in (0x20000, 0x100):
+        section = RELSection()
+        section.is_uninitialized = False
+        section.is_executable = len(rel.sections) == 1
+        section.data = BytesIO(bytes(length))
+        rel.sections.append(section)
+    rel.save_changes()
+    return rel
+
+
+def reload(rel: REL) -> REL:
+    rel.save_changes()
+    reloaded = REL()
+    reloaded.read(BytesIO(rel.data.getvalue()))
+    return reloaded
+
+
+def relocations(rel: REL):
+    return {
+        module_num: [
+            (
+                r.curr_section_num,
+                r.relocation_offset,
+                r.section_num_to_relocate_against,
+                r.symbol_address,
+            )
+            for r in module_relocations
+        ]
+        for module_num, module_relocations in rel.relocation_entries_for_module.items()
+    }
+
+
+def test_relocations_roundtrip():
+    rel = make_rel()
+    # added out of order and with a gap that needs NOPs in between
+    for section_num, offset in ((1, 0x1FF00), (2, 0x10), (1, 0x8), (1, 0x4)):
+        rel.add_relocation(REL_ID, make_relocation(section_num, offset, offset))
+    rel.add_relocation(0, make_relocation(1, 0x20, 0x80001234, 0))
+    expected = {
+        REL_ID: [
+            (1, 0x4, 1, 0x4),
+            (1, 0x8, 1, 0x8),
+            (1, 0x1FF00, 1, 0x1FF00),
+            (2, 0x10, 1, 0x10),
+        ],
+        0: [(1, 0x20, 0, 0x80001234)],
+    }
+    assert relocations(rel) == expected
+    reloaded = reload(rel)
+    assert relocations(reloaded) == expected
+    assert reloaded.fix_size == reloaded.relocation_table_offset
+    assert reload(reloaded).data.getvalue() == rel.data.getvalue()
+
+
+def test_delete_relocation_in_range():
+    rel = make_rel()
+    for offset in range(0, 0x40, 4):
+        rel.add_relocation(REL_ID, make_relocation(1, offset, offset))
+    rel.add_relocation(REL_ID, make_relocation(2, 0x8, 0))
+    section_offset = rel.sections[1].offset
+
+    rel.delete_relocation_in_range(section_offset + 0x8, 0x10)
+    assert [offset for _, offset, _, _ in relocations(rel)[REL_ID]] == [
+        0x0,
+        0x4,
+        0x18,
+        0x1C,
+        0x20,
+        0x24,
+        0x28,
+        0x2C,
+        0x30,
+        0x34,
+        0x38,
+        0x3C,
+        0x8,
+    ]
+    assert relocations(reload(rel)) == relocations(rel)
@@ -0,0 +1,27 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import io
+import json
+
+from SpoilerLog import write_json_object
+
+
+def test_json_object_matches_json_dump():
+    document = {
+        "version": "2.0",
+        "seed": 5,
+        "options": {"hint-distribution": "Balanced", "starting-items": []},
+        "playthrough": [["Skyloft - Chest"], [], ["Multi\nline", "Demise"]],
+        "empty": {},
+        "puzzles": None,
+    }
+    file = io.StringIO()
+    write_json_object(file, document.items())
+    assert file.getvalue() == json.dumps(document, indent=2)
+
+    file = io.StringIO()
+    write_json_object(file, {}.items())
+    assert file.getvalue() == json.dumps({}, indent=2)
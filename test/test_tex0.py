@@ -0,0 +1,67 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from brresTools.TEX0 import TEX0
+
+CMPR = 14
+
+
+def make_tex0(image_format, width, height):
+    return TEX0(None, 0, image_format, width, height, 0)
+
+
+def test_cmpr_decode_block():
+    tex0 = make_tex0(CMPR, 8, 8)
+    # opaque sub-block (c0 > c1): white to black, every pixel uses color code 2
+    opaque = bytes.fromhex("FFFF0000AAAAAAAA")
+    # transparent sub-block (c0 <= c1): color code 3 is fully transparent
+    transparent = bytes.fromhex("0000FFFFFFFFFFFF")
+    # pure red, first pixel color code 1, rest color code 0
+    red = bytes.fromhex("F800000040000000")
+    image = tex0.cvt_CMPR_to_RGBA(opaque + transparent + red + opaque)
+
+    assert image.shape == (8, 8, 4)
+    assert (image[:4, :4] == (165, 168, 165, 255)).all()
+    assert (image[:4, 4:] == (0, 0, 0, 0)).all()
+    assert tuple(image[4, 0]) == (0, 0, 0, 255)
+    assert (image[4:, :4].reshape(-1, 4)[1:] == (248, 0, 0, 255)).all()
+    assert (image[4:, 4:] == (165, 168, 165, 255)).all()
+
+
+def test_cmpr_roundtrip():
+    rng = np.random.default_rng(0)
+    tex0 = make_tex0(CMPR, 32, 16)
+    # up to two colors and transparency per sub-block survive encoding unchanged
+    palette = np.array(
+        [[248, 0, 0, 255], [0, 252, 248, 255], [0, 0, 0, 0]], dtype=np.uint8
+    )
+    image = palette[rng.integers(0, 3, (16, 32))]
+    encoded = tex0.cvt_RGBA_to_CMPR(image)
+    assert len(encoded) == 32 * 16 // 2
+    assert np.array_equal(tex0.cvt_CMPR_to_RGBA(bytes(encoded)), image)
+
+
+def test_block_tiling():
+    # RGB565 uses 4x4 blocks, the second block continues right of the first one
+    tex0 = make_tex0(4, 8, 4)
+    image = tex0.reorder_blocks(np.arange(32 * 4, dtype=np.uint8).reshape(32, 4))
+    assert tuple(image[0, 3]) == (12, 13, 14, 15)
+    assert tuple(image[0, 4]) == (64, 65, 66, 67)
+    assert tuple(image[1, 0]) == (16, 17, 18, 19)
+    assert np.array_equal(tex0.reorder_blocks_back(image).reshape(-1), np.arange(128))
+
+
+def test_raw_roundtrip():
+    rng = np.random.default_rng(0)
+    palette = rng.integers(0, 256, (256, 4), dtype=np.uint8)
+    # I8, IA4, IA8, RGBA32, C8
+    for image_format, bits_per_pixel in ((1, 8), (2, 8), (3, 16), (6, 32), (9, 8)):
+        tex0 = make_tex0(image_format, 16, 8)
+        tex0.palette = palette
+        raw = rng.integers(0, 256, 16 * 8 * bits_per_pixel // 8, dtype=np.uint8)
+        image = tex0.convert_raw_image_data_to_RGBA(raw.tobytes())
+        assert image.shape == (8, 16, 4)
+        assert bytes(tex0.convert_RGBA_to_raw_image_data(image)) == raw.tobytes()
@@ -50,3 +50,22 @@ def test_add_delete():
     new_paths = list(stagearc.get_all_paths())
     assert len(paths) == len(new_paths)
     assert all([a == b for a, b in zip(paths, new_paths)])
+
+
+def test_file_names():
+    from sslib.u8file import DirNode, FileNode
+
+    root = DirNode(0, 0, 4)
+    root.set_name("")
+    datdir = DirNode(0, 0, 4)
+    datdir.set_name("dat")
+    nodes = [root, datdir]
+    for name in ("100-Town.msbf", "100-Town.msbt"):
+        node = FileNode(0, 0, 0)
+        node.set_name(name)
+        node.set_data(b"data")
+        nodes.append(node)
+    data = bytes(sslib.U8File(BytesIO(), nodes).to_buffer())
+    assert sslib.U8File.file_names(data) == ["100-Town.msbf", "100-Town.msbt"]
+    arc = sslib.U8File.parse_u8(BytesIO(data))
+    assert arc.get_file_data("dat/100-Town.msbt") == b"data"